@@ -1,18 +1,47 @@
 from django.contrib import admin
 from .models import Empreendimento, Cliente, Lote
 
+
+def _autocomplete_de(request, model_name, field_name):
+    """True se a request é o autocomplete do admin para <model_name>.<field_name>."""
+    return (
+        request.GET.get('model_name') == model_name
+        and request.GET.get('field_name') == field_name
+    )
+
 @admin.register(Empreendimento)
 class EmpreendimentoAdmin(admin.ModelAdmin):
     list_display = ('nome','cidade','estado')
     search_fields = ('nome','cidade')
+    show_full_result_count = False
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
     list_display = ('nome','cpf_cnpj','telefone','email')
     search_fields = ('nome','cpf_cnpj')
+    ordering = ('nome', 'id')
+    show_full_result_count = False
 
 @admin.register(Lote)
 class LoteAdmin(admin.ModelAdmin):
     list_display = ('empreendimento','quadra','numero','area_m2','preco_tabela','status')
     list_filter = ('empreendimento','status')
-    search_fields = ('quadra','numero')
\ No newline at end of file
+    search_fields = ('quadra','numero','empreendimento__nome')
+    ordering = ('empreendimento','quadra','numero')
+    list_select_related = ('empreendimento',)
+    autocomplete_fields = ('empreendimento',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Lote.__str__ usa o empreendimento (autocomplete e changelist)
+        return super().get_queryset(request).select_related('empreendimento')
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if _autocomplete_de(request, 'venda', 'lote'):
+            # no seletor da venda: só lotes disponíveis, opcionalmente de um empreendimento
+            queryset = queryset.filter(status=Lote.Status.DISPONIVEL, venda__isnull=True)
+            emp = request.GET.get('empreendimento', '')
+            if emp.isdigit():
+                queryset = queryset.filter(empreendimento_id=int(emp))
+        return queryset, may_have_duplicates
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nome'], name='cadastros_c_nome_4af367_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['status', 'empreendimento'], name='cadastros_l_status_b4f24c_idx'),
+        ),
+    ]
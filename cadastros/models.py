@@ -15,6 +15,9 @@ class Cliente(models.Model):
     email = models.EmailField(blank=True)
     endereco = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['nome'])]
+
     def __str__(self):
         return f"{self.nome} ({self.cpf_cnpj})"
 
@@ -33,6 +36,7 @@ class Lote(models.Model):
 
     class Meta:
         unique_together = ('empreendimento', 'quadra', 'numero')
+        indexes = [models.Index(fields=['status', 'empreendimento'])]
 
     def __str__(self):
         return f"{self.empreendimento} Q{self.quadra} L{self.numero}"
\ No newline at end of file
@@ -1,3 +1,63 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from cadastros.models import Lote
+from testes.apoio import SEM_MANIFESTO, ConsultasConstantesTestCase, ate, criar_lotes
+
+LOTES = ate(Lote, criar_lotes)
+
+
+class AdminConsultasTests(ConsultasConstantesTestCase):
+    """Changelists e formulários com número de queries fixo (3 ou 12 linhas)."""
+
+    def test_changelist_empreendimentos(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:cadastros_empreendimento_changelist"), 7, LOTES)
+
+    def test_changelist_clientes(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:cadastros_cliente_changelist"), 7, LOTES)
+
+    def test_changelist_lotes(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:cadastros_lote_changelist"), 8, LOTES)
+
+    def test_form_lote(self):
+        self.assertConsultasConstantes(
+            lambda: reverse("admin:cadastros_lote_change", args=[Lote.objects.first().pk]), 7, LOTES
+        )
+
+
+@SEM_MANIFESTO
+class AutocompleteLoteVendaTests(TestCase):
+    """Seletor de lote da venda: só lotes disponíveis, do empreendimento escolhido."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "a@a.com", "x")
+        criar_lotes(3)
+        cls.emp = Lote.objects.order_by("id").first().empreendimento
+        Lote.objects.create(
+            empreendimento=cls.emp, quadra="B", numero="1",
+            area_m2=Decimal("300"), preco_tabela=Decimal("60000"), status=Lote.Status.VENDIDO,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _buscar(self, **extra):
+        params = {"term": "", "app_label": "vendas", "model_name": "venda", "field_name": "lote", **extra}
+        resp = self.client.get(reverse("admin:autocomplete"), params)
+        self.assertEqual(resp.status_code, 200)
+        return {int(r["id"]) for r in resp.json()["results"]}
+
+    def test_so_lotes_disponiveis(self):
+        esperados = set(Lote.objects.filter(status=Lote.Status.DISPONIVEL).values_list("id", flat=True))
+        self.assertEqual(len(esperados), 3)
+        self.assertEqual(self._buscar(), esperados)
 
-# Create your tests here.
+    def test_filtra_pelo_empreendimento(self):
+        esperados = set(Lote.objects.filter(empreendimento=self.emp, status=Lote.Status.DISPONIVEL)
+                        .values_list("id", flat=True))
+        self.assertEqual(len(esperados), 1)
+        self.assertEqual(self._buscar(empreendimento=self.emp.pk), esperados)
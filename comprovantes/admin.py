@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Blob
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ("nome", "tamanho", "refs", "criado_em")
+    search_fields = ("nome", "sha256")
+    readonly_fields = ("nome", "sha256", "tamanho", "refs", "criado_em")
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
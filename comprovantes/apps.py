@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ComprovantesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "comprovantes"
+    verbose_name = "Comprovantes"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,126 @@
+# comprovantes/compactacao.py
+"""
+Recompressão dos comprovantes já gravados (usada pelo comando
+`compactar_comprovantes`). As funções daqui rodam em processos separados:
+não acessam o banco, só o arquivo.
+
+- JPEG/WEBP: aplica a orientação EXIF, reduz para no máximo `lado_max` px e
+  regrava com `qualidade` (nunca abaixo de QUALIDADE_MIN).
+- PNG: só regrava com optimize (sem perda, sem redimensionar).
+- PDF: linearizado e com object streams via pikepdf, ou `qpdf` se estiver no
+  PATH (sem perda); sem nenhum dos dois, PDFs ficam como estão.
+
+O resultado só vale se ficar ao menos GANHO_MIN menor, e vira um blob novo,
+com o nome pelo SHA-256 do conteúdo novo (ver comprovantes.storage). O
+arquivo original não é tocado: o nome de um blob continua dizendo o seu
+conteúdo (ETag, Range/If-Range). O comando aponta os registros para o blob
+novo e o gc_comprovantes apaga o antigo.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from .storage import nome_blob
+
+QUALIDADE_MIN = 60
+GANHO_MIN = 0.05  # 5%
+
+EXT_JPEG = {".jpg", ".jpeg"}
+EXT_IMAGEM = EXT_JPEG | {".png", ".webp"}
+EXT_PDF = {".pdf"}
+EXTENSOES = EXT_IMAGEM | EXT_PDF
+
+
+def _imagem(origem: str, destino: str, ext: str, qualidade: int, lado_max: int) -> None:
+    from PIL import Image, ImageOps
+
+    with Image.open(origem) as img:
+        if ext == ".png":
+            img.save(destino, "PNG", optimize=True)  # sem perda: nem reduz nem gira
+            return
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > lado_max:
+            img.thumbnail((lado_max, lado_max))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        formato = "JPEG" if ext in EXT_JPEG else "WEBP"
+        extra = {"optimize": True, "progressive": True} if formato == "JPEG" else {"method": 6}
+        img.save(destino, formato, quality=qualidade, **extra)
+
+
+def _pdf(origem: str, destino: str) -> bool:
+    try:
+        import pikepdf
+    except ImportError:
+        pikepdf = None
+
+    if pikepdf is not None:
+        with pikepdf.open(origem) as pdf:
+            pdf.save(
+                destino,
+                linearize=True,
+                compress_streams=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+        return True
+    if shutil.which("qpdf"):
+        subprocess.run(
+            ["qpdf", "--linearize", "--object-streams=generate", origem, destino],
+            check=True, capture_output=True, timeout=300,
+        )
+        return True
+    return False
+
+
+def _sha256(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def compactar_arquivo(caminho: str, *, raiz: str, qualidade: int = 82, lado_max: int = 2400,
+                      dry_run: bool = False) -> tuple[str, int, int, str, str | None]:
+    """
+    Recomprime `caminho` num blob novo dentro de `raiz` (MEDIA_ROOT).
+    Retorna (caminho, bytes_antes, bytes_depois, situação, blob_novo), situação
+    em {"compactado", "sem_ganho", "ignorado", "erro: ..."}; blob_novo é o
+    nome no storage do arquivo gravado (None se nada foi gravado).
+    """
+    antes = os.path.getsize(caminho)
+    ext = os.path.splitext(caminho)[1].lower()
+    if ext not in EXTENSOES:
+        return caminho, antes, antes, "ignorado", None
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=ext)
+    os.close(fd)
+    try:
+        if ext in EXT_PDF:
+            if not _pdf(caminho, tmp):
+                return caminho, antes, antes, "ignorado", None
+        else:
+            _imagem(caminho, tmp, ext, max(qualidade, QUALIDADE_MIN), lado_max)
+
+        depois = os.path.getsize(tmp)
+        if depois == 0 or depois > antes * (1 - GANHO_MIN):
+            return caminho, antes, antes, "sem_ganho", None
+        if dry_run:
+            return caminho, antes, depois, "compactado", None
+
+        novo = nome_blob(_sha256(tmp), ext)
+        destino = os.path.join(raiz, novo)
+        if not os.path.exists(destino):  # mesmo conteúdo já gravado: reaproveita
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copymode(caminho, tmp)
+            os.replace(tmp, destino)
+        return caminho, antes, depois, "compactado", novo
+    except Exception as exc:  # um arquivo ruim não derruba o lote
+        return caminho, antes, antes, f"erro: {exc}", None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,113 @@
+# comprovantes/management/commands/compactar_comprovantes.py
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from comprovantes.compactacao import EXTENSOES, QUALIDADE_MIN, compactar_arquivo
+from comprovantes.storage import PREFIXO, repontar
+from monitoramento.models import ExecucaoTarefa
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomprime os comprovantes gravados (imagens e PDFs) em paralelo, "
+        "em blobs novos, e aponta os registros para eles. Retomável pelo checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Processos em paralelo (padrão: nº de CPUs).")
+        parser.add_argument("--qualidade", type=int, default=82,
+                            help=f"Qualidade JPEG/WEBP (mínimo {QUALIDADE_MIN}; padrão: 82).")
+        parser.add_argument("--lado-max", type=int, default=2400,
+                            help="Maior lado das imagens, em px (padrão: 2400).")
+        parser.add_argument("--checkpoint",
+                            default=os.path.join(settings.MEDIA_ROOT, ".compactar_comprovantes.json"),
+                            help="Arquivo de progresso (retoma de onde parou).")
+        parser.add_argument("--recomecar", action="store_true",
+                            help="Ignora o checkpoint existente.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Só mede o ganho; não grava nem aponta nada.")
+
+    def handle(self, *args, **options):
+        raiz = os.path.join(settings.MEDIA_ROOT, PREFIXO)
+        dry_run = options["dry_run"]
+        ckpt_path = options["checkpoint"]
+        estado = {"feitos": [], "antes": 0, "depois": 0}
+        if not options["recomecar"] and not dry_run and os.path.exists(ckpt_path):
+            with open(ckpt_path) as f:
+                estado = json.load(f)
+        feitos = set(estado["feitos"])
+        if feitos:
+            self.stdout.write(f"Retomando: {len(feitos)} arquivo(s) já processado(s).")
+
+        pendentes = [c for c in self._arquivos(raiz) if c not in feitos]
+        self.stdout.write(f"{len(pendentes)} arquivo(s) a processar com {options['workers']} processo(s).")
+
+        fn = partial(
+            compactar_arquivo,
+            raiz=str(settings.MEDIA_ROOT),
+            qualidade=max(options["qualidade"], QUALIDADE_MIN),
+            lado_max=options["lado_max"],
+            dry_run=dry_run,
+        )
+        contagem = {"compactado": 0, "sem_ganho": 0, "ignorado": 0, "erro": 0}
+        registros = 0
+
+        with ExecucaoTarefa.registrar("compactar_comprovantes") as detalhes, \
+                ProcessPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            for i, (caminho, antes, depois, situacao, novo) in enumerate(
+                pool.map(fn, [os.path.join(settings.MEDIA_ROOT, c) for c in pendentes], chunksize=8), 1
+            ):
+                nome = os.path.relpath(caminho, settings.MEDIA_ROOT).replace(os.sep, "/")
+                if situacao.startswith("erro"):
+                    contagem["erro"] += 1
+                    self.stderr.write(f"{nome}: {situacao}")
+                else:
+                    contagem[situacao] += 1
+                estado["antes"] += antes
+                estado["depois"] += depois
+                if novo:
+                    registros += repontar(nome, novo, depois)
+                    feitos.add(novo)  # não recomprime o que acabou de ser gerado
+                feitos.add(nome)
+                if not dry_run and i % 100 == 0:
+                    self._gravar(ckpt_path, estado, feitos)
+
+            if not dry_run:
+                self._gravar(ckpt_path, estado, feitos)
+            economia = estado["antes"] - estado["depois"]
+            detalhes.update(contagem, bytes_economizados=economia, registros=registros, dry_run=dry_run)
+
+        prefixo = "[dry-run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{contagem['compactado']} compactado(s), {contagem['sem_ganho']} sem ganho, "
+            f"{contagem['ignorado']} ignorado(s), {contagem['erro']} erro(s). "
+            f"Acumulado: {_mb(estado['antes'])} -> {_mb(estado['depois'])} "
+            f"({_mb(economia)} economizados); {registros} registro(s) apontado(s) para os blobs novos. "
+            f"Os arquivos antigos saem no gc_comprovantes."
+        ))
+
+    def _arquivos(self, raiz: str):
+        """Caminhos relativos a MEDIA_ROOT, em ordem estável (o checkpoint depende disso)."""
+        for pasta, subpastas, arquivos in os.walk(raiz):
+            subpastas[:] = sorted(d for d in subpastas if d != "tmp")
+            for nome in sorted(arquivos):
+                if os.path.splitext(nome)[1].lower() in EXTENSOES:
+                    caminho = os.path.join(pasta, nome)
+                    yield os.path.relpath(caminho, settings.MEDIA_ROOT).replace(os.sep, "/")
+
+    def _gravar(self, ckpt_path: str, estado: dict, feitos: set) -> None:
+        estado["feitos"] = sorted(feitos)
+        tmp = f"{ckpt_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(estado, f)
+        os.replace(tmp, ckpt_path)
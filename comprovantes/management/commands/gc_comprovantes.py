@@ -0,0 +1,115 @@
+# comprovantes/management/commands/gc_comprovantes.py
+import hashlib
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from comprovantes.models import MODELOS, Blob
+from comprovantes.previews import PASTA_PREVIEWS, nome_preview
+from comprovantes.storage import PREFIXO, recontar_referencias
+from monitoramento.models import ExecucaoTarefa
+
+
+def _digest(nome: str) -> bytes:
+    # 8 bytes por caminho: o conjunto cabe em memória mesmo com milhões de arquivos
+    return hashlib.blake2b(nome.encode(), digest_size=8).digest()
+
+
+def _varrer(pasta: str):
+    """os.scandir recursivo: gera (caminho, mtime) sem montar a lista inteira."""
+    try:
+        entradas = os.scandir(pasta)
+    except FileNotFoundError:
+        return
+    with entradas:
+        for e in entradas:
+            if e.is_dir(follow_symlinks=False):
+                yield from _varrer(e.path)
+            elif e.is_file(follow_symlinks=False):
+                yield e.path, e.stat(follow_symlinks=False).st_mtime
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove arquivos de comprovantes (e miniaturas) que nenhum registro "
+        "referencia mais. Memória limitada: só guarda um digest de 8 bytes por referência."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Só lista/conta os órfãos; não apaga nada.")
+        parser.add_argument("--batch", type=int, default=500,
+                            help="Arquivos apagados por lote (padrão: 500).")
+        parser.add_argument("--idade-min", type=int, default=3600,
+                            help="Ignora arquivos mais novos que N segundos, que podem ser "
+                                 "uploads ainda sem commit (padrão: 3600).")
+        parser.add_argument("--listar", action="store_true",
+                            help="Imprime o caminho de cada órfão.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch = max(1, options["batch"])
+        limite = time.time() - max(0, options["idade_min"])
+
+        referenciados = set()
+        qtd = 0
+        for label in MODELOS.values():
+            qs = (
+                apps.get_model(label).objects
+                .exclude(comprovante="").exclude(comprovante__isnull=True)
+                .values_list("comprovante", flat=True)
+            )
+            for nome in qs.iterator(chunk_size=5000):
+                qtd += 1
+                referenciados.add(_digest(nome))
+                referenciados.add(_digest(nome_preview(nome)))  # legados: nome padrão
+        # miniaturas com o nome que o storage devolveu; a do blob órfão sai na
+        # execução seguinte, depois que o blob for apagado
+        previews = Blob.objects.exclude(preview="").values_list("preview", flat=True)
+        for nome in previews.iterator(chunk_size=5000):
+            referenciados.add(_digest(nome))
+        self.stdout.write(f"{qtd} referência(s) a comprovantes.")
+
+        raiz = settings.MEDIA_ROOT
+        total = orfaos = bytes_orfaos = 0
+        lote: list[tuple[str, str]] = []
+
+        with ExecucaoTarefa.registrar("gc_comprovantes") as detalhes:
+            # contagens que escaparam dos sinais (queryset.update, processo interrompido)
+            corrigidos = 0 if dry_run else recontar_referencias()
+            for pasta in (PREFIXO, PASTA_PREVIEWS):
+                for caminho, mtime in _varrer(os.path.join(raiz, pasta)):
+                    total += 1
+                    nome = os.path.relpath(caminho, raiz).replace(os.sep, "/")
+                    if mtime > limite or _digest(nome) in referenciados:
+                        continue
+                    orfaos += 1
+                    bytes_orfaos += os.path.getsize(caminho)
+                    if options["listar"]:
+                        self.stdout.write(nome)
+                    if not dry_run:
+                        lote.append((nome, caminho))
+                        if len(lote) >= batch:
+                            self._apagar(lote)
+            if lote:
+                self._apagar(lote)
+            detalhes.update(arquivos=total, orfaos=orfaos, bytes=bytes_orfaos, dry_run=dry_run,
+                            refs_corrigidas=corrigidos)
+
+        acao = "seriam apagados" if dry_run else "apagados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} arquivo(s) verificados; {orfaos} órfão(s) {acao} "
+            f"({bytes_orfaos / 1024 / 1024:.1f} MB); {corrigidos} contagem(ns) de referências corrigida(s)."
+        ))
+
+    def _apagar(self, lote: list[tuple[str, str]]) -> None:
+        for _, caminho in lote:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+        Blob.objects.filter(nome__in=[nome for nome, _ in lote]).delete()
+        lote.clear()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprovantes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='preview',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# comprovantes/mixins.py
+from __future__ import annotations
+
+from django.db.models.fields.files import FieldFile
+
+
+class RastreiaOriginaisMixin:
+    """
+    Guarda, no carregamento (from_db), os valores originais dos campos
+    listados em `campos_rastreados`. Permite detectar alterações no save
+    sem um SELECT extra.
+
+        class Venda(RastreiaOriginaisMixin, models.Model):
+            campos_rastreados = ("comprovante",)
+    """
+    campos_rastreados: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._originais = {
+            nome: valor
+            for nome, valor in zip(field_names, values)
+            if nome in cls.campos_rastreados
+        }
+        return instance
+
+    def _valor_atual(self, campo: str):
+        valor = self._meta.get_field(campo).value_from_object(self)
+        # FieldFile -> nome do arquivo (é o que fica gravado no banco)
+        return valor.name if isinstance(valor, FieldFile) else valor
+
+    def _capturar_originais(self, campos=None) -> None:
+        originais = getattr(self, "_originais", None)
+        if originais is None:
+            originais = self._originais = {}
+        deferidos = self.get_deferred_fields()
+        for campo in campos or self.campos_rastreados:
+            if campo in self.campos_rastreados and campo not in deferidos:
+                originais[campo] = self._valor_atual(campo)
+
+    def valor_original(self, campo: str):
+        """
+        Valor do campo como está no banco. Se o campo não foi carregado
+        (instância nova ou campo adiado), cai para uma consulta.
+        """
+        originais = getattr(self, "_originais", {})
+        if campo in originais:
+            return originais[campo]
+        if self._state.adding or self.pk is None:
+            return None
+        return (
+            type(self)._base_manager.using(self._state.db or "default")
+            .filter(pk=self.pk)
+            .values_list(campo, flat=True)
+            .first()
+        )
+
+    def campo_alterado(self, campo: str) -> bool:
+        if self._state.adding:
+            return True
+        return self.valor_original(campo) != self._valor_atual(campo)
+
+    def campos_alterados(self) -> set[str]:
+        return {c for c in self.campos_rastreados if self.campo_alterado(c)}
+
+    def arquivo_original(self, campo: str) -> FieldFile | None:
+        """FieldFile do arquivo gravado antes desta alteração (ou None)."""
+        nome = self.valor_original(campo)
+        if not nome:
+            return None
+        field = self._meta.get_field(campo)
+        return field.attr_class(self, field, nome)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # o que acabou de ser gravado passa a ser o "original"
+        self._capturar_originais(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._capturar_originais(fields)
@@ -0,0 +1,31 @@
+# comprovantes/models.py
+from django.db import models
+
+# <modelo na URL> -> model com campo `comprovante` (download, referências e GC)
+MODELOS = {
+    "venda": "vendas.Venda",
+    "parcela": "vendas.Parcela",
+    "despesa": "financeiro.Despesa",
+    "receita": "financeiro.ReceitaExtra",
+}
+
+
+class Blob(models.Model):
+    """
+    Arquivo de comprovante gravado uma única vez, endereçado pelo SHA-256 do
+    conteúdo (ver comprovantes.storage). `refs` conta quantos registros
+    (Venda, Parcela, Despesa, ReceitaExtra) apontam para ele.
+    """
+    nome = models.CharField(max_length=255, unique=True)  # caminho no storage
+    sha256 = models.CharField(max_length=64, db_index=True)
+    tamanho = models.PositiveBigIntegerField()
+    refs = models.PositiveIntegerField(default=0)
+    preview = models.CharField(max_length=255, blank=True)  # nome devolvido pelo storage
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Arquivo de comprovante"
+        verbose_name_plural = "Arquivos de comprovantes"
+
+    def __str__(self):
+        return f"{self.nome} ({self.refs} ref.)"
@@ -0,0 +1,184 @@
+# comprovantes/previews.py
+"""
+Miniaturas dos comprovantes (PNG, no máximo LADO_MAX px de lado).
+
+- Imagens: reduzidas com Pillow.
+- PDFs: primeira página, via pypdfium2 se instalado, senão `pdftoppm`
+  (poppler-utils); sem nenhum dos dois, o PDF fica sem miniatura.
+
+As miniaturas são geradas depois do commit, numa thread de fundo (uma por
+vez, para não disputar CPU com os workers), e gravadas no storage em
+`previews/`. Para blobs o nome segue o hash do arquivo original, então a
+miniatura nunca fica desatualizada; o nome que o storage devolveu fica em
+Blob.preview. A view comprovantes:preview nunca gera na hora: o que ainda
+não existir (ex.: arquivos anteriores a este recurso) entra na fila.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PASTA_PREVIEWS = "previews"
+LADO_MAX = 480
+EXT_IMAGEM = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="previews")
+_na_fila: set[str] = set()
+_trava_fila = threading.Lock()
+
+
+def nome_preview(nome: str) -> str:
+    """Caminho da miniatura de `nome` no storage."""
+    return f"{PASTA_PREVIEWS}/{os.path.splitext(nome)[0]}.png"
+
+
+def _miniatura_imagem(origem) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(origem) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((LADO_MAX, LADO_MAX))
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, "PNG", optimize=True)
+        return out.getvalue()
+
+
+def _primeira_pagina_pdf(caminho: str):
+    """Primeira página do PDF como PIL.Image (ou None)."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(caminho)
+        try:
+            pagina = pdf[0]
+            escala = LADO_MAX / max(pagina.get_size())
+            return pagina.render(scale=escala).to_pil()
+        finally:
+            pdf.close()
+
+    if shutil.which("pdftoppm"):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as tmp:
+            saida = os.path.join(tmp, "p")
+            subprocess.run(
+                ["pdftoppm", "-png", "-f", "1", "-l", "1", "-singlefile",
+                 "-scale-to", str(LADO_MAX), caminho, saida],
+                check=True, capture_output=True, timeout=60,
+            )
+            with Image.open(saida + ".png") as img:
+                img.load()
+                return img
+    return None
+
+
+def _miniatura_pdf(caminho: str) -> bytes | None:
+    img = _primeira_pagina_pdf(caminho)
+    if img is None:
+        return None
+    out = io.BytesIO()
+    img.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def tem_preview(nome: str) -> bool:
+    """Se o tipo de arquivo tem miniatura (imagem ou PDF)."""
+    ext = os.path.splitext(nome)[1].lower()
+    return ext in EXT_IMAGEM or ext == ".pdf"
+
+
+def preview_existente(nome: str, storage=None) -> str | None:
+    """Caminho da miniatura já gerada de `nome` (ou None)."""
+    from .models import Blob
+
+    storage = storage or default_storage
+    gravado = Blob.objects.filter(nome=nome).values_list("preview", flat=True).first()
+    # arquivos sem Blob (legados) ou anteriores a Blob.preview: nome padrão
+    for destino in (gravado, nome_preview(nome)):
+        if destino and storage.exists(destino):
+            return destino
+    return None
+
+
+def gerar_preview(nome: str, storage=None) -> str | None:
+    """Gera (se preciso) a miniatura de `nome`. Retorna o caminho ou None."""
+    from .models import Blob
+
+    storage = storage or default_storage
+    existente = preview_existente(nome, storage)
+    if existente:
+        return existente
+
+    ext = os.path.splitext(nome)[1].lower()
+    try:
+        if ext in EXT_IMAGEM:
+            with storage.open(nome, "rb") as f:
+                dados = _miniatura_imagem(f)
+        elif ext == ".pdf":
+            dados = _miniatura_pdf(storage.path(nome))
+        else:
+            return None
+    except Exception:
+        logger.warning("Falha ao gerar miniatura de %s", nome, exc_info=True)
+        return None
+    if not dados:
+        return None
+
+    # o storage pode escolher outro nome (ex.: arquivo concorrente no destino)
+    salvo = storage.save(nome_preview(nome), ContentFile(dados))
+    Blob.objects.filter(nome=nome).update(preview=salvo)
+    return salvo
+
+
+def _gerar_da_fila(nome: str) -> None:
+    # thread longa: descarta conexões caídas ou vencidas (CONN_MAX_AGE) a cada item
+    close_old_connections()
+    try:
+        gerar_preview(nome)
+    except Exception:
+        # ninguém olha o Future: registra aqui
+        logger.exception("Falha na fila de miniaturas (%s)", nome)
+    finally:
+        close_old_connections()
+        with _trava_fila:
+            _na_fila.discard(nome)
+
+
+def enfileirar_preview(nome: str) -> None:
+    """Põe `nome` na fila de miniaturas (uma vez só, mesmo com vários pedidos)."""
+    with _trava_fila:
+        if nome in _na_fila:
+            return
+        _na_fila.add(nome)
+    _executor.submit(_gerar_da_fila, nome)
+
+
+def agendar_preview(nome: str) -> None:
+    """Gera a miniatura em segundo plano, depois do commit da transação atual."""
+    if nome and tem_preview(nome):
+        transaction.on_commit(lambda: enfileirar_preview(nome))
+
+
+def apagar_preview(nome: str, storage=None, preview: str = "") -> None:
+    """Apaga a miniatura de `nome` (`preview`: o nome gravado em Blob.preview)."""
+    storage = storage or default_storage
+    for destino in {preview, nome_preview(nome)} - {""}:
+        if storage.exists(destino):
+            storage.delete(destino)
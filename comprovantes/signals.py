@@ -0,0 +1,40 @@
+# comprovantes/signals.py
+from django.apps import apps
+from django.db.models.signals import post_save, pre_delete
+
+from .models import MODELOS
+from .previews import agendar_preview
+from .storage import mover_referencia
+
+
+def gerar_preview_apos_salvar(sender, instance, created=False, update_fields=None, **kwargs):
+    # comprovante novo/trocado -> miniatura
+    if update_fields is not None and "comprovante" not in update_fields:
+        return
+    if "comprovante" in instance.get_deferred_fields():
+        return
+    if instance.comprovante and (created or instance.campo_alterado("comprovante")):
+        agendar_preview(instance.comprovante.name)
+
+
+def contar_apos_salvar(sender, instance, created=False, update_fields=None, **kwargs):
+    # ainda dentro do save: o original (mixin) é o nome anterior a este save
+    if update_fields is not None and "comprovante" not in update_fields:
+        return
+    if "comprovante" in instance.get_deferred_fields():
+        return
+    antigo = None if created else instance.valor_original("comprovante")
+    mover_referencia(antigo or None, instance.comprovante.name or None, instance.comprovante.storage)
+
+
+def contar_antes_de_excluir(sender, instance, **kwargs):
+    # pre_delete roda na transação do delete (inclusive em cascata)
+    if instance.comprovante:
+        mover_referencia(instance.comprovante.name, None, instance.comprovante.storage)
+
+
+# só os models com comprovante (Venda, Parcela, Despesa, ReceitaExtra)
+for _model in map(apps.get_model, MODELOS.values()):
+    post_save.connect(gerar_preview_apos_salvar, sender=_model)
+    post_save.connect(contar_apos_salvar, sender=_model)
+    pre_delete.connect(contar_antes_de_excluir, sender=_model)
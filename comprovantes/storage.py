@@ -0,0 +1,205 @@
+# comprovantes/storage.py
+"""
+Storage dos comprovantes com deduplicação por conteúdo.
+
+Uploads cujo caminho começa com `comprovantes/` (os upload_to de Venda,
+Parcela, Despesa e ReceitaExtra) passam por um SHA-256 enquanto são
+gravados num arquivo temporário e vão para
+
+    comprovantes/blobs/<h[:2]>/<h[2:4]>/<sha256><extensão>
+
+O mesmo PDF enviado duas vezes ocupa o disco uma vez só. O storage só
+grava o arquivo e garante a linha em Blob; quem conta as referências é o
+save/delete dos models (comprovantes.signals -> mover_referencia), na mesma
+transação: se ela for desfeita, a contagem volta junto. Depois do commit, o
+arquivo sem referências é apagado; gc_comprovantes recalcula as contagens
+(recontar_referencias) e apaga o que sobrar.
+Arquivos antigos, gravados antes deste storage, não têm Blob e continuam
+sendo apagados diretamente.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+from functools import partial
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from monitoramento.metricas import observar_cache
+
+PREFIXO = "comprovantes/"
+PASTA_BLOBS = "comprovantes/blobs"
+# blob gravado/reaproveitado há menos que isso pode ter um save ainda sem
+# commit apontando para ele: não é apagado na hora, fica para o GC
+RECENTE_S = 3600
+
+
+def nome_blob(sha256: str, extensao: str) -> str:
+    return f"{PASTA_BLOBS}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao.lower()}"
+
+
+class ComprovanteStorage(FileSystemStorage):
+    """FileSystemStorage que grava os comprovantes pelo hash do conteúdo."""
+
+    def _save(self, name, content):
+        if not name.startswith(PREFIXO) or name.startswith(PASTA_BLOBS):
+            return super()._save(name, content)
+
+        tmp_dir = self.path(f"{PREFIXO}tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        sha = hashlib.sha256()
+        tamanho = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    tamanho += len(chunk)
+                    tmp.write(chunk)
+
+            nome = nome_blob(sha.hexdigest(), os.path.splitext(name)[1])
+            destino = self.path(nome)
+            reaproveitado = os.path.exists(destino)
+            observar_cache("blob", reaproveitado)
+            if reaproveitado:
+                os.remove(tmp_path)  # conteúdo já existe: reaproveita
+                os.utime(destino)  # ver RECENTE_S
+            else:
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                os.replace(tmp_path, destino)
+                if self.file_permissions_mode is not None:
+                    os.chmod(destino, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        _registrar_blob(nome, sha.hexdigest(), tamanho)
+        return nome
+
+    def get_available_name(self, name, max_length=None):
+        # o nome final de um comprovante vem do hash (ver _save)
+        if name.startswith(PREFIXO):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+
+def _registrar_blob(nome: str, sha256: str, tamanho: int) -> None:
+    """Garante a linha do blob (refs=0: a referência vem do save do model)."""
+    from .models import Blob
+
+    if Blob.objects.filter(nome=nome).exists():
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(nome=nome, sha256=sha256, tamanho=tamanho)
+    except IntegrityError:
+        # upload concorrente do mesmo conteúdo criou a linha antes
+        Blob.objects.get(nome=nome)
+
+
+def mover_referencia(antigo: str | None, novo: str | None, storage=None) -> None:
+    """
+    Passa uma referência do arquivo `antigo` para o `novo` (qualquer um pode
+    ser vazio). Chamado no save/delete dos models, dentro da transação; o
+    arquivo antigo só é apagado depois do commit, se ficou sem referências.
+    """
+    from .models import Blob
+
+    if antigo == novo:
+        return
+    with transaction.atomic():
+        if novo:
+            Blob.objects.filter(nome=novo).update(refs=F("refs") + 1)
+        if antigo:
+            Blob.objects.filter(nome=antigo, refs__gt=0).update(refs=F("refs") - 1)
+            transaction.on_commit(partial(_apagar_se_orfao, antigo, storage or default_storage), robust=True)
+
+
+def repontar(antigo: str, novo: str, tamanho: int) -> int:
+    """
+    Aponta para o blob `novo` todos os registros que usam `antigo` (ex.:
+    depois da recompressão) e move as referências. O arquivo antigo fica sem
+    referências e sai no gc_comprovantes. Retorna quantos registros mudaram.
+    """
+    from django.apps import apps
+
+    from .models import MODELOS, Blob
+
+    sha256 = os.path.splitext(os.path.basename(novo))[0]
+    with transaction.atomic():
+        _registrar_blob(novo, sha256, tamanho)
+        qtd = sum(
+            apps.get_model(label).objects.filter(comprovante=antigo).update(comprovante=novo)
+            for label in MODELOS.values()
+        )
+        Blob.objects.filter(nome=novo).update(refs=F("refs") + qtd)
+        Blob.objects.filter(nome=antigo).update(refs=0)
+    return qtd
+
+
+def _recente(storage, nome: str) -> bool:
+    try:
+        return time.time() - os.path.getmtime(storage.path(nome)) < RECENTE_S
+    except (FileNotFoundError, NotImplementedError):
+        return False
+
+
+def _apagar_se_orfao(nome: str, storage) -> None:
+    """Apaga o arquivo (e a miniatura) se nenhum registro aponta mais para ele."""
+    from .models import Blob
+    from .previews import apagar_preview
+
+    preview = ""
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(nome=nome).first()
+        if blob is not None:
+            if blob.refs > 0 or _recente(storage, nome):
+                return
+            preview = blob.preview
+            blob.delete()
+    if storage.exists(nome):
+        storage.delete(nome)
+    apagar_preview(nome, storage, preview)
+
+
+def recontar_referencias(lote: int = 1000) -> int:
+    """
+    Recalcula Blob.refs a partir dos registros (saves que não passam pelos
+    sinais, como queryset.update, ou processos interrompidos). Retorna
+    quantos blobs foram corrigidos.
+    """
+    from django.apps import apps
+
+    from .models import MODELOS, Blob
+
+    modelos = [apps.get_model(label) for label in MODELOS.values()]
+    corrigidos, ultimo = 0, 0
+    while True:
+        with transaction.atomic():
+            # trava o lote: um save concorrente espera ou já está contado
+            blobs = list(
+                Blob.objects.select_for_update().filter(pk__gt=ultimo)
+                .order_by("pk").values_list("pk", "nome", "refs")[:lote]
+            )
+            if not blobs:
+                return corrigidos
+            ultimo = blobs[-1][0]
+            nomes = [nome for _, nome, _ in blobs]
+            contagem = Counter()
+            for model in modelos:
+                contagem.update(dict(
+                    model.objects.filter(comprovante__in=nomes).order_by()
+                    .values_list("comprovante").annotate(n=Count("pk"))
+                ))
+            for pk, nome, refs in blobs:
+                if contagem[nome] != refs:
+                    Blob.objects.filter(pk=pk).update(refs=contagem[nome])
+                    corrigidos += 1
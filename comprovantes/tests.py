@@ -0,0 +1,394 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from cadastros.models import Cliente
+from comprovantes import signals
+from comprovantes.compactacao import _imagem
+from comprovantes.models import Blob
+from comprovantes.previews import _gerar_da_fila, gerar_preview, preview_existente
+from comprovantes.storage import PASTA_BLOBS, RECENTE_S, _registrar_blob, recontar_referencias
+from comprovantes.views import midia_publica
+from financeiro.models import Despesa
+from testes.apoio import SEM_MANIFESTO
+
+PDF = b"%PDF-1.4 comprovante de teste"
+
+
+def _acertos(cache: str) -> dict:
+    return {
+        r: REGISTRY.get_sample_value("lotesys_cache_total", {"cache": cache, "resultado": r}) or 0
+        for r in ("hit", "miss")
+    }
+
+
+class MidiaTemporariaTestCase(TestCase):
+    """MEDIA_ROOT num diretório temporário, apagado no fim de cada teste; sem miniaturas."""
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp(prefix="lotesys-midia-")
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        ajuste = override_settings(MEDIA_ROOT=pasta)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        sem_previews = mock.patch("comprovantes.signals.agendar_preview")
+        sem_previews.start()
+        self.addCleanup(sem_previews.stop)
+
+    def despesa(self, conteudo=PDF, nome="recibo.pdf") -> Despesa:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Despesa.objects.create(
+                categoria="CUSTO", descricao="Teste", valor=Decimal("10"),
+                comprovante=ContentFile(conteudo, name=nome),
+            )
+
+    def envelhecer(self, nome: str) -> None:
+        antigo = time.time() - RECENTE_S - 60
+        os.utime(default_storage.path(nome), (antigo, antigo))
+
+    def refs(self, nome: str) -> int:
+        return Blob.objects.get(nome=nome).refs
+
+
+class ReferenciasTests(MidiaTemporariaTestCase):
+    def test_mesmo_conteudo_grava_um_arquivo(self):
+        antes = _acertos("blob")
+        a, b = self.despesa(), self.despesa(nome="outro.pdf")
+        depois = _acertos("blob")
+        self.assertEqual((depois["miss"] - antes["miss"], depois["hit"] - antes["hit"]), (1, 1))
+        self.assertEqual(a.comprovante.name, b.comprovante.name)
+        self.assertTrue(a.comprovante.name.startswith(PASTA_BLOBS))
+        self.assertEqual(self.refs(a.comprovante.name), 2)
+
+    def test_reenviar_o_mesmo_arquivo_nao_soma_referencia(self):
+        d = self.despesa()
+        with self.captureOnCommitCallbacks(execute=True):
+            d.comprovante = ContentFile(PDF, name="de-novo.pdf")
+            d.save()
+        self.assertEqual(self.refs(d.comprovante.name), 1)
+
+    def test_excluir_solta_referencia_e_apaga_o_ultimo(self):
+        a, b = self.despesa(), self.despesa()
+        nome = a.comprovante.name
+        self.envelhecer(nome)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            a.delete()
+        self.assertEqual(self.refs(nome), 1)
+        self.assertTrue(default_storage.exists(nome))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertFalse(Blob.objects.filter(nome=nome).exists())
+        self.assertFalse(default_storage.exists(nome))
+
+    def test_trocar_arquivo_move_referencia(self):
+        d = self.despesa()
+        antigo = d.comprovante.name
+        self.envelhecer(antigo)
+        with self.captureOnCommitCallbacks(execute=True):
+            d.comprovante = ContentFile(b"outro conteudo", name="novo.pdf")
+            d.save()
+        self.assertEqual(self.refs(d.comprovante.name), 1)
+        self.assertFalse(default_storage.exists(antigo))
+
+    def test_arquivo_recente_sem_referencia_fica_para_o_gc(self):
+        d = self.despesa()
+        nome = d.comprovante.name
+        with self.captureOnCommitCallbacks(execute=True):
+            d.delete()
+        self.assertEqual(self.refs(nome), 0)
+        self.assertTrue(default_storage.exists(nome))
+
+    def test_rollback_desfaz_a_contagem(self):
+        d = self.despesa()
+        nome = d.comprovante.name
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.despesa()
+            self.assertEqual(self.refs(nome), 2)
+            raise RuntimeError
+        self.assertEqual(self.refs(nome), 1)
+
+    def test_linha_criada_por_upload_concorrente(self):
+        self.despesa()
+        blob = Blob.objects.get()
+        # o SELECT não vê a linha; o INSERT esbarra no nome único
+        with mock.patch.object(QuerySet, "exists", return_value=False):
+            _registrar_blob(blob.nome, blob.sha256, blob.tamanho)
+        self.assertEqual(Blob.objects.get().refs, 1)
+
+    def test_recontar_corrige_contagem(self):
+        d = self.despesa()
+        Blob.objects.update(refs=5)
+        Despesa.objects.filter(pk=d.pk).update(comprovante="")  # não passa pelos sinais
+        self.assertEqual(recontar_referencias(), 1)
+        self.assertEqual(Blob.objects.get().refs, 0)
+
+
+class RastreiaOriginaisTests(MidiaTemporariaTestCase):
+    def test_original_vem_do_carregamento_sem_select(self):
+        nome = self.despesa().comprovante.name
+        d = Despesa.objects.get()
+        with self.assertNumQueries(0):
+            d.comprovante = "outro.pdf"
+            self.assertEqual(d.valor_original("comprovante"), nome)
+            self.assertEqual(d.campos_alterados(), {"comprovante"})
+            self.assertEqual(d.arquivo_original("comprovante").name, nome)
+
+    def test_save_vira_o_novo_original(self):
+        d = self.despesa()
+        with self.captureOnCommitCallbacks(execute=True):
+            d.comprovante = ContentFile(b"outro conteudo", name="novo.pdf")
+            d.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(d.valor_original("comprovante"), d.comprovante.name)
+            self.assertFalse(d.campo_alterado("comprovante"))
+
+    def test_campo_adiado_cai_para_consulta(self):
+        nome = self.despesa().comprovante.name
+        d = Despesa.objects.only("descricao").get()
+        with self.assertNumQueries(1):
+            self.assertEqual(d.valor_original("comprovante"), nome)
+
+    def test_instancia_nova(self):
+        d = Despesa(categoria="CUSTO", descricao="Nova", valor=Decimal("1"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(d.valor_original("comprovante"))
+            self.assertTrue(d.campo_alterado("comprovante"))
+
+    def test_arquivo_antigo_so_sai_depois_do_commit(self):
+        d = self.despesa()
+        antigo = d.comprovante.name
+        self.envelhecer(antigo)
+        with self.captureOnCommitCallbacks() as callbacks:
+            d.comprovante = ContentFile(b"outro conteudo", name="novo.pdf")
+            d.save()
+        self.assertTrue(default_storage.exists(antigo))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(default_storage.exists(antigo))
+
+    def test_rollback_mantem_o_arquivo_antigo(self):
+        d = self.despesa()
+        antigo = d.comprovante.name
+        self.envelhecer(antigo)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                d.comprovante = ContentFile(b"outro conteudo", name="novo.pdf")
+                d.save()
+                raise RuntimeError
+        self.assertTrue(default_storage.exists(antigo))
+        self.assertEqual(self.refs(antigo), 1)
+        self.assertEqual(Despesa.objects.get().comprovante.name, antigo)
+
+
+class DownloadTests(MidiaTemporariaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.d = self.despesa()
+        self.url = reverse("comprovantes:baixar", args=["despesa", self.d.pk])
+        self.client.force_login(get_user_model().objects.create_user("staff", password="x", is_staff=True))
+
+    def test_sem_permissao(self):
+        self.client.force_login(get_user_model().objects.create_user("comum", password="x"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_arquivo_inteiro_com_etag_do_blob(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content), PDF)
+        self.assertEqual(resp["ETag"], f'"{hashlib.sha256(PDF).hexdigest()}"')
+        self.assertIn("immutable", resp["Cache-Control"])
+        resp.close()
+
+    def test_range(self):
+        resp = self.client.get(self.url, headers={"Range": "bytes=0-3"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp["Content-Range"], f"bytes 0-3/{len(PDF)}")
+        self.assertEqual(b"".join(resp.streaming_content), PDF[:4])
+
+        resp = self.client.get(self.url, headers={"Range": "bytes=-4"})
+        self.assertEqual(b"".join(resp.streaming_content), PDF[-4:])
+
+    def test_range_invalido(self):
+        resp = self.client.get(self.url, headers={"Range": f"bytes={len(PDF)}-"})
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], f"bytes */{len(PDF)}")
+
+    def test_if_none_match(self):
+        etag = f'"{hashlib.sha256(PDF).hexdigest()}"'
+        antes = _acertos("etag")["hit"]
+        resp = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(_acertos("etag")["hit"], antes + 1)
+        self.assertEqual(resp["ETag"], etag)
+
+    @override_settings(COMPROVANTES_ACCEL="nginx", COMPROVANTES_ACCEL_PREFIXO="/protegido/")
+    def test_x_accel_redirect(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["X-Accel-Redirect"], f"/protegido/{self.d.comprovante.name}")
+        self.assertEqual(resp.content, b"")
+
+    @override_settings(COMPROVANTES_ACCEL="apache")
+    def test_x_sendfile(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp["X-Sendfile"], default_storage.path(self.d.comprovante.name))
+        self.assertEqual(resp.content, b"")
+
+
+class MidiaPublicaTests(MidiaTemporariaTestCase):
+    def get(self, caminho):
+        return midia_publica(RequestFactory().get(f"/media/{caminho}"), caminho)
+
+    def test_serve_o_que_e_publico(self):
+        default_storage.save("mural/aviso.txt", ContentFile(b"ok"))
+        resp = self.get("mural/aviso.txt")
+        self.assertEqual(b"".join(resp.streaming_content), b"ok")
+        resp.close()
+
+    def test_recusa_comprovantes_mesmo_com_ponto_ponto(self):
+        nome = self.despesa().comprovante.name
+        for caminho in (nome, f"x/../{nome}", f"./{nome}", f"mural/../../media/{nome}", "../settings.py"):
+            with self.subTest(caminho=caminho), self.assertRaises(Http404):
+                self.get(caminho)
+
+
+def _png(lado=800) -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (lado, lado // 2), "white").save(out, "PNG")
+    return out.getvalue()
+
+
+@SEM_MANIFESTO
+class PreviewTests(MidiaTemporariaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@a.com", "x"))
+
+    def test_sinal_so_nos_models_com_comprovante(self):
+        Cliente.objects.create(nome="Sem comprovante", cpf_cnpj="00000000001")
+        signals.agendar_preview.assert_not_called()
+        d = self.despesa(_png(), "foto.png")
+        signals.agendar_preview.assert_called_once_with(d.comprovante.name)
+
+    def test_gerar_grava_o_nome_devolvido_pelo_storage(self):
+        d = self.despesa(_png(), "foto.png")
+        salvo = gerar_preview(d.comprovante.name)
+        self.assertEqual(Blob.objects.get().preview, salvo)
+        self.assertEqual(preview_existente(d.comprovante.name), salvo)
+
+    def test_view_sem_miniatura_enfileira_e_responde_404(self):
+        d = self.despesa(_png(), "foto.png")
+        url = reverse("comprovantes:preview", args=["despesa", d.pk])
+        with mock.patch("comprovantes.views.enfileirar_preview") as enfileirar:
+            self.assertEqual(self.client.get(url).status_code, 404)
+        enfileirar.assert_called_once_with(d.comprovante.name)
+
+        gerar_preview(d.comprovante.name)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "image/png")
+        resp.close()
+
+    def test_miniatura_nao_sai_por_media(self):
+        d = self.despesa(_png(), "foto.png")
+        salvo = gerar_preview(d.comprovante.name)
+        for caminho in (salvo, f"x/../{salvo}"):
+            with self.subTest(caminho=caminho), self.assertRaises(Http404):
+                midia_publica(RequestFactory().get(f"/media/{caminho}"), caminho)
+
+    def test_fila_renova_conexao_e_registra_falha(self):
+        with mock.patch("comprovantes.previews.close_old_connections") as fechar, \
+                mock.patch("comprovantes.previews.gerar_preview", side_effect=RuntimeError("caiu")), \
+                self.assertLogs("comprovantes.previews", "ERROR"):
+            _gerar_da_fila("comprovantes/blobs/x.png")
+        self.assertEqual(fechar.call_count, 2)
+
+
+def _jpeg_pesado() -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.effect_noise((600, 600), 60).convert("RGB").save(out, "JPEG", quality=100)
+    return out.getvalue()
+
+
+class CompactacaoTests(MidiaTemporariaTestCase):
+    def test_compactar_grava_blob_novo_e_aponta_os_registros(self):
+        foto = _jpeg_pesado()
+        a, b = self.despesa(foto, "foto.jpg"), self.despesa(foto, "outra.jpg")
+        antigo = a.comprovante.name
+        with open(default_storage.path(antigo), "rb") as f:
+            original = f.read()
+        checkpoint = os.path.join(settings.MEDIA_ROOT, "ckpt.json")
+
+        call_command("compactar_comprovantes", workers=1, checkpoint=checkpoint, stdout=io.StringIO())
+
+        a.refresh_from_db()
+        b.refresh_from_db()
+        novo = a.comprovante.name
+        self.assertNotEqual(novo, antigo)
+        self.assertEqual(b.comprovante.name, novo)
+        with default_storage.open(novo) as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), os.path.splitext(os.path.basename(novo))[0])
+        self.assertEqual((self.refs(novo), self.refs(antigo)), (2, 0))
+        # o blob antigo continua intacto até o GC
+        with open(default_storage.path(antigo), "rb") as f:
+            self.assertEqual(f.read(), original)
+
+    def test_png_nao_e_redimensionado(self):
+        from PIL import Image
+
+        pasta = settings.MEDIA_ROOT
+        origem, destino = os.path.join(pasta, "a.png"), os.path.join(pasta, "b.png")
+        Image.new("RGB", (1200, 300), "white").save(origem, "PNG")
+        _imagem(origem, destino, ".png", 82, lado_max=100)
+        with Image.open(destino) as img:
+            self.assertEqual(img.size, (1200, 300))
+
+
+class GcEndpointTests(TestCase):
+    url = "/comprovantes/gc/"
+
+    def _esperar_gc(self):
+        for t in threading.enumerate():
+            if t.name == "gc_comprovantes":
+                t.join(5)
+
+    @mock.patch.dict(os.environ, {"TASK_TRIGGER_TOKEN": "segredo"})
+    def test_token(self):
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        self.assertEqual(self.client.post(f"{self.url}?token=errado").status_code, 403)
+        self.assertEqual(self.client.get(f"{self.url}?token=segredo").status_code, 405)
+
+    @mock.patch.dict(os.environ, {"TASK_TRIGGER_TOKEN": ""})
+    def test_sem_token_configurado_recusa(self):
+        self.assertEqual(self.client.post(f"{self.url}?token=").status_code, 403)
+
+    @mock.patch.dict(os.environ, {"TASK_TRIGGER_TOKEN": "segredo"})
+    def test_roda_o_gc_em_segundo_plano(self):
+        with mock.patch("comprovantes.views.call_command") as comando:
+            self.assertEqual(self.client.post(f"{self.url}?token=segredo").status_code, 202)
+            self._esperar_gc()
+        comando.assert_called_once_with("gc_comprovantes")
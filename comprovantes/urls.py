@@ -0,0 +1,11 @@
+# comprovantes/urls.py
+from django.urls import path
+from . import views
+
+app_name = "comprovantes"
+
+urlpatterns = [
+    path("gc/", views.gc, name="gc"),
+    path("<str:modelo>/<int:pk>/", views.baixar, name="baixar"),
+    path("<str:modelo>/<int:pk>/preview/", views.preview, name="preview"),
+]
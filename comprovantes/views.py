@@ -0,0 +1,263 @@
+# comprovantes/views.py
+"""
+Download de comprovantes com checagem de permissão.
+
+- Com um proxy na frente (COMPROVANTES_ACCEL = "nginx" ou "apache"), a view
+  só autoriza e devolve X-Accel-Redirect / X-Sendfile: o worker não fica
+  preso durante a transferência.
+- Sem proxy, usa FileResponse (wsgi.file_wrapper/sendfile quando o servidor
+  suporta) com Range, ETag/If-None-Match e cache longo para blobs, que nunca
+  mudam de conteúdo (o nome é o SHA-256, ver comprovantes.storage).
+"""
+from __future__ import annotations
+
+import hmac
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.management import call_command
+from django.db import close_old_connections
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from django.views.static import serve
+
+from monitoramento.metricas import observar_cache
+
+from .models import MODELOS
+from .previews import PASTA_PREVIEWS, enfileirar_preview, preview_existente, tem_preview
+from .storage import PASTA_BLOBS
+
+_POR_LABEL = {label.lower(): nome for nome, label in MODELOS.items()}
+
+# só saem pelas views com permissão (baixar/preview), nunca por /media/
+PASTAS_PRIVADAS = {"comprovantes", PASTA_PREVIEWS}
+
+BLOCO = 64 * 1024
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def url_comprovante(obj) -> str:
+    """URL de download do comprovante de `obj` (Venda, Parcela, Despesa ou ReceitaExtra)."""
+    return reverse("comprovantes:baixar", args=[_POR_LABEL[obj._meta.label_lower], obj.pk])
+
+
+def url_preview(obj) -> str:
+    return reverse("comprovantes:preview", args=[_POR_LABEL[obj._meta.label_lower], obj.pk])
+
+
+def miniatura_html(obj, altura: int = 64) -> str:
+    """Miniatura clicável (abre o arquivo original); usada no admin."""
+    return format_html(
+        '<a href="{}" target="_blank" title="ver/baixar">'
+        '<img src="{}" alt="ver/baixar" loading="lazy" style="max-height:{}px;max-width:{}px;border:1px solid #ddd">'
+        "</a>",
+        url_comprovante(obj), url_preview(obj), altura, altura * 2,
+    )
+
+
+def _pode_ver(user, model) -> bool:
+    opts = model._meta
+    return user.is_staff or user.has_perm(f"{opts.app_label}.view_{opts.model_name}")
+
+
+def _etag(nome: str, st: os.stat_result, imutavel: bool) -> str:
+    if imutavel:
+        # nome do blob/preview = hash do conteúdo original
+        return quote_etag(os.path.splitext(os.path.basename(nome))[0])
+    return quote_etag(f"{st.st_size:x}-{int(st.st_mtime):x}")
+
+
+def _faixa(range_header: str, tamanho: int):
+    """(inicio, fim) inclusivo de um Range de faixa única; None = ignorar; False = inválido."""
+    m = _RANGE.match(range_header.strip())
+    if not m:
+        return None  # várias faixas/unidade desconhecida: devolve o arquivo inteiro
+    ini, fim = m.groups()
+    if ini == "":
+        if fim == "" or int(fim) == 0:
+            return False
+        return max(tamanho - int(fim), 0), tamanho - 1
+    ini = int(ini)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if ini > fim or ini >= tamanho:
+        return False
+    return ini, fim
+
+
+def _ler(caminho: str, inicio: int, quantidade: int):
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        while quantidade > 0:
+            chunk = f.read(min(BLOCO, quantidade))
+            if not chunk:
+                break
+            quantidade -= len(chunk)
+            yield chunk
+
+
+def _comprovante(request, modelo: str, pk: int):
+    """Objeto com comprovante que o usuário pode ver (ou PermissionDenied/404)."""
+    if modelo not in MODELOS:
+        raise Http404
+    model = apps.get_model(MODELOS[modelo])
+    if not _pode_ver(request.user, model):
+        raise PermissionDenied("Sem permissão para ver este comprovante.")
+    obj = get_object_or_404(model.objects.only("pk", "comprovante"), pk=pk)
+    if not obj.comprovante:
+        raise Http404("Sem comprovante.")
+    return obj
+
+
+@login_required
+@require_safe
+def baixar(request, modelo: str, pk: int):
+    obj = _comprovante(request, modelo, pk)
+    nome = obj.comprovante.name
+    ext = os.path.splitext(nome)[1].lower()
+    return _servir(
+        request, nome, f"comprovante-{modelo}-{obj.pk}{ext}",
+        imutavel=nome.startswith(PASTA_BLOBS),
+    )
+
+
+@login_required
+@require_safe
+def preview(request, modelo: str, pk: int):
+    """Miniatura PNG do comprovante; a que ainda não existe vai para a fila (404 por ora)."""
+    obj = _comprovante(request, modelo, pk)
+    nome = preview_existente(obj.comprovante.name)
+    observar_cache("preview", bool(nome))
+    if not nome:
+        if tem_preview(obj.comprovante.name):
+            enfileirar_preview(obj.comprovante.name)
+        raise Http404("Sem pré-visualização para este arquivo.")
+    return _servir(
+        request, nome, f"comprovante-{modelo}-{obj.pk}.png",
+        imutavel=obj.comprovante.name.startswith(PASTA_BLOBS),
+    )
+
+
+def _servir(request, nome: str, nome_download: str, *, imutavel: bool):
+    """Entrega `nome` (do storage padrão) via proxy ou FileResponse com Range/ETag."""
+    try:
+        caminho = default_storage.path(nome)
+        st = os.stat(caminho)
+    except (NotImplementedError, FileNotFoundError):
+        raise Http404("Arquivo não encontrado.")
+
+    etag = _etag(nome, st, imutavel)
+    cabecalhos = {
+        "ETag": etag,
+        "Cache-Control": (
+            "private, max-age=31536000, immutable" if imutavel else "private, max-age=3600"
+        ),
+    }
+
+    # cache do navegador: 304 = hit, arquivo enviado = miss
+    em_cache = etag in parse_etags(request.headers.get("If-None-Match", ""))
+    observar_cache("etag", em_cache)
+    if em_cache:
+        resp = HttpResponseNotModified()
+        for k, v in cabecalhos.items():
+            resp[k] = v
+        return resp
+
+    disposicao = f"inline; filename*=UTF-8''{quote(nome_download)}"
+
+    accel = getattr(settings, "COMPROVANTES_ACCEL", "")
+    if accel in ("nginx", "apache"):
+        resp = HttpResponse(content_type="")  # o proxy define o tipo
+        if accel == "nginx":
+            prefixo = settings.COMPROVANTES_ACCEL_PREFIXO.rstrip("/")
+            resp["X-Accel-Redirect"] = quote(f"{prefixo}/{nome}")
+        else:
+            resp["X-Sendfile"] = caminho
+        resp["Content-Disposition"] = disposicao
+        for k, v in cabecalhos.items():
+            resp[k] = v
+        return resp
+    faixa = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        faixa = _faixa(range_header, st.st_size)
+    if faixa is False:
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{st.st_size}"
+        return resp
+
+    if faixa:
+        inicio, fim = faixa
+        resp = StreamingHttpResponse(_ler(caminho, inicio, fim - inicio + 1), status=206)
+        resp["Content-Range"] = f"bytes {inicio}-{fim}/{st.st_size}"
+        resp["Content-Length"] = str(fim - inicio + 1)
+        resp["Content-Type"] = mimetypes.guess_type(nome_download)[0] or "application/octet-stream"
+    else:
+        resp = FileResponse(open(caminho, "rb"), filename=nome_download)
+
+    resp["Accept-Ranges"] = "bytes"
+    resp["Content-Disposition"] = disposicao
+    for k, v in cabecalhos.items():
+        resp[k] = v
+    return resp
+
+
+@require_safe
+def midia_publica(request, path: str):
+    """
+    /media/ servido pelo Django (DEBUG ou SERVE_MEDIA), sem as pastas
+    privadas. O caminho é normalizado antes da checagem: `x/../comprovantes/`
+    também é recusado.
+    """
+    normalizado = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+    if normalizado.startswith("..") or normalizado.split("/", 1)[0] in PASTAS_PRIVADAS:
+        raise Http404
+    return serve(request, normalizado, document_root=settings.MEDIA_ROOT)
+
+
+# ---------- limpeza (gc_comprovantes) no serviço que tem o disco ----------
+_gc_rodando = threading.Lock()
+
+
+def _rodar_gc() -> None:
+    try:
+        call_command("gc_comprovantes")
+    finally:
+        close_old_connections()
+        _gc_rodando.release()
+
+
+@csrf_exempt
+@require_POST
+def gc(request):
+    """
+    POST /comprovantes/gc/?token=<TASK_TRIGGER_TOKEN>: roda o gc_comprovantes
+    em segundo plano neste processo (o disco de mídia só está montado no
+    serviço web). 202 se iniciou, 409 se já está rodando.
+    """
+    esperado = os.getenv("TASK_TRIGGER_TOKEN", "")
+    if not esperado or not hmac.compare_digest(request.GET.get("token", ""), esperado):
+        raise PermissionDenied
+    if not _gc_rodando.acquire(blocking=False):
+        return HttpResponse("gc_comprovantes já está rodando.\n", status=409, content_type="text/plain")
+    threading.Thread(target=_rodar_gc, name="gc_comprovantes", daemon=True).start()
+    return HttpResponse("gc_comprovantes iniciado.\n", status=202, content_type="text/plain")
@@ -0,0 +1,11 @@
+# config/gunicorn.py
+# Configuração do gunicorn (ver start.sh).
+import os
+
+
+def child_exit(server, worker):
+    # métricas multiprocesso: descarta os gauges "vivos" do worker que saiu
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
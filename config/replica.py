@@ -0,0 +1,153 @@
+# config/replica.py
+"""
+Réplica de leitura opcional (DATABASE_REPLICA_URL vira o alias "replica").
+
+Nada vai para a réplica por padrão: só o que roda dentro de
+`usar_replica()` (views marcadas com @somente_leitura, menus do bot,
+rotinas do agendador com replica=True). Escritas vão sempre para o
+primário, e depois de uma escrita:
+
+- o resto do mesmo request/rotina volta a ler do primário;
+- o navegador recebe um cookie curto (REPLICA_FIXAR_S) e suas próximas
+  páginas também leem do primário, cobrindo o atraso da replicação.
+
+Sessões, usuários e permissões são sempre lidos do primário.
+Sem o alias "replica", tudo isso é no-op.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+COOKIE_FIXAR = "lotesys_primario"
+SEMPRE_PRIMARIO = {"sessions", "auth", "contenttypes", "admin"}
+
+
+class _Escritas:
+    """Marca compartilhada por um request/rotina (sobrevive a sync_to_async)."""
+    __slots__ = ("houve",)
+
+    def __init__(self):
+        self.houve = False
+
+
+_ler_da_replica: contextvars.ContextVar[bool] = contextvars.ContextVar("lotesys_ler_da_replica", default=False)
+_escritas: contextvars.ContextVar[_Escritas | None] = contextvars.ContextVar("lotesys_escritas", default=None)
+
+
+def replica_configurada() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+def houve_escrita() -> bool:
+    marca = _escritas.get()
+    return marca is not None and marca.houve
+
+
+@contextmanager
+def rastrear_escritas():
+    """Abre um escopo de leitura-das-próprias-escritas (um request, uma rotina)."""
+    token = _escritas.set(_Escritas())
+    try:
+        yield _escritas.get()
+    finally:
+        _escritas.reset(token)
+
+
+@contextmanager
+def usar_replica(ativo: bool = True):
+    """Leituras do bloco vão para a réplica (se configurada e ainda sem escrita)."""
+    token_leitura = _ler_da_replica.set(ativo)
+    token_escritas = _escritas.set(_Escritas()) if _escritas.get() is None else None
+    try:
+        yield
+    finally:
+        if token_escritas is not None:
+            _escritas.reset(token_escritas)
+        _ler_da_replica.reset(token_leitura)
+
+
+def somente_leitura(view):
+    """
+    Decorator de view: lê da réplica, exceto para quem gravou há pouco
+    (cookie de FixarPrimarioMiddleware).
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def _aview(request, *args, **kwargs):
+            with usar_replica(COOKIE_FIXAR not in request.COOKIES):
+                return await view(request, *args, **kwargs)
+        return _aview
+
+    @functools.wraps(view)
+    def _view(request, *args, **kwargs):
+        with usar_replica(COOKIE_FIXAR not in request.COOKIES):
+            return view(request, *args, **kwargs)
+    return _view
+
+
+class RoteadorReplica:
+    def db_for_read(self, model, **hints):
+        if not _ler_da_replica.get() or not replica_configurada():
+            return None
+        if model._meta.app_label in SEMPRE_PRIMARIO or houve_escrita():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # dentro de transação, lê o que ela vê
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        marca = _escritas.get()
+        if marca is not None:
+            marca.houve = True
+        # explícito: senão o Django grava no banco de onde a instância veio
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA  # a réplica recebe o schema do primário
+
+
+class FixarPrimarioMiddleware:
+    """
+    Depois de um request que gravou, fixa o navegador no primário por
+    settings.REPLICA_FIXAR_S segundos (cookie). Fica por último na lista:
+    o que os middlewares de fora gravam (sessão, mensagens) não conta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with rastrear_escritas() as escritas:
+            response = self.get_response(request)
+        return self._fixar(response, escritas)
+
+    async def __acall__(self, request):
+        with rastrear_escritas() as escritas:
+            response = await self.get_response(request)
+        return self._fixar(response, escritas)
+
+    def _fixar(self, response, escritas):
+        if escritas.houve and replica_configurada():
+            response.set_cookie(
+                COOKIE_FIXAR, "1", max_age=getattr(settings, "REPLICA_FIXAR_S", 15),
+                httponly=True, samesite="Lax",
+            )
+        return response
@@ -54,10 +54,14 @@ INSTALLED_APPS = [
     "financeiro",
     "mural.apps.MuralConfig",
     "notificacoes",
+    "comprovantes",
+    "monitoramento",
 ]
 
 # ===================== MIDDLEWARE =====================
 MIDDLEWARE = [
+    # primeiro: mede o request inteiro (ver monitoramento.middleware)
+    "monitoramento.middleware.InstrumentacaoMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -66,6 +70,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # por último: só escritas da view fixam o navegador no primário
+    "config.replica.FixarPrimarioMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -113,6 +119,60 @@ else:
         }
     }
 
+# Réplica de leitura opcional: dashboards, relatórios e menus do bot leem
+# dela (config/replica.py). Nos testes espelha o "default" (TEST MIRROR).
+if os.getenv("DATABASE_REPLICA_URL"):
+    _replica = os.environ["DATABASE_REPLICA_URL"]
+    DATABASES["replica"] = dj_database_url.parse(
+        _replica,
+        conn_max_age=600,
+        ssl_require=_replica.startswith("postgres"),
+    )
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["config.replica.RoteadorReplica"]
+# Segundos que um navegador lê do primário depois de gravar algo
+REPLICA_FIXAR_S = int(os.getenv("DATABASE_REPLICA_FIXAR_S", "15"))
+
+# SQLite para vários workers/threads num só nó: WAL e demais PRAGMAs aplicados
+# em cada conexão nova e BEGIN IMMEDIATE nas escritas (config/sqlite.py).
+SQLITE_OTIMIZADO = os.getenv("SQLITE_OTIMIZADO", "False") == "True"
+if SQLITE_OTIMIZADO and DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+    from config.sqlite import opcoes_otimizadas
+
+    DATABASES["default"]["OPTIONS"] = {**DATABASES["default"].get("OPTIONS", {}), **opcoes_otimizadas()}
+
+# ===================== MONITORAMENTO =====================
+# Orçamento por request: acima disso o log sai como WARNING (0 = sem limite).
+# Por padrão só esses aparecem; MONITOR_LOG_LEVEL=INFO loga todo request.
+MONITORAMENTO = {
+    "MAX_CONSULTAS": int(os.getenv("MONITOR_MAX_CONSULTAS", "30")),
+    "MAX_MS": float(os.getenv("MONITOR_MAX_MS", "800")),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simples": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simples"},
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "monitoramento": {
+            "handlers": ["console"],
+            "level": os.getenv("MONITOR_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# ===================== AGENDADOR =====================
+# `manage.py scheduler`: troca a expressão cron de uma rotina pelo nome
+# ("" desliga). Rotinas e horários padrão em notificacoes/agendador.py.
+AGENDADOR_CRON: dict[str, str] = {}
+
 # ===================== PASSWORDS =====================
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -133,7 +193,8 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
 STORAGES = {
-    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # comprovantes deduplicados por SHA-256 (ver comprovantes.storage)
+    "default": {"BACKEND": "comprovantes.storage.ComprovanteStorage"},
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
@@ -143,6 +204,14 @@ STORAGES = {
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Download de comprovantes (comprovantes.views.baixar). Com proxy na frente:
+#   "nginx"  -> X-Accel-Redirect para COMPROVANTES_ACCEL_PREFIXO (location `internal`
+#               apontando para MEDIA_ROOT)
+#   "apache" -> X-Sendfile com o caminho absoluto (mod_xsendfile)
+# Vazio: o próprio Django entrega o arquivo (FileResponse com Range/ETag).
+COMPROVANTES_ACCEL = os.getenv("COMPROVANTES_ACCEL", "")
+COMPROVANTES_ACCEL_PREFIXO = os.getenv("COMPROVANTES_ACCEL_PREFIXO", "/protected-media/")
+
 # ===================== DEFAULTS =====================
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -0,0 +1,52 @@
+# config/sqlite.py
+"""
+Modo SQLite para concorrência (opt-in com SQLITE_OTIMIZADO=True, só quando
+não há DATABASE_URL). Sem isso o SQLite usa rollback journal: um escritor
+bloqueia todos os leitores e escritas concorrentes falham com
+"database is locked".
+
+- WAL: leitores não esperam o escritor (e vice-versa);
+- synchronous=NORMAL: seguro em WAL, sem fsync a cada commit;
+- busy_timeout: espera a vez em vez de falhar na hora;
+- mmap/cache/temp_store: menos syscalls e menos disco em consultas grandes.
+
+Os PRAGMAs vão em OPTIONS["init_command"] (o Django os executa em cada
+conexão nova) e as transações de escrita usam BEGIN IMMEDIATE
+(OPTIONS["transaction_mode"]): o lock de escrita é pego no início do
+atomic(), então o busy_timeout vale; com BEGIN (DEFERRED) quem lê e depois
+escreve pode receber SQLITE_BUSY na hora, sem esperar. As duas opções
+exigem Django >= 5.1.
+
+Medição: `python manage.py sqlite_concorrencia`.
+"""
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -20000,  # negativo = KiB (~20 MB por conexão)
+    "temp_store": "MEMORY",
+}
+
+
+def _comandos(pragmas: dict) -> list[str]:
+    return [f"PRAGMA {nome} = {valor}" for nome, valor in pragmas.items()]
+
+
+def opcoes_otimizadas(pragmas: dict | None = None) -> dict:
+    """OPTIONS do banco SQLite no modo otimizado (ver settings)."""
+    return {
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(_comandos(pragmas or PRAGMAS)),
+    }
+
+
+def aplicar_pragmas(conexao, pragmas: dict | None = None) -> None:
+    """Aplica os PRAGMAs numa conexão sqlite3 (DB-API), fora do Django."""
+    cursor = conexao.cursor()
+    try:
+        for comando in _comandos(pragmas or PRAGMAS):
+            cursor.execute(comando)
+    finally:
+        cursor.close()
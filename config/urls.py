@@ -1,10 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
-from django.views.static import serve as media_serve
 import os
 
+from comprovantes.views import midia_publica
+from monitoramento.views import metrics
 from notificacoes.views import task_notify, telegram_webhook
 
 urlpatterns = [
@@ -16,16 +16,16 @@ urlpatterns = [
     path("vendas/", include(("vendas.urls", "vendas"), namespace="vendas")),
     path("mural/", include(("mural.urls", "mural"), namespace="mural")),
     path("relatorios/", include(("relatorios.urls", "relatorios"), namespace="relatorios")),
+    path("comprovantes/", include(("comprovantes.urls", "comprovantes"), namespace="comprovantes")),
     path("telegram/<str:secret>/", telegram_webhook, name="telegram_webhook"),
     # <<< SEM CONDICIONAL >>>
    path("notificacoes/", include("notificacoes.urls")),
    path("run/", task_notify, name="task_notify"),
+    path("metrics", metrics, name="metrics"),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
-if os.getenv("SERVE_MEDIA", "False") == "True":
+if settings.DEBUG or os.getenv("SERVE_MEDIA", "False") == "True":
+    # comprovantes e miniaturas só pelas views com permissão (comprovantes:baixar/preview)
     urlpatterns += [
-        re_path(r"^media/(?P<path>.*)$", media_serve, {"document_root": settings.MEDIA_ROOT}),
-    ]
\ No newline at end of file
+        re_path(r"^media/(?P<path>.*)$", midia_publica),
+    ]
@@ -9,6 +9,7 @@ from django.http import HttpRequest
 from django.shortcuts import render
 from django.utils import timezone
 
+from config.replica import somente_leitura
 from financeiro.models import Despesa
 from vendas.models import Venda
 try:
@@ -29,6 +30,7 @@ def _parse_date(s: str | None) -> date | None:
 
 
 @login_required
+@somente_leitura
 def index(request: HttpRequest):
     hoje = timezone.localdate()
 
@@ -38,12 +40,12 @@ def index(request: HttpRequest):
 
     # ================= KPIs do período =================
     a_receber = (
-        Parcela.objects.filter(status__iexact="PENDENTE", vencimento__range=[inicio, fim])
+        Parcela.objects.em_aberto().filter(vencimento__range=[inicio, fim])
         .aggregate(total=Coalesce(Sum("valor"), Decimal("0.00")))["total"]
         or Decimal("0")
     )
 
-    vencidas_qs = Parcela.objects.filter(status__iexact="PENDENTE", vencimento__lt=hoje)
+    vencidas_qs = Parcela.objects.em_atraso()
     vencidas_valor = (
         vencidas_qs.aggregate(total=Coalesce(Sum("valor"), Decimal("0.00")))["total"]
         or Decimal("0")
@@ -87,13 +89,14 @@ def index(request: HttpRequest):
     fluxo_liquido = (pagas + entradas_liquidas) - despesas_pagas
 
     # ---------- PARCELAS QUE VENCEM HOJE ----------
-    vencem_hoje_qs = (
+    # uma consulta só: total e contagem saem da própria lista
+    vencem_hoje = list(
         Parcela.objects.filter(status__iexact="PENDENTE", vencimento=hoje)
         .select_related("venda", "venda__cliente")
         .order_by("vencimento", "venda_id", "numero")
     )
-    total_vencem_hoje = vencem_hoje_qs.aggregate(s=Sum("valor"))["s"] or Decimal("0")
-    vencem_hoje_count = vencem_hoje_qs.count()
+    total_vencem_hoje = sum((p.valor for p in vencem_hoje), Decimal("0"))
+    vencem_hoje_count = len(vencem_hoje)
 
     # ================= Resumo de HOJE =================
     parcelas_pagas_hoje = (
@@ -222,7 +225,7 @@ def index(request: HttpRequest):
         prox7_valor=float(prox7_valor),
 
         # Vencem HOJE
-        vencem_hoje=vencem_hoje_qs,
+        vencem_hoje=vencem_hoje,
         total_vencem_hoje=total_vencem_hoje,
         vencem_hoje_count=vencem_hoje_count,
 
@@ -6,8 +6,10 @@ class DespesaAdmin(admin.ModelAdmin):
     list_display = ('data','categoria','descricao','valor','status','origem')
     list_filter = ('categoria','status','origem')
     search_fields = ('descricao',)
+    show_full_result_count = False
 
 @admin.register(ReceitaExtra)
 class ReceitaExtraAdmin(admin.ModelAdmin):
     list_display = ('data','descricao','valor')
-    search_fields = ('descricao',)
\ No newline at end of file
+    search_fields = ('descricao',)
+    show_full_result_count = False
\ No newline at end of file
@@ -3,10 +3,10 @@ from __future__ import annotations
 
 from django.db import models
 from django.utils import timezone
-from django.db.models.signals import pre_delete, pre_save
-from django.dispatch import receiver
 import os
 
+from comprovantes.mixins import RastreiaOriginaisMixin
+
 
 def comprovante_despesa_path(instance: "Despesa", filename: str) -> str:
     # Ex.: comprovantes/despesas/2025/08/<arquivo.pdf>
@@ -18,7 +18,7 @@ def comprovante_receita_path(instance: "ReceitaExtra", filename: str) -> str:
     return f"comprovantes/receitas/{instance.data:%Y/%m}/{filename}"
 
 
-class Despesa(models.Model):
+class Despesa(RastreiaOriginaisMixin, models.Model):
     CATEGORIA = (
         ("COMISSAO", "Comissão de Vendas"),
         ("CUSTO", "Custo Operacional"),
@@ -30,6 +30,8 @@ class Despesa(models.Model):
 
     STATUS = (("PREVISTA", "Prevista"), ("PAGA", "Paga"))
 
+    campos_rastreados = ("comprovante",)
+
     data = models.DateField(default=timezone.now)
     categoria = models.CharField(max_length=10, choices=CATEGORIA)
     descricao = models.CharField(max_length=255)
@@ -66,7 +68,9 @@ class Despesa(models.Model):
         return os.path.basename(self.comprovante.name) if self.comprovante else ""
 
 
-class ReceitaExtra(models.Model):
+class ReceitaExtra(RastreiaOriginaisMixin, models.Model):
+    campos_rastreados = ("comprovante",)
+
     data = models.DateField(default=timezone.now)
     descricao = models.CharField(max_length=255)
     valor = models.DecimalField(max_digits=12, decimal_places=2)
@@ -97,51 +101,4 @@ class ReceitaExtra(models.Model):
         return os.path.basename(self.comprovante.name) if self.comprovante else ""
 
 
-# ---------- limpeza de arquivos antigos/órfãos ----------
-
-def _delete_file(fieldfile) -> None:
-    """Remove o arquivo do storage se existir."""
-    try:
-        storage = fieldfile.storage
-        if fieldfile.name and storage.exists(fieldfile.name):
-            storage.delete(fieldfile.name)
-    except Exception:
-        # Não interrompe a operação do banco caso falhe a remoção no disco/storage
-        pass
-
-
-@receiver(pre_delete, sender=Despesa)
-def despesa_delete_file(sender, instance: Despesa, **kwargs):
-    if instance.comprovante:
-        _delete_file(instance.comprovante)
-
-
-@receiver(pre_delete, sender=ReceitaExtra)
-def receita_delete_file(sender, instance: ReceitaExtra, **kwargs):
-    if instance.comprovante:
-        _delete_file(instance.comprovante)
-
-
-@receiver(pre_save, sender=Despesa)
-def despesa_replace_file(sender, instance: Despesa, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = Despesa.objects.get(pk=instance.pk)
-    except Despesa.DoesNotExist:
-        return
-    # Se trocar o arquivo, apaga o antigo
-    if old.comprovante and old.comprovante != instance.comprovante:
-        _delete_file(old.comprovante)
-
-
-@receiver(pre_save, sender=ReceitaExtra)
-def receita_replace_file(sender, instance: ReceitaExtra, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = ReceitaExtra.objects.get(pk=instance.pk)
-    except ReceitaExtra.DoesNotExist:
-        return
-    if old.comprovante and old.comprovante != instance.comprovante:
-        _delete_file(old.comprovante)
\ No newline at end of file
+# ---------- referências e limpeza dos comprovantes: ver comprovantes.signals ----------
@@ -1,3 +1,16 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from financeiro.models import Despesa
+from testes.apoio import ConsultasConstantesTestCase, ate, criar_lancamentos
+
+LANCAMENTOS = ate(Despesa, criar_lancamentos)
+
+
+class AdminConsultasTests(ConsultasConstantesTestCase):
+    """Changelists com número de queries fixo (3 ou 12 linhas)."""
+
+    def test_changelist_despesas(self):
+        self.assertConsultasConstantes(reverse("admin:financeiro_despesa_changelist"), 8, LANCAMENTOS)
+
+    def test_changelist_receitas(self):
+        self.assertConsultasConstantes(reverse("admin:financeiro_receitaextra_changelist"), 7, LANCAMENTOS)
@@ -9,6 +9,7 @@ from django.http import HttpResponse
 from django.shortcuts import render
 from django.utils import timezone
 
+from config.replica import somente_leitura
 from vendas.models import Parcela, Venda
 from .models import Despesa
 
@@ -30,6 +31,7 @@ def ping(request):
 
 
 @login_required
+@somente_leitura
 def extrato(request):
     hoje = timezone.now().date()
     inicio = _parse_date(request.GET.get("inicio")) or hoje.replace(day=1)
@@ -104,7 +106,7 @@ def extrato(request):
     vencidas = (
         Parcela.objects
         .select_related("venda", "venda__cliente")
-        .filter(status="PENDENTE", vencimento__lt=hoje)
+        .em_atraso()
         .order_by("vencimento", "id")
     )
     total_vencidas = vencidas.aggregate(
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import ExecucaoTarefa
+
+
+@admin.register(ExecucaoTarefa)
+class ExecucaoTarefaAdmin(admin.ModelAdmin):
+    list_display = ("tarefa", "iniciada_em", "duracao_ms", "sucesso", "detalhes")
+    list_filter = ("tarefa", "sucesso")
+    date_hierarchy = "iniciada_em"
+    readonly_fields = ("tarefa", "iniciada_em", "duracao_ms", "sucesso", "detalhes", "erro")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class MonitoramentoConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "monitoramento"
+    verbose_name = "Monitoramento"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .medicao import instrumentar_conexao, instrumentar_templates
+
+        connection_created.connect(instrumentar_conexao, dispatch_uid="monitoramento.instrumentar_conexao")
+        instrumentar_templates()
@@ -0,0 +1,127 @@
+# monitoramento/benchmark.py
+"""
+Casos do comando `benchmark`: as views e comandos mais pesados, medidos
+sobre uma carteira sintética (vendas.sintetico).
+
+Cada caso é uma função sem argumentos; medir() devolve tempo (mediana de
+`repeticoes`, depois de um aquecimento), consultas SQL e pico de memória
+alocada em Python (tracemalloc, numa execução separada para não distorcer
+o tempo).
+"""
+from __future__ import annotations
+
+import io
+import os
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack, redirect_stdout
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vendas.models import Venda
+
+
+def medir(fn, repeticoes: int = 3) -> dict:
+    fn()  # aquecimento (caches de processo, templates compilados)
+    tempos = []
+    consultas = 0
+    for _ in range(repeticoes):
+        # conta também as leituras que as views com @somente_leitura mandam à réplica
+        with ExitStack() as pilha:
+            ctxs = [pilha.enter_context(CaptureQueriesContext(c)) for c in connections.all()]
+            t0 = time.perf_counter()
+            fn()
+            tempos.append((time.perf_counter() - t0) * 1000)
+        consultas = sum(len(ctx.captured_queries) for ctx in ctxs)
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "tempo_ms": round(statistics.median(tempos), 2),
+        "consultas": consultas,
+        "pico_kb": round(pico / 1024, 1),
+    }
+
+
+def _get(client: Client, url: str):
+    def caso():
+        resp = client.get(url)
+        assert resp.status_code == 200, f"{url}: HTTP {resp.status_code}"
+    return caso
+
+
+def _avisos_dry_run():
+    env = {"TELEGRAM_BOT_TOKEN": "bench", "TELEGRAM_CHAT_IDS": "1"}
+    with mock.patch.dict(os.environ, env), redirect_stdout(io.StringIO()):
+        call_command("avisos_telegram", dry_run=True, force=True, stdout=io.StringIO())
+
+
+def _update(texto: str):
+    from notificacoes import views as bot
+
+    payload = {"message": {"chat": {"id": 1, "first_name": "Bench"}, "text": texto}}
+
+    def caso():
+        # o envio ao Telegram fica de fora: só o processamento do update
+        with mock.patch.object(bot, "tg_send_safe"):
+            bot._process_update(payload)
+    return caso
+
+
+def casos() -> dict:
+    """{nome: função} sobre os dados atuais do banco."""
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(
+        username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+    )
+    client = Client()
+    client.force_login(user)
+    maior = (
+        Venda.objects.annotate(n=Count("parcelas")).order_by("-n", "pk")
+        .values_list("pk", flat=True).first()
+    )
+    return {
+        "dashboard.index": _get(client, reverse("dashboard:dashboard_index")),
+        "financeiro.extrato": _get(client, reverse("financeiro:extrato")),
+        "vendas.vendas_list": _get(client, reverse("vendas:vendas_list")),
+        "vendas.venda_detail": _get(client, reverse("vendas:venda_detail", args=[maior])),
+        "relatorios.comissoes_pagas": _get(client, reverse("relatorios:comissoes_pagas")),
+        "avisos_telegram --dry-run": _avisos_dry_run,
+        "bot: 1 (vencem hoje)": _update("1"),
+        "bot: 2 (atrasadas)": _update("2"),
+        "bot: 3 (resumo)": _update("3"),
+    }
+
+
+def comparar(atual: dict, baseline: dict, *, tolerancia: float = 0.25,
+             folga_ms: float = 5.0) -> list[str]:
+    """
+    Regressões de `atual` contra `baseline` (mesmo formato do JSON de resultados):
+    qualquer consulta a mais, ou tempo/memória acima de (1 + tolerancia)x.
+    Casos de poucos ms oscilam muito: o tempo precisa subir também mais de `folga_ms`.
+    """
+    regressoes = []
+    for tamanho, res in atual["tamanhos"].items():
+        base = baseline.get("tamanhos", {}).get(tamanho, {})
+        for caso, m in res.items():
+            b = base.get(caso)
+            if not b:
+                continue
+            if m["consultas"] > b["consultas"]:
+                regressoes.append(f"[{tamanho}] {caso}: consultas {b['consultas']} -> {m['consultas']}")
+            if m["tempo_ms"] > b["tempo_ms"] * (1 + tolerancia) + folga_ms:
+                regressoes.append(f"[{tamanho}] {caso}: tempo {b['tempo_ms']}ms -> {m['tempo_ms']}ms")
+            if m["pico_kb"] > b["pico_kb"] * (1 + tolerancia):
+                regressoes.append(f"[{tamanho}] {caso}: memória {b['pico_kb']}KB -> {m['pico_kb']}KB")
+    return regressoes
@@ -0,0 +1,113 @@
+# monitoramento/management/commands/benchmark.py
+import json
+import os
+import platform
+import sys
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from config.replica import REPLICA, replica_configurada
+
+from monitoramento.benchmark import casos, comparar, medir
+from vendas.sintetico import gerar_carteira_sintetica
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as views e comandos mais pesados sobre carteiras sintéticas de vários "
+        "tamanhos (banco de teste próprio) e compara com um baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tamanhos", default="100,1000",
+                            help="Vendas por rodada, separadas por vírgula (padrão: 100,1000).")
+        parser.add_argument("--repeticoes", type=int, default=3,
+                            help="Execuções medidas por caso; vale a mediana (padrão: 3).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--saida", default="bench_resultados.json",
+                            help="Arquivo JSON de resultados (padrão: bench_resultados.json).")
+        parser.add_argument("--baseline",
+                            help="JSON de um resultado anterior para comparar.")
+        parser.add_argument("--tolerancia", type=float, default=0.25,
+                            help="Folga de tempo/memória antes de acusar regressão (padrão: 0.25).")
+        parser.add_argument("--folga-ms", type=float, default=5.0,
+                            help="Aumento mínimo de tempo, em ms, para contar como regressão (padrão: 5).")
+        parser.add_argument("--casos",
+                            help="Só os casos cujo nome contém algum destes textos (vírgula).")
+
+    def handle(self, *args, **options):
+        try:
+            tamanhos = [int(t) for t in options["tamanhos"].split(",") if t.strip()]
+        except ValueError:
+            raise CommandError("--tamanhos deve ser uma lista de inteiros (ex.: 100,1000).")
+        filtro = [f.strip() for f in (options["casos"] or "").split(",") if f.strip()]
+
+        resultado = {
+            "gerado_em": timezone.now().isoformat(),
+            "python": sys.version.split()[0],
+            "plataforma": platform.platform(),
+            "banco": connection.vendor,
+            "tamanhos": {},
+        }
+
+        # nunca mede no banco real: cria (e destrói) um banco de teste, como o test runner
+        setup_test_environment()
+        sem_manifesto = override_settings(STORAGES={
+            **settings.STORAGES,
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        })
+        sem_manifesto.enable()
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # as views com @somente_leitura leem da réplica: aponta o alias para o
+        # banco de teste (como TEST MIRROR), nunca para a réplica real
+        replica_original = None
+        if replica_configurada():
+            replica_original = connections[REPLICA].settings_dict["NAME"]
+            connections[REPLICA].close()
+            connections[REPLICA].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            for tamanho in tamanhos:
+                call_command("flush", interactive=False, verbosity=0)
+                gerar_carteira_sintetica(vendas=tamanho, semente=options["seed"], mensagens=20)
+                self.stdout.write(f"== {tamanho} venda(s)")
+                medidas = {}
+                for nome, fn in casos().items():
+                    if filtro and not any(f in nome for f in filtro):
+                        continue
+                    medidas[nome] = m = medir(fn, max(1, options["repeticoes"]))
+                    self.stdout.write(
+                        f"  {nome:<30} {m['tempo_ms']:>9.1f} ms {m['consultas']:>5} consultas "
+                        f"{m['pico_kb']:>9.1f} KB"
+                    )
+                resultado["tamanhos"][str(tamanho)] = medidas
+        finally:
+            if replica_original is not None:
+                connections[REPLICA].close()
+                connections[REPLICA].settings_dict["NAME"] = replica_original
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            sem_manifesto.disable()
+            teardown_test_environment()
+
+        with open(options["saida"], "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f"Resultados em {options['saida']}.")
+
+        if options["baseline"]:
+            if not os.path.exists(options["baseline"]):
+                raise CommandError(f"Baseline não encontrado: {options['baseline']}")
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            regressoes = comparar(
+                resultado, baseline, tolerancia=options["tolerancia"], folga_ms=options["folga_ms"]
+            )
+            if regressoes:
+                for r in regressoes:
+                    self.stderr.write(r)
+                raise CommandError(f"{len(regressoes)} regressão(ões) em relação ao baseline.")
+            self.stdout.write(self.style.SUCCESS("Sem regressões em relação ao baseline."))
@@ -0,0 +1,177 @@
+# monitoramento/management/commands/sqlite_concorrencia.py
+import json
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.sqlite import PRAGMAS, aplicar_pragmas
+
+MODOS = ("padrao", "otimizado")
+
+
+def _percentil(valores: list[float], p: float) -> float | None:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)] * 1000, 1)
+
+
+def _preparar(caminho: str, linhas: int) -> None:
+    con = sqlite3.connect(caminho)
+    con.executescript("""
+        CREATE TABLE parcela (id INTEGER PRIMARY KEY, venda_id INTEGER, valor REAL, status TEXT);
+        CREATE INDEX parcela_status ON parcela (status);
+        CREATE TABLE baixa (id INTEGER PRIMARY KEY, parcela_id INTEGER, valor REAL, em REAL);
+    """)
+    con.executemany(
+        "INSERT INTO parcela (venda_id, valor, status) VALUES (?, ?, 'PENDENTE')",
+        ((i // 12, 100 + i % 97) for i in range(linhas)),
+    )
+    con.commit()
+    con.close()
+
+
+class _Rodada:
+    """Escritores e leitores concorrentes sobre o mesmo arquivo, num dos modos."""
+
+    def __init__(self, caminho, modo, o):
+        self.caminho, self.modo, self.o = caminho, modo, o
+        self.leituras: list[float] = []
+        self.escritas: list[float] = []
+        self.erros = {"leitura": 0, "escrita": 0}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def _conectar(self):
+        # como o Django: autocommit no driver e transações explícitas
+        con = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+        if self.modo == "otimizado":
+            aplicar_pragmas(con)
+        return con
+
+    def _escritor(self, semente):
+        rng = random.Random(semente)
+        con = self._conectar()
+        inicio = "BEGIN IMMEDIATE" if self.modo == "otimizado" else "BEGIN"
+        linhas = self.o["linhas"]
+        while not self._parar.is_set():
+            t0 = time.perf_counter()
+            try:
+                # baixa de parcelas: lê, grava, trabalha um pouco dentro da transação
+                con.execute(inicio)
+                for _ in range(self.o["lote"]):
+                    pid = rng.randrange(1, linhas + 1)
+                    (valor,) = con.execute("SELECT valor FROM parcela WHERE id = ?", (pid,)).fetchone()
+                    con.execute("UPDATE parcela SET status = 'PAGO' WHERE id = ?", (pid,))
+                    con.execute("INSERT INTO baixa (parcela_id, valor, em) VALUES (?, ?, ?)",
+                                (pid, valor, time.time()))
+                time.sleep(self.o["trabalho_ms"] / 1000)
+                con.execute("COMMIT")
+                with self._lock:
+                    self.escritas.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                if con.in_transaction:
+                    con.execute("ROLLBACK")
+                with self._lock:
+                    self.erros["escrita"] += 1
+                time.sleep(self.o["trabalho_ms"] / 1000)  # a view falharia; aqui tenta de novo
+        con.close()
+
+    def _leitor(self):
+        con = self._conectar()
+        while not self._parar.is_set():
+            t0 = time.perf_counter()
+            try:
+                # consulta de painel: agregado sobre as parcelas em aberto
+                con.execute(
+                    "SELECT count(*), sum(valor) FROM parcela WHERE status = 'PENDENTE'"
+                ).fetchone()
+                with self._lock:
+                    self.leituras.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                with self._lock:
+                    self.erros["leitura"] += 1
+            time.sleep(self.o["pausa_leitura_ms"] / 1000)
+        con.close()
+
+    def rodar(self) -> dict:
+        threads = [threading.Thread(target=self._escritor, args=(i,)) for i in range(self.o["escritores"])]
+        threads += [threading.Thread(target=self._leitor) for _ in range(self.o["leitores"])]
+        for t in threads:
+            t.start()
+        time.sleep(self.o["duracao"])
+        self._parar.set()
+        for t in threads:
+            t.join()
+        d = self.o["duracao"]
+        return {
+            "modo": self.modo,
+            "leituras_s": round(len(self.leituras) / d, 1),
+            "leitura_ms": {p: _percentil(self.leituras, p) for p in (50, 95, 99)},
+            "leitura_max_ms": _percentil(self.leituras, 100),
+            "escritas_s": round(len(self.escritas) / d, 1),
+            "escrita_ms": {p: _percentil(self.escritas, p) for p in (50, 95, 99)},
+            "erros_leitura": self.erros["leitura"],
+            "erros_escrita": self.erros["escrita"],
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede leituras e escritas concorrentes num SQLite temporário com as "
+        "configurações padrão e com o modo otimizado (WAL, BEGIN IMMEDIATE...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modos", default=",".join(MODOS),
+                            help=f"Modos a medir (padrão: {','.join(MODOS)}).")
+        parser.add_argument("--duracao", type=float, default=5.0, help="Segundos por modo (padrão: 5).")
+        parser.add_argument("--escritores", type=int, default=4,
+                            help="Threads escrevendo, como workers/threads do webhook (padrão: 4).")
+        parser.add_argument("--leitores", type=int, default=8, help="Threads lendo (padrão: 8).")
+        parser.add_argument("--linhas", type=int, default=20000, help="Parcelas na tabela (padrão: 20000).")
+        parser.add_argument("--lote", type=int, default=5, help="Parcelas baixadas por transação (padrão: 5).")
+        parser.add_argument("--trabalho-ms", type=float, default=5.0,
+                            help="Tempo dentro da transação de escrita (padrão: 5).")
+        parser.add_argument("--pausa-leitura-ms", type=float, default=2.0)
+        parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo.")
+
+    def handle(self, *args, **o):
+        modos = [m.strip() for m in o["modos"].split(",") if m.strip()]
+        if not modos or set(modos) - set(MODOS):
+            raise CommandError(f"--modos aceita: {', '.join(MODOS)}")
+
+        resultados = []
+        with tempfile.TemporaryDirectory(prefix="lotesys-sqlite-") as pasta:
+            for modo in modos:
+                caminho = os.path.join(pasta, f"{modo}.sqlite3")
+                _preparar(caminho, o["linhas"])
+                self.stdout.write(f"Medindo {modo} ({o['duracao']}s, {o['escritores']} escritores, "
+                                  f"{o['leitores']} leitores)…")
+                resultados.append(_Rodada(caminho, modo, o).rodar())
+
+        for r in resultados:
+            self._imprimir(r)
+        if o["saida"]:
+            with open(o["saida"], "w", encoding="utf-8") as fh:
+                json.dump({"pragmas": PRAGMAS, "resultados": resultados}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {o['saida']}"))
+
+    def _imprimir(self, r: dict) -> None:
+        def pct(d):
+            return " / ".join("-" if v is None else f"{v:.1f}" for v in d.values())
+
+        self.stdout.write(f"[{r['modo']}]")
+        self.stdout.write(f"  leituras: {r['leituras_s']}/s  p50/p95/p99 {pct(r['leitura_ms'])} ms  "
+                          f"(máx {r['leitura_max_ms']} ms)")
+        self.stdout.write(f"  escritas: {r['escritas_s']}/s  p50/p95/p99 {pct(r['escrita_ms'])} ms")
+        estilo = self.style.ERROR if r["erros_leitura"] or r["erros_escrita"] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"  'database is locked': {r['erros_leitura']} leitura(s), {r['erros_escrita']} escrita(s)"
+        ))
@@ -0,0 +1,108 @@
+# monitoramento/medicao.py
+"""
+Medição por request: quantidade e tempo de SQL, tempo de template e tempo
+total. O middleware (monitoramento.middleware) abre uma Medicao por request;
+as consultas são contadas com connection.execute_wrapper e o tempo de
+template com um wrapper em Template.render do backend do Django.
+
+As conexões são por thread, e sob ASGI o ORM de uma view async roda nas
+threads do sync_to_async, não na do event loop. Por isso o contador fica
+instalado em toda conexão (sinal connection_created, ver apps.py) e
+procura a medição no ContextVar, que o sync_to_async copia para a thread.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+_atual: ContextVar["Medicao | None"] = ContextVar("medicao_atual", default=None)
+
+
+@dataclass
+class Medicao:
+    consultas: int = 0
+    sql_ms: float = 0.0
+    template_ms: float = 0.0
+    total_ms: float = 0.0
+    inicio: float = field(default_factory=time.perf_counter)
+    _profundidade_template: int = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: uma chamada por consulta
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.sql_ms += (time.perf_counter() - t0) * 1000
+
+    def encerrar(self) -> "Medicao":
+        self.total_ms = (time.perf_counter() - self.inicio) * 1000
+        return self
+
+
+def medicao_atual() -> Medicao | None:
+    return _atual.get()
+
+
+def _contar(execute, sql, params, many, context):
+    medicao = _atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    return medicao(execute, sql, params, many, context)
+
+
+def instrumentar_conexao(connection, **kwargs) -> None:
+    """Instala o contador de consultas na conexão (idempotente; receiver de connection_created)."""
+    if _contar not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar)
+
+
+@contextmanager
+def medir():
+    """
+    Mede o bloco, inclusive o SQL que ele roda em outras threads via
+    sync_to_async. Reentrante: o bloco externo vence.
+    """
+    if _atual.get() is not None:
+        yield _atual.get()
+        return
+    medicao = Medicao()
+    token = _atual.set(medicao)
+    # conexões desta thread abertas antes do receiver (ex.: no startup)
+    for alias in connections:
+        instrumentar_conexao(connections[alias])
+    try:
+        yield medicao
+    finally:
+        medicao.encerrar()
+        _atual.reset(token)
+
+
+def instrumentar_templates() -> None:
+    """Soma o tempo de render dos templates (nível de topo) na medição atual."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_monitorado", False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        medicao = _atual.get()
+        if medicao is None:
+            return original(self, context, request)
+        medicao._profundidade_template += 1
+        t0 = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            medicao._profundidade_template -= 1
+            if medicao._profundidade_template == 0:
+                medicao.template_ms += (time.perf_counter() - t0) * 1000
+
+    render._monitorado = True
+    Template.render = render
@@ -0,0 +1,167 @@
+# monitoramento/metricas.py
+"""
+Métricas no formato do Prometheus (prometheus_client).
+
+Com vários workers do gunicorn, cada processo grava suas amostras em
+arquivos em PROMETHEUS_MULTIPROC_DIR (ver start.sh e config/gunicorn.py) e
+o /metrics soma todos. Sem a variável (runserver, testes), vale o registro
+do próprio processo.
+
+Crons e comandos (avisos_telegram, atualizar_vencidas...) rodam em
+processos próprios, que não gravam em PROMETHEUS_MULTIPROC_DIR: os
+contadores deles morrem com o processo. O que chega ao /metrics é a última
+execução de cada rotina, lida de ExecucaoTarefa na hora do scrape
+(lotesys_tarefa_*; para avisos_telegram, inclui os envios ao Telegram).
+
+Taxa de acerto dos caches: lotesys_cache_total{resultado="hit"} dividido
+pela soma de hit e miss, por cache (preview, etag, blob).
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter as Contagem
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# ----- requests -----
+REQUEST_SEGUNDOS = Histogram(
+    "lotesys_http_request_duration_seconds",
+    "Tempo total do request, por view.",
+    ["view", "metodo"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10),
+)
+REQUEST_CONSULTAS = Histogram(
+    "lotesys_http_request_db_queries",
+    "Consultas SQL por request, por view.",
+    ["view"],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 100, 200),
+)
+REQUESTS = Counter(
+    "lotesys_http_requests_total",
+    "Requests atendidos, por view e classe de status.",
+    ["view", "status"],
+)
+CONSULTAS = Counter(
+    "lotesys_db_queries_total",
+    "Consultas SQL executadas dentro de requests, por view.",
+    ["view"],
+)
+
+# ----- Telegram -----
+TELEGRAM_ENVIOS = Counter(
+    "lotesys_telegram_envios_total",
+    "Envios à API do Telegram, por resultado (ok, falha, 429).",
+    ["resultado"],
+)
+TELEGRAM_SEGUNDOS = Histogram(
+    "lotesys_telegram_envio_duration_seconds",
+    "Latência das chamadas à API do Telegram.",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 15),
+)
+WEBHOOK_FILA = Gauge(
+    "lotesys_telegram_webhook_fila",
+    "Updates do webhook recebidos e ainda em processamento.",
+    multiprocess_mode="livesum",
+)
+
+# ----- caches -----
+CACHE = Counter(
+    "lotesys_cache_total",
+    "Consultas a caches, por cache (preview, etag, blob) e resultado (hit, miss).",
+    ["cache", "resultado"],
+)
+
+# envios do próprio processo (ver ExecucaoTarefa em avisos_telegram)
+_envios_processo: Contagem = Contagem()
+_trava_envios = threading.Lock()
+
+
+def observar_request(view: str, metodo: str, status: int, medicao) -> None:
+    REQUEST_SEGUNDOS.labels(view, metodo).observe(medicao.total_ms / 1000)
+    REQUEST_CONSULTAS.labels(view).observe(medicao.consultas)
+    REQUESTS.labels(view, f"{status // 100}xx").inc()
+    CONSULTAS.labels(view).inc(medicao.consultas)
+
+
+def observar_envio_telegram(status: int | None, segundos: float) -> None:
+    """status HTTP da API (None = erro de rede/timeout)."""
+    if status == 429:
+        resultado = "429"
+    elif status is not None and status < 300:
+        resultado = "ok"
+    else:
+        resultado = "falha"
+    TELEGRAM_ENVIOS.labels(resultado).inc()
+    TELEGRAM_SEGUNDOS.observe(segundos)
+    with _trava_envios:
+        _envios_processo[resultado] += 1
+
+
+def envios_telegram_no_processo() -> Contagem:
+    """Cópia dos envios ao Telegram feitos por este processo, por resultado."""
+    with _trava_envios:
+        return Contagem(_envios_processo)
+
+
+def observar_cache(cache: str, acerto: bool) -> None:
+    CACHE.labels(cache, "hit" if acerto else "miss").inc()
+
+
+class ColetorTarefas:
+    """Última execução de cada rotina (ExecucaoTarefa), lida a cada scrape."""
+
+    def collect(self):
+        from django.db.models import Max
+
+        from .models import ExecucaoTarefa
+
+        instante = GaugeMetricFamily(
+            "lotesys_tarefa_ultima_execucao_timestamp_seconds",
+            "Início da última execução da rotina (epoch).", labels=["tarefa"],
+        )
+        sucesso = GaugeMetricFamily(
+            "lotesys_tarefa_ultima_execucao_sucesso",
+            "1 se a última execução da rotina terminou sem erro.", labels=["tarefa"],
+        )
+        duracao = GaugeMetricFamily(
+            "lotesys_tarefa_ultima_execucao_duracao_seconds",
+            "Duração da última execução da rotina.", labels=["tarefa"],
+        )
+        envios = GaugeMetricFamily(
+            "lotesys_tarefa_ultima_execucao_telegram_envios",
+            "Envios ao Telegram na última execução da rotina, por resultado.",
+            labels=["tarefa", "resultado"],
+        )
+        ultimas = ExecucaoTarefa.objects.filter(
+            pk__in=ExecucaoTarefa.objects.values("tarefa").annotate(ultima=Max("pk")).values("ultima")
+        )
+        for e in ultimas:
+            instante.add_metric([e.tarefa], e.iniciada_em.timestamp())
+            sucesso.add_metric([e.tarefa], int(e.sucesso))
+            duracao.add_metric([e.tarefa], e.duracao_ms / 1000)
+            for resultado, qtd in (e.detalhes.get("telegram") or {}).items():
+                envios.add_metric([e.tarefa, resultado], qtd)
+        yield from (instante, sucesso, duracao, envios)
+
+
+def exportar() -> tuple[bytes, str]:
+    """(corpo, content-type) do /metrics, agregando os workers se houver."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        processos = generate_latest(registro)
+    else:
+        processos = generate_latest()
+    tarefas = CollectorRegistry()
+    tarefas.register(ColetorTarefas())
+    return processos + generate_latest(tarefas), CONTENT_TYPE_LATEST
@@ -0,0 +1,86 @@
+# monitoramento/middleware.py
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .medicao import medir
+from .metricas import observar_request
+
+logger = logging.getLogger("monitoramento.requests")
+
+
+def orcamentos() -> tuple[int, float]:
+    """(máx. de consultas, máx. de ms) por request; 0 desliga o limite."""
+    cfg = getattr(settings, "MONITORAMENTO", {})
+    return int(cfg.get("MAX_CONSULTAS", 0)), float(cfg.get("MAX_MS", 0))
+
+
+class InstrumentacaoMiddleware:
+    """
+    Conta SQL (quantidade e tempo), tempo de template e tempo total de cada
+    request. Para staff devolve `Server-Timing` (aparece no DevTools); para
+    todos grava uma linha de log JSON e marca como WARNING quem estourar
+    settings.MONITORAMENTO["MAX_CONSULTAS"] / ["MAX_MS"].
+    Funciona em WSGI e ASGI (não força troca de thread em views async).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with medir() as medicao:
+            response = self.get_response(request)
+        return self._registrar(request, response, medicao, getattr(request, "user", None))
+
+    async def __acall__(self, request):
+        with medir() as medicao:
+            response = await self.get_response(request)
+        # request.user é preguiçoso e síncrono; em contexto async use auser()
+        user = await request.auser() if hasattr(request, "auser") else None
+        return self._registrar(request, response, medicao, user)
+
+    def _registrar(self, request, response, medicao, user):
+        request.medicao = medicao
+
+        if user is not None and user.is_staff:
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={medicao.sql_ms:.1f};desc="{medicao.consultas} consultas"',
+                f"tpl;dur={medicao.template_ms:.1f}",
+                f"total;dur={medicao.total_ms:.1f}",
+            ])
+
+        max_consultas, max_ms = orcamentos()
+        estourou = []
+        if max_consultas and medicao.consultas > max_consultas:
+            estourou.append("consultas")
+        if max_ms and medicao.total_ms > max_ms:
+            estourou.append("tempo")
+
+        match = getattr(request, "resolver_match", None)
+        linha = {
+            "metodo": request.method,
+            "caminho": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "consultas": medicao.consultas,
+            "sql_ms": round(medicao.sql_ms, 1),
+            "template_ms": round(medicao.template_ms, 1),
+            "total_ms": round(medicao.total_ms, 1),
+        }
+        observar_request(linha["view"] or "<sem_rota>", request.method, response.status_code, medicao)
+
+        if estourou:
+            linha["acima_do_orcamento"] = estourou
+            logger.warning(json.dumps(linha, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(linha, ensure_ascii=False))
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoTarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarefa', models.CharField(max_length=64)),
+                ('iniciada_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duracao_ms', models.PositiveIntegerField(default=0)),
+                ('sucesso', models.BooleanField(default=True)),
+                ('detalhes', models.JSONField(blank=True, default=dict)),
+                ('erro', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-iniciada_em'],
+                'indexes': [models.Index(fields=['tarefa', 'iniciada_em'], name='monitoramen_tarefa_086f25_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# monitoramento/models.py
+import time
+from contextlib import contextmanager
+
+from django.db import models
+from django.utils import timezone
+
+
+class ExecucaoTarefa(models.Model):
+    """Histórico das rotinas agendadas (duração, resultado e estatísticas)."""
+    tarefa = models.CharField(max_length=64)
+    iniciada_em = models.DateTimeField(default=timezone.now)
+    duracao_ms = models.PositiveIntegerField(default=0)
+    sucesso = models.BooleanField(default=True)
+    detalhes = models.JSONField(default=dict, blank=True)
+    erro = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-iniciada_em"]
+        indexes = [models.Index(fields=["tarefa", "iniciada_em"])]
+
+    def __str__(self):
+        return f"{self.tarefa} @ {self.iniciada_em:%d/%m/%Y %H:%M}"
+
+    @classmethod
+    @contextmanager
+    def registrar(cls, tarefa: str):
+        """
+        Mede e grava uma execução. O bloco recebe o dict `detalhes` para
+        preencher as estatísticas; exceções são registradas e repassadas.
+
+            with ExecucaoTarefa.registrar("atualizar_vencidas") as detalhes:
+                detalhes["parcelas"] = 10
+        """
+        inicio = timezone.now()
+        t0 = time.monotonic()
+        detalhes: dict = {}
+        try:
+            yield detalhes
+        except Exception as e:
+            cls.objects.create(
+                tarefa=tarefa,
+                iniciada_em=inicio,
+                duracao_ms=int((time.monotonic() - t0) * 1000),
+                sucesso=False,
+                detalhes=detalhes,
+                erro=f"{type(e).__name__}: {e}",
+            )
+            raise
+        cls.objects.create(
+            tarefa=tarefa,
+            iniciada_em=inicio,
+            duracao_ms=int((time.monotonic() - t0) * 1000),
+            detalhes=detalhes,
+        )
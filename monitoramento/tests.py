@@ -0,0 +1,296 @@
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteWrapper
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from config.replica import COOKIE_FIXAR, RoteadorReplica, houve_escrita, usar_replica
+from config.sqlite import PRAGMAS, opcoes_otimizadas
+from monitoramento.medicao import medicao_atual, medir
+from monitoramento.metricas import observar_cache
+from monitoramento.models import ExecucaoTarefa
+from testes.apoio import SEM_MANIFESTO
+from vendas.models import Parcela, Venda
+from notificacoes.views import TASK_TOKEN
+from vendas.sintetico import gerar_carteira_sintetica
+
+# Orçamento de SQL por view: (nome da URL, função que dá os args, consultas).
+# A contagem tem de ser a mesma com a carteira pequena e com a grande;
+# se uma mudança de template/view criar N+1, o teste falha.
+ORCAMENTOS = [
+    ("dashboard:dashboard_index", None, 24),
+    ("financeiro:extrato", None, 15),
+    ("vendas:vendas_list", None, 5),
+    ("vendas:venda_detail", lambda: [Venda.objects.filter(forma_pagamento="PARCELADO").first().pk], 7),
+    ("vendas:parcelas_baixa", None, 6),
+    ("relatorios:comissoes_pagas", None, 7),
+    ("mural:index", None, 6),
+]
+
+TAMANHOS = (5, 40)  # vendas
+
+
+@SEM_MANIFESTO
+class OrcamentoConsultasTests(TestCase):
+    """Cada view custa o mesmo número de consultas com 5 ou 40 vendas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "a@a.com", "x")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # com DATABASE_REPLICA_URL as leituras iriam para a réplica; conta no primário
+        self.client.cookies[COOKIE_FIXAR] = "1"
+
+    def test_orcamentos(self):
+        gerados = 0
+        for semente, tamanho in enumerate(TAMANHOS, 1):
+            gerar_carteira_sintetica(vendas=tamanho - gerados, semente=semente, mensagens=5)
+            gerados = tamanho
+            for nome, args_fn, esperado in ORCAMENTOS:
+                url = reverse(nome, args=args_fn() if args_fn else None)
+                self.client.get(url)  # aquece caches de processo (content types etc.)
+                with self.subTest(view=nome, vendas=tamanho), self.assertNumQueries(esperado):
+                    resp = self.client.get(url)
+                    self.assertEqual(resp.status_code, 200)
+
+
+class RoteadorReplicaTests(SimpleTestCase):
+    """Regras do roteador que valem com ou sem réplica configurada."""
+
+    def setUp(self):
+        self.roteador = RoteadorReplica()
+
+    def test_fora_de_usar_replica_le_do_primario(self):
+        self.assertIsNone(self.roteador.db_for_read(Parcela))
+
+    def test_escrita_vai_ao_primario_e_encerra_a_replica_no_escopo(self):
+        with usar_replica():
+            self.assertEqual(self.roteador.db_for_write(Parcela, instance=Parcela()), "default")
+            self.assertTrue(houve_escrita())
+            self.assertIsNone(self.roteador.db_for_read(Parcela))
+        self.assertFalse(houve_escrita())
+
+    def test_sessao_e_usuario_sempre_no_primario(self):
+        with usar_replica():
+            self.assertIsNone(self.roteador.db_for_read(get_user_model()))
+
+    def test_replica_nao_recebe_migracoes(self):
+        self.assertFalse(self.roteador.allow_migrate("replica", "vendas"))
+        self.assertTrue(self.roteador.allow_migrate("default", "vendas"))
+
+
+def _tabelas_do_app(consultas) -> list[str]:
+    return [q["sql"] for q in consultas if '"vendas_' in q["sql"] or '"financeiro_' in q["sql"]]
+
+
+COM_REPLICA = "replica" in settings.DATABASES
+
+
+@skipUnless(COM_REPLICA,
+            "defina DATABASE_REPLICA_URL (ex.: sqlite:////tmp/replica.sqlite3) para testar a réplica")
+@SEM_MANIFESTO
+class ReplicaTests(TransactionTestCase):
+    """
+    Roteamento real com um segundo banco. Nos testes a réplica espelha o
+    "default" (TEST MIRROR); TransactionTestCase porque dentro de transação
+    o roteador lê sempre do primário.
+    """
+
+    databases = {"default", "replica"} if COM_REPLICA else {"default"}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser("admin", "a@a.com", "x")
+        gerar_carteira_sintetica(vendas=3, semente=1, mensagens=0)
+        self.client.force_login(self.user)
+
+    def _get(self, nome):
+        with CaptureQueriesContext(connections["default"]) as primario, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            resp = self.client.get(reverse(nome))
+        self.assertEqual(resp.status_code, 200)
+        return _tabelas_do_app(primario.captured_queries), _tabelas_do_app(replica.captured_queries)
+
+    def test_views_somente_leitura_leem_da_replica(self):
+        for nome in ("dashboard:dashboard_index", "financeiro:extrato"):
+            with self.subTest(view=nome):
+                primario, replica = self._get(nome)
+                self.assertEqual(primario, [])
+                self.assertTrue(replica)
+
+    def test_depois_de_gravar_o_navegador_le_do_primario(self):
+        parcela = Parcela.objects.exclude(status="PAGO").first()
+        resp = self.client.post(reverse("vendas:parcela_pagar", args=[parcela.pk]))
+        self.assertIn(COOKIE_FIXAR, resp.cookies)
+
+        primario, replica = self._get("financeiro:extrato")
+        self.assertTrue(primario)
+        self.assertEqual(replica, [])
+
+    def test_get_sem_escrita_nao_fixa(self):
+        resp = self.client.get(reverse("financeiro:extrato"))
+        self.assertNotIn(COOKIE_FIXAR, resp.cookies)
+
+
+class SQLiteOtimizadoTests(SimpleTestCase):
+    """As OPTIONS de config/sqlite.py valem em cada conexão nova do Django."""
+
+    def test_pragmas_e_begin_immediate(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            conexao = SQLiteWrapper({
+                **connections["default"].settings_dict,
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(pasta, "teste.sqlite3"),
+                "OPTIONS": opcoes_otimizadas(),
+            }, alias="sqlite_otimizado")
+            try:
+                with conexao.cursor() as cur:
+                    lidos = {}
+                    for nome in ("journal_mode", "synchronous", "busy_timeout", "temp_store"):
+                        cur.execute(f"PRAGMA {nome}")
+                        lidos[nome] = cur.fetchone()[0]
+                self.assertEqual(lidos, {
+                    "journal_mode": "wal",
+                    "synchronous": 1,  # NORMAL
+                    "busy_timeout": PRAGMAS["busy_timeout"],
+                    "temp_store": 2,  # MEMORY
+                })
+                self.assertEqual(conexao.transaction_mode, "IMMEDIATE")
+            finally:
+                conexao.close()
+
+
+@mock.patch.dict(os.environ, {"METRICS_TOKEN": "segredo"})
+class MetricsTests(TestCase):
+    url = "/metrics"
+
+    def get(self, **kwargs):
+        resp = self.client.get(self.url, **kwargs)
+        return resp, resp.content.decode()
+
+    def test_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {"token": "errado"}).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {"token": "segredo"}).status_code, 200)
+        resp = self.client.get(self.url, headers={"Authorization": "Bearer segredo"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain"))
+
+    @mock.patch.dict(os.environ, {"METRICS_TOKEN": ""})
+    def test_sem_token_configurado_nao_existe(self):
+        self.assertEqual(self.client.get(self.url, {"token": ""}).status_code, 404)
+
+    def test_requests_e_caches(self):
+        observar_cache("preview", True)
+        observar_cache("preview", False)
+        _, texto = self.get(headers={"Authorization": "Bearer segredo"})  # este conta no próximo
+        _, texto = self.get(headers={"Authorization": "Bearer segredo"})
+        self.assertIn('lotesys_http_requests_total{status="2xx",view="metrics"}', texto)
+        self.assertIn('lotesys_cache_total{cache="preview",resultado="hit"}', texto)
+        self.assertIn('lotesys_cache_total{cache="preview",resultado="miss"}', texto)
+
+    def test_ultima_execucao_das_rotinas(self):
+        ExecucaoTarefa.objects.create(tarefa="atualizar_vencidas", sucesso=False, duracao_ms=100)
+        ExecucaoTarefa.objects.create(tarefa="atualizar_vencidas", duracao_ms=1500)
+        ExecucaoTarefa.objects.create(
+            tarefa="avisos_telegram", detalhes={"telegram": {"ok": 3, "429": 1}},
+        )
+        _, texto = self.get(headers={"Authorization": "Bearer segredo"})
+        self.assertIn('lotesys_tarefa_ultima_execucao_sucesso{tarefa="atualizar_vencidas"} 1.0', texto)
+        self.assertIn('lotesys_tarefa_ultima_execucao_duracao_seconds{tarefa="atualizar_vencidas"} 1.5', texto)
+        self.assertIn(
+            'lotesys_tarefa_ultima_execucao_telegram_envios{resultado="429",tarefa="avisos_telegram"} 1.0', texto
+        )
+
+
+def _linha_de_log(logs) -> dict:
+    (registro,) = logs.records
+    return json.loads(registro.getMessage())
+
+
+class MedicaoTests(TransactionTestCase):
+    def test_conta_o_sql_de_outra_thread(self):
+        def contar():
+            try:
+                return Venda.objects.count()
+            finally:
+                connections.close_all()
+
+        with medir() as medicao:
+            async_to_sync(sync_to_async(contar, thread_sensitive=False))()
+        self.assertEqual(medicao.consultas, 1)
+        self.assertGreater(medicao.sql_ms, 0)
+
+    def test_fora_da_medicao_nao_conta(self):
+        Venda.objects.count()
+        with medir() as medicao:
+            with medir() as interna:  # reentrante: o bloco externo vence
+                self.assertIs(interna, medicao)
+            Venda.objects.count()
+        Venda.objects.count()
+        self.assertEqual(medicao.consultas, 1)
+        self.assertIsNone(medicao_atual())
+
+
+@SEM_MANIFESTO
+class InstrumentacaoMiddlewareTests(TransactionTestCase):
+    def test_wsgi_server_timing_para_staff_e_log(self):
+        user = get_user_model().objects.create_superuser("admin", "a@a.com", "x")
+        self.client.force_login(user)
+        url = reverse("vendas:vendas_list")
+        self.client.get(url)  # aquece caches de processo
+        with self.assertLogs("monitoramento.requests", "INFO") as logs, \
+                CaptureQueriesContext(connections["default"]) as consultas:
+            resp = self.client.get(url)
+        linha = _linha_de_log(logs)
+        self.assertEqual(linha["view"], "vendas:vendas_list")
+        self.assertEqual(linha["consultas"], len(consultas))
+        self.assertIn(f'desc="{len(consultas)} consultas"', resp["Server-Timing"])
+        self.assertGreater(linha["template_ms"], 0)
+
+    def test_anonimo_sem_server_timing(self):
+        with self.assertLogs("monitoramento.requests", "INFO"):
+            resp = self.client.get(reverse("usuarios:login"))
+        self.assertNotIn("Server-Timing", resp)
+
+    @override_settings(MONITORAMENTO={"MAX_CONSULTAS": 1})
+    def test_acima_do_orcamento_vira_warning(self):
+        with self.assertLogs("monitoramento.requests", "INFO") as logs:
+            self.client.get("/run/", {"token": TASK_TOKEN, "stats": "1"})
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertEqual(_linha_de_log(logs)["acima_do_orcamento"], ["consultas"])
+
+    @override_settings(MIDDLEWARE=["monitoramento.middleware.InstrumentacaoMiddleware"])
+    async def test_asgi_conta_o_orm_da_view_async(self):
+        # só middlewares async: a view roda no event loop e o ORM dela numa
+        # thread do sync_to_async (com um middleware só-sync no meio, tudo
+        # cairia na mesma thread e o teste não provaria nada)
+        with self.assertLogs("monitoramento.requests", "INFO") as logs:
+            resp = await self.async_client.get("/run/", {"token": TASK_TOKEN, "stats": "1"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(_linha_de_log(logs)["consultas"], 5)
+
+
+class TemplateRenderTests(SimpleTestCase):
+    def test_soma_so_o_template_de_topo(self):
+        interno = engines["django"].from_string("dentro")
+        externo = engines["django"].from_string("{{ incluir }}")
+        relogio = mock.Mock(perf_counter=mock.Mock(side_effect=[10.0, 10.1, 10.25]))
+        with medir() as medicao, mock.patch("monitoramento.medicao.time", relogio):
+            html = externo.render({"incluir": lambda: interno.render()})
+        self.assertEqual(html, "dentro")
+        self.assertEqual(medicao.template_ms, 250.0)
+
+    def test_sem_medicao_so_renderiza(self):
+        self.assertEqual(engines["django"].from_string("{{ x }}").render({"x": 1}), "1")
+        self.assertTrue(getattr(type(engines["django"].from_string("")).render, "_monitorado", False))
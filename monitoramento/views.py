@@ -0,0 +1,24 @@
+# monitoramento/views.py
+import hmac
+import os
+
+from django.http import Http404, HttpResponse
+
+from .metricas import exportar
+
+
+def metrics(request):
+    """
+    GET /metrics no formato do Prometheus. Exige METRICS_TOKEN, via
+    `Authorization: Bearer <token>` ou `?token=`; sem token configurado,
+    o endpoint não existe.
+    """
+    esperado = os.getenv("METRICS_TOKEN", "")
+    if not esperado:
+        raise Http404
+    auth = request.headers.get("Authorization", "")
+    recebido = auth[7:] if auth.startswith("Bearer ") else request.GET.get("token", "")
+    if not hmac.compare_digest(recebido.encode(), esperado.encode()):
+        return HttpResponse(status=403)
+    corpo, tipo = exportar()
+    return HttpResponse(corpo, content_type=tipo)
@@ -6,4 +6,7 @@ class MensagemAdmin(admin.ModelAdmin):
     list_display = ("titulo", "tipo", "fixada", "criada_em", "autor")
     list_filter  = ("tipo", "fixada", "criada_em")
     search_fields = ("titulo", "conteudo", "autor__username", "autor__first_name", "autor__last_name")
-    ordering = ("-fixada", "-criada_em")
\ No newline at end of file
+    ordering = ("-fixada", "-criada_em")
+    list_select_related = ("autor",)
+    autocomplete_fields = ("autor",)
+    show_full_result_count = False
\ No newline at end of file
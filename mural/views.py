@@ -8,6 +8,7 @@ def mural_index(request):
     # Fixadas
     fixadas = (
         Mensagem.objects
+        .select_related('autor')
         .filter(fixada=True)
         .order_by('-criada_em')
     )
@@ -15,6 +16,7 @@ def mural_index(request):
     # Recentes = não fixadas (inclui possíveis NULL antigos)
     recentes = (
         Mensagem.objects
+        .select_related('autor')
         .filter(Q(fixada=False) | Q(fixada__isnull=True))
         .order_by('-criada_em')
     )
@@ -0,0 +1,209 @@
+# notificacoes/agendador.py
+"""
+Agendador em processo (ver `manage.py scheduler`): um processo Django
+quente executa as rotinas em expressões cron, em vez de subir um processo
+novo a cada disparo. Só o líder executa: em PostgreSQL, quem tem o
+advisory lock; nos demais bancos, quem tem o lock do arquivo.
+
+Os horários são avaliados em settings.TIME_ZONE. settings.AGENDADOR_CRON
+troca a expressão de uma rotina pelo nome ("" desliga).
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connections
+
+# ---------- expressões cron ----------
+_LIMITES = {  # campo: (mínimo, máximo)
+    "minuto": (0, 59),
+    "hora": (0, 23),
+    "dia": (1, 31),
+    "mes": (1, 12),
+    "semana": (0, 6),  # 0 = domingo (7 também é aceito)
+}
+
+
+def _campo(texto: str, nome: str) -> frozenset[int]:
+    lo, hi = _LIMITES[nome]
+    topo = 7 if nome == "semana" else hi
+    valores: set[int] = set()
+    for parte in texto.split(","):
+        faixa, _, passo = parte.partition("/")
+        passo_n = int(passo) if passo else 1
+        if faixa == "*":
+            ini, fim = lo, hi
+        elif "-" in faixa:
+            a, b = faixa.split("-", 1)
+            ini, fim = int(a), int(b)
+        else:
+            ini = int(faixa)
+            fim = topo if passo else ini
+        if not (lo <= ini <= topo and lo <= fim <= topo and ini <= fim and passo_n > 0):
+            raise ValueError(f"cron: valor fora do intervalo em {nome}: {parte!r}")
+        valores.update(range(ini, fim + 1, passo_n))
+    if nome == "semana" and 7 in valores:
+        valores.discard(7)
+        valores.add(0)
+    return frozenset(valores)
+
+
+class Cron:
+    """Expressão cron de 5 campos (minuto hora dia mês dia-da-semana)."""
+
+    def __init__(self, expressao: str):
+        partes = expressao.split()
+        if len(partes) != 5:
+            raise ValueError(f"cron: esperava 5 campos, veio {expressao!r}")
+        self.expressao = expressao
+        self.minutos, self.horas, self.dias, self.meses, self.semana = (
+            _campo(p, n) for p, n in zip(partes, _LIMITES)
+        )
+        # como no cron: com dia E dia-da-semana restritos, vale qualquer um dos dois
+        self._dia_livre = partes[2] == "*"
+        self._semana_livre = partes[4] == "*"
+
+    def __repr__(self):
+        return f"Cron({self.expressao!r})"
+
+    def _dia_ok(self, d: datetime) -> bool:
+        dia = d.day in self.dias
+        semana = (d.isoweekday() % 7) in self.semana
+        if self._dia_livre or self._semana_livre:
+            return dia and semana
+        return dia or semana
+
+    def proxima(self, apos: datetime) -> datetime:
+        """Primeiro minuto estritamente depois de `apos` que casa com a expressão."""
+        t = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = t + timedelta(days=366 * 5)
+        while t < limite:
+            if t.month not in self.meses:
+                ano, mes = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+                t = t.replace(year=ano, month=mes, day=1, hour=0, minute=0)
+            elif not self._dia_ok(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.horas:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutos:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron: {self.expressao!r} nunca dispara")
+
+
+# ---------- rotinas ----------
+@dataclass
+class Job:
+    nome: str
+    cron: str
+    comando: str
+    kwargs: dict = field(default_factory=dict)
+    replica: bool = False  # só lê: consultas vão para a réplica, se configurada
+
+    def expressao(self) -> str:
+        return getattr(settings, "AGENDADOR_CRON", {}).get(self.nome, self.cron)
+
+
+JOBS: list[Job] = [
+    # antes: cron "avisos-telegram-debug" no render.yaml (mesmos argumentos)
+    Job("avisos_telegram", "*/5 * * * *", "avisos_telegram", {"force": True, "debug": True}, replica=True),
+    # antes: cron "atualizar-vencidas" às 03:05 UTC = 00:05 em America/Recife
+    Job("atualizar_vencidas", "5 0 * * *", "atualizar_vencidas"),
+    # confere os resumos (atrasadas_qtd) logo depois de atualizar_vencidas
+    Job("recalcular_resumos", "20 0 * * *", "recalcular_resumos"),
+    # gc_comprovantes não entra: precisa do disco de mídia, que só o serviço
+    # web tem (roda por POST /comprovantes/gc/, ver render.yaml)
+]
+
+
+def jobs_ativos() -> list[tuple[Job, Cron]]:
+    return [(job, Cron(job.expressao())) for job in JOBS if job.expressao()]
+
+
+# ---------- eleição de líder ----------
+_NOME_TRAVA = "lotesys.agendador"
+
+
+class TravaLider:
+    """
+    Garante uma única instância executando rotinas. Em PostgreSQL usa um
+    advisory lock de sessão numa conexão própria (cai junto com o processo);
+    nos outros bancos, flock num arquivo local.
+    `tentar()` é barato e pode ser chamado a cada volta: confirma que a
+    trava ainda é nossa (conexão pode ter caído) ou tenta obtê-la.
+    """
+
+    def __init__(self, modo: str = "auto", alias: str = "default"):
+        if modo == "auto":
+            modo = "pg" if connections[alias].vendor == "postgresql" else "arquivo"
+        self.modo = modo
+        self.alias = alias
+        self.chave = zlib.crc32(_NOME_TRAVA.encode())  # cabe em int4/int8
+        self._conexao = None
+        self._arquivo = None
+        self._lider = False
+
+    def tentar(self) -> bool:
+        if self.modo == "nenhuma":
+            return True
+        if self.modo == "pg":
+            return self._tentar_pg()
+        return self._tentar_arquivo()
+
+    def _tentar_pg(self) -> bool:
+        try:
+            if self._conexao is None:
+                self._conexao = connections.create_connection(self.alias)
+                self._conexao.set_autocommit(True)
+            with self._conexao.cursor() as cur:
+                if self._lider:
+                    # o lock é reentrante: só confere que a sessão ainda o tem
+                    cur.execute(
+                        "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                        "AND pid = pg_backend_pid() AND classid = 0 AND objid = %s",
+                        [self.chave],
+                    )
+                    self._lider = cur.fetchone() is not None
+                else:
+                    cur.execute("SELECT pg_try_advisory_lock(%s)", [self.chave])
+                    self._lider = bool(cur.fetchone()[0])
+            return self._lider
+        except Exception:
+            # conexão caiu: a trava foi junto; recomeça na próxima volta
+            self.liberar()
+            return False
+
+    def _tentar_arquivo(self) -> bool:
+        if self._arquivo is not None:
+            return True
+        caminho = os.getenv("AGENDADOR_TRAVA") or os.path.join(tempfile.gettempdir(), "lotesys-agendador.lock")
+        arq = open(caminho, "a+")
+        try:
+            fcntl.flock(arq, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arq.close()
+            return False
+        self._arquivo = arq
+        return True
+
+    def liberar(self) -> None:
+        self._lider = False
+        if self._conexao is not None:
+            try:
+                self._conexao.close()  # encerra a sessão: libera o advisory lock
+            except Exception:
+                pass
+            self._conexao = None
+        if self._arquivo is not None:
+            try:
+                fcntl.flock(self._arquivo, fcntl.LOCK_UN)
+            finally:
+                self._arquivo.close()
+                self._arquivo = None
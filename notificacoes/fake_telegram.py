@@ -0,0 +1,202 @@
+# notificacoes/fake_telegram.py
+"""
+Servidor local que imita a Bot API do Telegram, para testes de carga.
+
+Aceita POST /bot<token>/sendMessage (JSON ou form), simula latência, 429 com
+`retry_after` e erros 5xx nas taxas configuradas, e registra todo o tráfego.
+Nada sai da máquina. Uso:
+
+    python manage.py fake_telegram --porta 8081 --taxa-429 0.05
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 python manage.py avisos_telegram --force
+
+ou embutido (ver `carga_webhook`):
+
+    with FakeTelegram(latencia_ms=80) as fake:
+        os.environ["TELEGRAM_API_BASE"] = fake.url
+        ...
+        fake.registros
+"""
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+@dataclass
+class Registro:
+    """Uma chamada recebida pelo servidor falso."""
+    instante: float  # time.perf_counter() do processo do servidor
+    metodo: str
+    chat_id: str
+    texto: str
+    status: int
+
+
+@dataclass
+class FakeTelegram:
+    porta: int = 0  # 0 = porta livre escolhida pelo SO
+    host: str = "127.0.0.1"
+    latencia_ms: float = 50.0
+    jitter_ms: float = 20.0
+    taxa_429: float = 0.0
+    retry_after: int = 1
+    taxa_5xx: float = 0.0
+    semente: int | None = None
+    arquivo: str | None = None  # JSONL com o tráfego (opcional)
+    # status forçados dos próximos sendMessage, em ordem (antes do sorteio)
+    roteiro: list[int] = field(default_factory=list)
+    registros: list[Registro] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.semente)
+        self._proximo_id = 1
+        self._servidor: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self._saida = None
+
+    # ---------- ciclo de vida ----------
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.porta}"
+
+    def iniciar(self) -> "FakeTelegram":
+        fake = self
+
+        class Handler(_Handler):
+            servidor_falso = fake
+
+        class Servidor(ThreadingHTTPServer):
+            request_queue_size = 256  # rajadas de conexões simultâneas
+
+        self._servidor = Servidor((self.host, self.porta), Handler)
+        self._servidor.daemon_threads = True
+        self.porta = self._servidor.server_address[1]
+        if self.arquivo:
+            self._saida = open(self.arquivo, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if self._saida:
+            self._saida.close()
+            self._saida = None
+
+    def servir_para_sempre(self) -> None:
+        self.iniciar()
+        try:
+            self._thread.join()
+        finally:
+            self.parar()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    # ---------- comportamento ----------
+    def _sortear(self) -> tuple[float, int]:
+        """(latência em segundos, status) da próxima resposta."""
+        with self._lock:
+            atraso = max(0.0, self.latencia_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            if self.roteiro:
+                return atraso / 1000, self.roteiro.pop(0)
+            sorteio = self._rng.random()
+        if sorteio < self.taxa_429:
+            return atraso / 1000, 429
+        if sorteio < self.taxa_429 + self.taxa_5xx:
+            return atraso / 1000, 502
+        return atraso / 1000, 200
+
+    def responder(self, metodo: str, dados: dict) -> tuple[int, dict]:
+        if metodo == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "username": "fake_bot"}}
+        if metodo != "sendMessage":
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+
+        atraso, status = self._sortear()
+        time.sleep(atraso)
+        chat_id, texto = str(dados.get("chat_id", "")), str(dados.get("text", ""))
+
+        if status == 429:
+            corpo = {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        elif status >= 500:
+            corpo = {"ok": False, "error_code": status, "description": "Bad Gateway"}
+        elif not chat_id or not texto:
+            status, corpo = 400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"}
+        else:
+            with self._lock:
+                message_id, self._proximo_id = self._proximo_id, self._proximo_id + 1
+            corpo = {"ok": True, "result": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": texto,
+            }}
+
+        self._registrar(Registro(time.perf_counter(), metodo, chat_id, texto, status))
+        return status, corpo
+
+    def _registrar(self, registro: Registro) -> None:
+        with self._lock:
+            self.registros.append(registro)
+            if self._saida:
+                self._saida.write(json.dumps(asdict(registro), ensure_ascii=False) + "\n")
+                self._saida.flush()
+
+    def entregues(self) -> list[Registro]:
+        """Mensagens aceitas (status 200)."""
+        with self._lock:
+            return [r for r in self.registros if r.status == 200]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    servidor_falso: FakeTelegram
+    protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        bruto = self.rfile.read(tamanho) if tamanho else b""
+        tipo = self.headers.get("Content-Type", "")
+        try:
+            if tipo.startswith("application/json"):
+                dados = json.loads(bruto or b"{}")
+            else:
+                dados = {k: v[0] for k, v in parse_qs(bruto.decode("utf-8")).items()}
+        except ValueError:
+            return self._enviar(400, {"ok": False, "error_code": 400, "description": "Bad Request: can't parse"})
+
+        partes = self.path.split("?", 1)[0].strip("/").split("/")
+        if len(partes) != 2 or not partes[0].startswith("bot"):
+            return self._enviar(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        self._enviar(*self.servidor_falso.responder(partes[1], dados))
+
+    do_GET = do_POST
+
+    def _enviar(self, status: int, corpo: dict) -> None:
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        if status == 429:
+            self.send_header("Retry-After", str(corpo["parameters"]["retry_after"]))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):  # silencioso; o tráfego fica em `registros`
+        pass
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
+import logging
 import os
 from decimal import Decimal
 from datetime import date, datetime
 
-import requests
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db.models import Q
 
+from monitoramento.metricas import envios_telegram_no_processo
+from monitoramento.models import ExecucaoTarefa
+from notificacoes.telegram import cliente as cliente_telegram
+
 # ---- importa o modelo Parcela da app correta ----
 try:
     from vendas.models import Parcela  # normalmente está aqui
@@ -15,7 +19,7 @@ except Exception:
     from financeiro.models import Parcela  # fallback se estiver em financeiro
 
 
-TELEGRAM_API = "https://api.telegram.org/bot{token}/sendMessage"
+logger = logging.getLogger(__name__)
 
 
 def brl(valor) -> str:
@@ -28,18 +32,6 @@ def brl(valor) -> str:
     return "R$ " + s.replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-def send_message(token: str, chat_id: str, text: str) -> None:
-    """Dispara mensagem, silenciosamente em caso de erro de rede."""
-    try:
-        requests.post(
-            TELEGRAM_API.format(token=token),
-            json={"chat_id": str(chat_id), "text": text, "parse_mode": "HTML"},
-            timeout=15,
-        )
-    except Exception as e:
-        print(f"[telegram] erro ao enviar para {chat_id}: {e}")
-
-
 class Command(BaseCommand):
     help = "Envia avisos de vencimentos/atrasos das parcelas via Telegram."
 
@@ -183,8 +175,18 @@ class Command(BaseCommand):
                 print(f"\n--- Mensagem {i} ---\n{msg}\n")
             print("===== FIM DRY-RUN =====\n")
         else:
-            for cid in chat_ids:
-                for msg in mensagens:
-                    send_message(token, cid, msg)
+            # este processo não chega ao /metrics: os envios ficam na
+            # ExecucaoTarefa (monitoramento.metricas.ColetorTarefas)
+            antes = envios_telegram_no_processo()
+            with ExecucaoTarefa.registrar("avisos_telegram") as detalhes:
+                lote = [(cid, msg) for cid in chat_ids for msg in mensagens]
+                # um lote só: conexões reaproveitadas, chats em paralelo, ordem mantida por chat
+                respostas = cliente_telegram().enviar_lote(lote, token=token, timeout=15)
+                for resp in respostas:
+                    if not resp.ok:
+                        logger.warning("Telegram falhou para %s [%s]: %s", resp.chat_id, resp.status, resp.texto)
+                detalhes["mensagens"] = len(lote)
+                detalhes["falhas"] = sum(not r.ok for r in respostas)
+                detalhes["telegram"] = dict(envios_telegram_no_processo() - antes)
 
         self.stdout.write(self.style.SUCCESS("Avisos de Telegram processados."))
\ No newline at end of file
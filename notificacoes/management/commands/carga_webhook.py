@@ -0,0 +1,279 @@
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from notificacoes.fake_telegram import FakeTelegram
+from notificacoes.views import WEBHOOK_SECRET
+
+CHAT_BASE = 900_000_000  # chat_ids sintéticos, um por update
+
+
+def _percentil(valores: list[float], p: float) -> float | None:
+    """Percentil por posição mais próxima (valores em segundos, devolve ms)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    i = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return round(ordenados[i] * 1000, 1)
+
+
+def _update(i: int, texto: str) -> dict:
+    chat_id = CHAT_BASE + i
+    return {
+        "update_id": i,
+        "message": {
+            "message_id": i,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": f"Carga {i}"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"Carga {i}"},
+            "text": texto,
+        },
+    }
+
+
+class _Medicao:
+    """Tempos de envio/ack de cada update e a espera pelas respostas no Telegram falso."""
+
+    def __init__(self, fake, n: int):
+        self.fake, self.n = fake, n
+        self.enviado_em: dict[str, float] = {}
+        self.lista_acks: list[float] = []
+        self.acks_falhos = 0
+        self.inicio = time.perf_counter()
+
+    def enviado(self, i: int) -> float:
+        t0 = time.perf_counter()
+        self.enviado_em[str(CHAT_BASE + i)] = t0
+        return t0
+
+    def acks(self, resultados) -> None:
+        for dt, status in resultados:
+            self.lista_acks.append(dt)
+            if status != 200:
+                self.acks_falhos += 1
+
+    def fim_do_envio(self, o) -> None:
+        self.fim_envio = time.perf_counter()
+        self.limite = self.fim_envio + o["espera"]
+        self.silencio = 2.0 + 2 * o["retry_after"]
+        self.vistos, self.mudou_em = 0, self.fim_envio
+
+    def aguardando(self) -> bool:
+        """
+        Continua esperando até o bot responder cada chat, o tráfego silenciar
+        (sem novas tentativas em voo) ou esgotar o tempo.
+        """
+        agora = time.perf_counter()
+        if agora >= self.limite:
+            return False
+        if len({r.chat_id for r in self.fake.entregues()} & self.enviado_em.keys()) >= self.n:
+            return False
+        if len(self.fake.registros) != self.vistos:
+            self.vistos, self.mudou_em = len(self.fake.registros), agora
+        return agora - self.mudou_em <= self.silencio
+
+    def relatorio(self, rajada: int, modo: str) -> dict:
+        fim = time.perf_counter()
+        n, inicio, fim_envio = self.n, self.inicio, self.fim_envio
+        primeira_entrega: dict[str, float] = {}
+        for r in self.fake.entregues():
+            if r.chat_id in self.enviado_em and r.chat_id not in primeira_entrega:
+                primeira_entrega[r.chat_id] = r.instante
+        ponta_a_ponta = [primeira_entrega[c] - self.enviado_em[c] for c in primeira_entrega]
+        por_status: dict[str, int] = {}
+        for r in self.fake.registros:
+            por_status[str(r.status)] = por_status.get(str(r.status), 0) + 1
+        perdidas = n - len(primeira_entrega)
+
+        return {
+            "updates": n,
+            "rajada": rajada,
+            "modo": modo,
+            "duracao_envio_s": round(fim_envio - inicio, 3),
+            "duracao_total_s": round(fim - inicio, 3),
+            "vazao_updates_s": round(n / max(fim_envio - inicio, 1e-9), 1),
+            "vazao_entregas_s": round(len(primeira_entrega) / max(fim - inicio, 1e-9), 1),
+            "ack_ms": {p: _percentil(self.lista_acks, p) for p in (50, 95, 99)},
+            "ponta_a_ponta_ms": {p: _percentil(ponta_a_ponta, p) for p in (50, 95, 99)},
+            "acks_falhos": self.acks_falhos,
+            "telegram_status": por_status,
+            "perdidas": perdidas,
+            "perdidas_pct": round(100 * perdidas / n, 2),
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara rajadas de updates no webhook do Telegram contra um Telegram falso "
+        "local e mede vazão, latência (p50/p95/p99) e mensagens perdidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--updates", type=int, default=200)
+        parser.add_argument("--rajada", type=int, default=50,
+                            help="Updates enviados em paralelo por rajada (padrão: 50).")
+        parser.add_argument("--intervalo-ms", type=float, default=0.0,
+                            help="Pausa entre rajadas (padrão: 0).")
+        parser.add_argument("--textos", default="/help,1,2,3",
+                            help="Textos dos updates, em rodízio (padrão: /help,1,2,3).")
+        parser.add_argument("--alvo",
+                            help="URL base de um servidor já rodando (ex.: http://127.0.0.1:8000). "
+                                 "Sem isso, o webhook roda neste processo.")
+        parser.add_argument("--asgi", action="store_true",
+                            help="No processo, pelo ASGIHandler (webhook async em tarefas) "
+                                 "em vez do caminho WSGI (uma thread por update).")
+        parser.add_argument("--limite-telegram", type=float,
+                            help="Envios/s do cliente Telegram (TELEGRAM_POR_SEGUNDO) nesta rodada.")
+        parser.add_argument("--secret", default=WEBHOOK_SECRET)
+        parser.add_argument("--espera", type=float, default=30.0,
+                            help="Segundos máximos aguardando as respostas do bot (padrão: 30).")
+        # Telegram falso
+        parser.add_argument("--fake-porta", type=int, default=0,
+                            help="Porta do Telegram falso (0 = livre; fixe-a ao usar --alvo).")
+        parser.add_argument("--latencia-ms", type=float, default=50.0)
+        parser.add_argument("--jitter-ms", type=float, default=20.0)
+        parser.add_argument("--taxa-429", type=float, default=0.0)
+        parser.add_argument("--retry-after", type=int, default=1)
+        parser.add_argument("--taxa-5xx", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--saida", help="Grava o relatório em JSON neste arquivo.")
+
+    def handle(self, *args, **o):
+        n, rajada = o["updates"], max(1, o["rajada"])
+        if n <= 0:
+            raise CommandError("--updates deve ser positivo.")
+        textos = [t for t in o["textos"].split(",") if t]
+        if not textos:
+            raise CommandError("--textos vazio.")
+
+        fake = FakeTelegram(
+            porta=o["fake_porta"], latencia_ms=o["latencia_ms"], jitter_ms=o["jitter_ms"],
+            taxa_429=o["taxa_429"], retry_after=o["retry_after"], taxa_5xx=o["taxa_5xx"],
+            semente=o["seed"],
+        )
+        alvo = (o["alvo"] or "").rstrip("/")
+        if alvo and o["asgi"]:
+            raise CommandError("--asgi é para o modo no processo; com --alvo, suba o servidor em ASGI.")
+        env_antigo = {k: os.environ.get(k) for k in ("TELEGRAM_API_BASE", "TELEGRAM_BOT_TOKEN")}
+        if o["limite_telegram"] is not None:
+            # vale para o cliente compartilhado criado no primeiro envio deste processo
+            os.environ["TELEGRAM_POR_SEGUNDO"] = str(o["limite_telegram"])
+
+        with fake:
+            if alvo:
+                self.stdout.write(
+                    f"Telegram falso em {fake.url}; o servidor alvo deve rodar com "
+                    f"TELEGRAM_API_BASE={fake.url}"
+                )
+                sessao = requests.Session()
+
+                def postar(payload):
+                    r = sessao.post(f"{alvo}/notificacoes/telegram/{o['secret']}/", json=payload, timeout=30)
+                    return r.status_code
+            else:
+                # nada sai da máquina: token fictício e API apontando para o falso
+                os.environ["TELEGRAM_API_BASE"] = fake.url
+                os.environ["TELEGRAM_BOT_TOKEN"] = "0:carga"
+                setup_test_environment()
+                cliente = Client()
+
+                def postar(payload):
+                    r = cliente.post(
+                        f"/notificacoes/telegram/{o['secret']}/",
+                        data=json.dumps(payload), content_type="application/json",
+                    )
+                    return r.status_code
+
+            try:
+                if o["asgi"]:
+                    relatorio = asyncio.run(self._rodar_asgi(fake, n, rajada, textos, o))
+                else:
+                    relatorio = self._rodar(fake, postar, n, rajada, textos, o)
+            finally:
+                if not alvo:
+                    teardown_test_environment()
+                    for k, v in env_antigo.items():
+                        if v is None:
+                            os.environ.pop(k, None)
+                        else:
+                            os.environ[k] = v
+
+        self._imprimir(relatorio)
+        if o["saida"]:
+            with open(o["saida"], "w", encoding="utf-8") as fh:
+                json.dump(relatorio, fh, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {o['saida']}"))
+
+    def _rodar(self, fake, postar, n, rajada, textos, o) -> dict:
+        med = _Medicao(fake, n)
+
+        def disparar(i):
+            payload = _update(i, textos[i % len(textos)])
+            t0 = med.enviado(i)
+            try:
+                status = postar(payload)
+            except Exception:
+                status = None
+            return time.perf_counter() - t0, status
+
+        with ThreadPoolExecutor(max_workers=rajada) as pool:
+            for base in range(0, n, rajada):
+                med.acks(pool.map(disparar, range(base, min(n, base + rajada))))
+                if o["intervalo_ms"] and base + rajada < n:
+                    time.sleep(o["intervalo_ms"] / 1000)
+        med.fim_do_envio(o)
+        while med.aguardando():
+            time.sleep(0.05)
+        return med.relatorio(rajada, "alvo" if o["alvo"] else "wsgi")
+
+    async def _rodar_asgi(self, fake, n, rajada, textos, o) -> dict:
+        # mesmo processo, mas pelo ASGIHandler: updates viram tarefas neste loop
+        cliente = AsyncClient()
+        med = _Medicao(fake, n)
+
+        async def disparar(i):
+            payload = _update(i, textos[i % len(textos)])
+            t0 = med.enviado(i)
+            try:
+                r = await cliente.post(
+                    f"/notificacoes/telegram/{o['secret']}/",
+                    data=json.dumps(payload), content_type="application/json",
+                )
+                status = r.status_code
+            except Exception:
+                status = None
+            return time.perf_counter() - t0, status
+
+        for base in range(0, n, rajada):
+            med.acks(await asyncio.gather(*(disparar(i) for i in range(base, min(n, base + rajada)))))
+            if o["intervalo_ms"] and base + rajada < n:
+                await asyncio.sleep(o["intervalo_ms"] / 1000)
+        med.fim_do_envio(o)
+        while med.aguardando():
+            await asyncio.sleep(0.05)
+        return med.relatorio(rajada, "asgi")
+
+    def _imprimir(self, r: dict) -> None:
+        def pct(d):
+            return " / ".join("-" if v is None else f"{v:.1f}" for v in d.values())
+
+        self.stdout.write(
+            f"{r['updates']} updates em rajadas de {r['rajada']} ({r['modo']}) — "
+            f"envio {r['duracao_envio_s']}s, total {r['duracao_total_s']}s"
+        )
+        self.stdout.write(f"  vazão: {r['vazao_updates_s']} updates/s, {r['vazao_entregas_s']} entregas/s")
+        self.stdout.write(f"  ack do webhook p50/p95/p99 (ms):      {pct(r['ack_ms'])}")
+        self.stdout.write(f"  update→resposta p50/p95/p99 (ms):     {pct(r['ponta_a_ponta_ms'])}")
+        self.stdout.write(f"  respostas do Telegram por status:     {r['telegram_status']}")
+        estilo = self.style.ERROR if r["perdidas"] or r["acks_falhos"] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"  perdidas: {r['perdidas']} ({r['perdidas_pct']}%), acks com erro: {r['acks_falhos']}"
+        ))
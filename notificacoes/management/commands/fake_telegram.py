@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from notificacoes.fake_telegram import FakeTelegram
+
+
+class Command(BaseCommand):
+    help = (
+        "Sobe um servidor local que imita a Bot API do Telegram (sendMessage), com "
+        "latência, 429 e 5xx simulados. Aponte TELEGRAM_API_BASE para ele."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--porta", type=int, default=8081)
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--latencia-ms", type=float, default=50.0)
+        parser.add_argument("--jitter-ms", type=float, default=20.0)
+        parser.add_argument("--taxa-429", type=float, default=0.0,
+                            help="Fração de respostas 429 (0 a 1).")
+        parser.add_argument("--retry-after", type=int, default=1,
+                            help="Segundos informados em parameters.retry_after (padrão: 1).")
+        parser.add_argument("--taxa-5xx", type=float, default=0.0,
+                            help="Fração de respostas 502 (0 a 1).")
+        parser.add_argument("--registro",
+                            help="Arquivo JSONL onde gravar cada chamada recebida.")
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **o):
+        fake = FakeTelegram(
+            porta=o["porta"], host=o["host"],
+            latencia_ms=o["latencia_ms"], jitter_ms=o["jitter_ms"],
+            taxa_429=o["taxa_429"], retry_after=o["retry_after"], taxa_5xx=o["taxa_5xx"],
+            semente=o["seed"], arquivo=o["registro"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Telegram falso em {fake.url} — use TELEGRAM_API_BASE={fake.url} (Ctrl+C para sair)"
+        ))
+        try:
+            fake.servir_para_sempre()
+        except KeyboardInterrupt:
+            pass
+        entregues = len(fake.entregues())
+        self.stdout.write(f"{len(fake.registros)} chamadas, {entregues} mensagens aceitas.")
@@ -0,0 +1,91 @@
+# notificacoes/management/commands/scheduler.py
+import signal
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from config.replica import usar_replica
+from monitoramento.models import ExecucaoTarefa
+from notificacoes.agendador import TravaLider, jobs_ativos
+
+
+class Command(BaseCommand):
+    help = (
+        "Processo único que executa as rotinas (avisos, vencidas, resumos) "
+        "nas suas expressões cron; só o líder (advisory lock no banco) executa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listar", action="store_true",
+                            help="Mostra as rotinas e o próximo disparo de cada uma e sai.")
+        parser.add_argument("--executar", metavar="NOME",
+                            help="Executa uma rotina agora (registrando) e sai.")
+        parser.add_argument("--intervalo", type=float, default=30.0,
+                            help="Segundos máximos entre verificações da trava (padrão: 30).")
+        parser.add_argument("--trava", choices=["auto", "pg", "arquivo", "nenhuma"], default="auto",
+                            help="auto = advisory lock em PostgreSQL, arquivo nos demais bancos.")
+
+    def handle(self, *args, **o):
+        jobs = jobs_ativos()
+        agora = timezone.localtime()
+
+        if o["listar"]:
+            for job, cron in jobs:
+                self.stdout.write(f"{job.nome:<22} {cron.expressao:<16} próximo: {cron.proxima(agora):%d/%m %H:%M}")
+            return
+
+        if o["executar"]:
+            por_nome = {job.nome: job for job, _ in jobs}
+            if o["executar"] not in por_nome:
+                raise CommandError(f"Rotina desconhecida: {o['executar']} (opções: {', '.join(por_nome)})")
+            self._executar(por_nome[o["executar"]])
+            return
+
+        parar = threading.Event()
+        for sinal in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sinal, lambda *_: parar.set())
+
+        trava = TravaLider(o["trava"])
+        proximos = {job.nome: cron.proxima(agora) for job, cron in jobs}
+        lider = None
+        self.stdout.write(f"Agendador iniciado ({len(jobs)} rotina(s), trava={trava.modo}).")
+        try:
+            while not parar.is_set():
+                agora = timezone.localtime()
+                agora_lider = trava.tentar()
+                if agora_lider != lider:
+                    lider = agora_lider
+                    self.stdout.write("Assumiu a liderança." if lider else "Em espera: outra instância é líder.")
+                for job, cron in jobs:
+                    if proximos[job.nome] > agora:
+                        continue
+                    # disparos perdidos (processo parado, rotina longa) viram um só
+                    proximos[job.nome] = cron.proxima(agora)
+                    if lider and not parar.is_set():
+                        self._executar(job)
+                        agora = timezone.localtime()
+                espera = min(proximos.values(), default=agora) - timezone.localtime()
+                parar.wait(max(0.5, min(o["intervalo"], espera.total_seconds())))
+        finally:
+            trava.liberar()
+            self.stdout.write("Agendador encerrado.")
+
+    def _executar(self, job) -> None:
+        # processo longo: descarta conexões caídas ou vencidas (CONN_MAX_AGE) antes de cada rotina
+        close_old_connections()
+        t0 = time.monotonic()
+        try:
+            with ExecucaoTarefa.registrar(f"agendador:{job.nome}") as detalhes:
+                detalhes["comando"] = job.comando
+                with usar_replica(job.replica):
+                    call_command(job.comando, stdout=self.stdout, stderr=self.stderr, **job.kwargs)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"[{job.nome}] falhou: {type(e).__name__}: {e}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"[{job.nome}] ok em {time.monotonic() - t0:.1f}s"))
+        finally:
+            close_old_connections()
@@ -8,4 +8,5 @@ class DestinatarioTelegram(models.Model):
     ativo = models.BooleanField(default=True)
 
     def __str__(self):
-        return f"{self.nome} ({self.chat_id})"
\ No newline at end of file
+        return f"{self.nome} ({self.chat_id})"
+
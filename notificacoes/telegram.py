@@ -1,6 +1,347 @@
 # notificacoes/telegram.py
+"""
+Cliente único da Bot API do Telegram. Todo envio do projeto passa por aqui
+(utils.tg_send, views.tg_send_safe, avisos_telegram), então todos compartilham:
+
+- uma `requests.Session` keep-alive com pool de conexões dimensionado;
+- timeouts explícitos de conexão e leitura;
+- limite de taxa global (token bucket) abaixo do limite do Telegram;
+- novas tentativas em 429 (respeitando `retry_after`), 5xx e erro de rede;
+- quebra automática de textos acima de 4096 caracteres;
+- métricas (monitoramento.metricas) a cada tentativa.
+
+Uso:
+
+    from notificacoes.telegram import cliente
+    cliente().enviar(chat_id, "<b>Oi</b>")
+    cliente().enviar_lote([(cid, msg) for cid in ids])
+    await cliente().aenviar(chat_id, "Oi")
+
+A interface asyncio usa httpx (opcional) com o mesmo pool/limites; sem
+httpx instalado, cai para o cliente síncrono em uma thread.
+"""
+from __future__ import annotations
+
+import asyncio
 import os
+import ssl
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import certifi
 import requests
+from requests.adapters import HTTPAdapter
+
+from monitoramento.metricas import observar_envio_telegram
+
+try:  # opcional: cliente HTTP assíncrono (modo ASGI)
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+# Base da Bot API. Em testes de carga aponte para o servidor falso
+# (`manage.py fake_telegram`), ex.: TELEGRAM_API_BASE=http://127.0.0.1:8081
+API_BASE_PADRAO = "https://api.telegram.org"
+
+LIMITE_TEXTO = 4096  # caracteres por mensagem na Bot API
+
+
+def api_url(token: str, metodo: str = "sendMessage") -> str:
+    """URL de um método da Bot API, respeitando TELEGRAM_API_BASE (lida a cada chamada)."""
+    base = (os.getenv("TELEGRAM_API_BASE") or API_BASE_PADRAO).rstrip("/")
+    return f"{base}/bot{token}/{metodo}"
+
+
+def partir_texto(texto: str, limite: int = LIMITE_TEXTO) -> list[str]:
+    """Quebra o texto em pedaços de até `limite` caracteres, preferindo quebras de linha."""
+    if len(texto) <= limite:
+        return [texto]
+    partes, atual = [], ""
+    for linha in texto.splitlines(keepends=True):
+        while len(linha) > limite:  # linha sozinha maior que o limite
+            if atual:
+                partes.append(atual)
+                atual = ""
+            partes.append(linha[:limite])
+            linha = linha[limite:]
+        if len(atual) + len(linha) > limite:
+            partes.append(atual)
+            atual = ""
+        atual += linha
+    if atual:
+        partes.append(atual)
+    return [p.rstrip("\n") for p in partes if p.strip()]
+
+
+@dataclass
+class Resposta:
+    """Resultado de um envio (após as novas tentativas)."""
+    chat_id: str
+    status: int | None  # None = erro de rede/timeout
+    corpo: dict = field(default_factory=dict)
+    tentativas: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and bool(self.corpo.get("ok", True))
+
+    @property
+    def texto(self) -> str:
+        return self.corpo.get("description") or self.corpo.get("error") or ""
+
+
+class _Balde:
+    """Token bucket thread-safe: até `por_segundo` envios/s, com rajada igual à taxa."""
+
+    def __init__(self, por_segundo: float):
+        self.taxa = float(por_segundo)
+        self.fichas = self.taxa
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self) -> float:
+        """Consome uma ficha (0.0) ou devolve quantos segundos faltam para haver uma."""
+        with self._lock:
+            agora = time.monotonic()
+            self.fichas = min(self.taxa, self.fichas + (agora - self.ultimo) * self.taxa)
+            self.ultimo = agora
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return 0.0
+            return (1 - self.fichas) / self.taxa
+
+    def esperar(self) -> None:
+        while self.taxa > 0 and (falta := self._reservar()):
+            time.sleep(falta)
+
+    async def aesperar(self) -> None:
+        while self.taxa > 0 and (falta := self._reservar()):
+            await asyncio.sleep(falta)
+
+
+def _corpo(r) -> dict:
+    """JSON da resposta (requests ou httpx), ou a descrição em texto."""
+    try:
+        return r.json()
+    except ValueError:
+        return {"ok": False, "description": r.text}
+
+
+class TelegramClient:
+    """
+    Cliente HTTP da Bot API. Thread-safe; use a instância compartilhada de
+    `cliente()` para aproveitar o pool de conexões.
+    O token é lido de TELEGRAM_BOT_TOKEN a cada envio, salvo se passado.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout_conexao: float = 3.05,
+        timeout_leitura: float = 10.0,
+        pool: int = 16,
+        por_segundo: float = 25.0,  # Telegram aceita ~30 msg/s por bot
+        tentativas: int = 3,
+        espera_max_429: float = 10.0,
+    ):
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tentativas = max(1, tentativas)
+        self.espera_max_429 = espera_max_429
+        self.pool = pool
+        self.balde = _Balde(por_segundo)
+        self.sessao = requests.Session()
+        # pool_block: com mais threads que conexões, espera uma livre em vez de abrir/descartar
+        adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=pool, pool_block=True, max_retries=0)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+        # httpx.AsyncClient é preso ao event loop: um por loop
+        self._clientes_async: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._contexto_ssl = None
+
+    # ---------- síncrono ----------
+    def enviar(self, chat_id: str | int, texto: str, **kwargs) -> Resposta:
+        """
+        Envia `texto` para um chat (em várias mensagens se passar de 4096
+        caracteres). Nunca levanta por erro de rede; veja `Resposta.ok`.
+        Devolve a resposta da última parte (ou da primeira que falhar).
+
+        kwargs: parse_mode ("HTML" por padrão; None desliga),
+        disable_web_page_preview, disable_notification, token, timeout (leitura, s).
+        """
+        url, timeouts, payloads = self._preparar(chat_id, texto, **kwargs)
+        resposta = None
+        for payload in payloads:
+            resposta = self._post(url, payload, timeouts)
+            if not resposta.ok:
+                break
+        return resposta or Resposta(str(chat_id), 400, {"ok": False, "description": "texto vazio"})
+
+    def _preparar(
+        self,
+        chat_id,
+        texto: str,
+        *,
+        parse_mode: str | None = "HTML",
+        disable_web_page_preview: bool | None = None,
+        disable_notification: bool = False,
+        token: str | None = None,
+        timeout: float | None = None,
+    ):
+        token = token or os.getenv("TELEGRAM_BOT_TOKEN", "")
+        if not token:
+            raise RuntimeError("TELEGRAM_BOT_TOKEN não configurado")
+        timeouts = (self.timeout[0], timeout) if timeout else self.timeout
+        payloads = []
+        for parte in partir_texto(texto):
+            payload = {"chat_id": str(chat_id), "text": parte}
+            if parse_mode:
+                payload["parse_mode"] = parse_mode
+            if disable_web_page_preview is not None:
+                payload["disable_web_page_preview"] = disable_web_page_preview
+            if disable_notification:
+                payload["disable_notification"] = True
+            payloads.append(payload)
+        return api_url(token), timeouts, payloads
+
+    def _avaliar(self, chat_id: str, tentativa: int, status: int | None, corpo: dict):
+        """(Resposta, segundos até a próxima tentativa ou None para parar)."""
+        resposta = Resposta(chat_id, status, corpo, tentativa)
+        if status is None or status >= 500:
+            espera = 0.5 * 2 ** (tentativa - 1)
+        elif status == 429:
+            espera = float((corpo.get("parameters") or {}).get("retry_after") or 1)
+            if espera > self.espera_max_429:
+                espera = None
+        else:
+            espera = None
+        if tentativa >= self.tentativas:
+            espera = None
+        return resposta, espera
+
+    def _post(self, url: str, payload: dict, timeouts) -> Resposta:
+        for tentativa in range(1, self.tentativas + 1):
+            self.balde.esperar()
+            t0 = time.perf_counter()
+            try:
+                r = self.sessao.post(url, json=payload, timeout=timeouts)
+            except requests.RequestException as e:
+                status, corpo = None, {"ok": False, "error": str(e)}
+            else:
+                status, corpo = r.status_code, _corpo(r)
+            observar_envio_telegram(status, time.perf_counter() - t0)
+            resposta, espera = self._avaliar(payload["chat_id"], tentativa, status, corpo)
+            if espera is None:
+                return resposta
+            time.sleep(espera)
+        return resposta
+
+    def enviar_lote(
+        self,
+        mensagens: Iterable[tuple[str | int, str]],
+        *,
+        paralelo: int = 4,
+        **kwargs,
+    ) -> list[Resposta]:
+        """
+        Envia vários (chat_id, texto) reaproveitando o pool, até `paralelo`
+        em voo ao mesmo tempo; o limite de taxa continua valendo.
+        Mensagens para o mesmo chat saem na ordem dada.
+        """
+        por_chat: dict[str, list[str]] = {}
+        for chat_id, texto in mensagens:
+            por_chat.setdefault(str(chat_id), []).append(texto)
+
+        def _chat(item):
+            chat_id, textos = item
+            return [self.enviar(chat_id, t, **kwargs) for t in textos]
+
+        if len(por_chat) <= 1 or paralelo <= 1:
+            return [r for item in por_chat.items() for r in _chat(item)]
+        with ThreadPoolExecutor(max_workers=min(paralelo, self.pool)) as ex:
+            return [r for lote in ex.map(_chat, por_chat.items()) for r in lote]
+
+    # ---------- asyncio ----------
+    def _ssl(self):
+        # carregar as CAs custa dezenas de ms: um contexto só para todos os loops
+        if self._contexto_ssl is None:
+            self._contexto_ssl = ssl.create_default_context(cafile=certifi.where())
+        return self._contexto_ssl
+
+    def _cliente_async(self):
+        loop = asyncio.get_running_loop()
+        c = self._clientes_async.get(loop)
+        if c is None:
+            c = httpx.AsyncClient(verify=self._ssl(), limits=httpx.Limits(
+                max_connections=self.pool, max_keepalive_connections=self.pool,
+            ))
+            self._clientes_async[loop] = c
+        return c
+
+    async def aenviar(self, chat_id: str | int, texto: str, **kwargs) -> Resposta:
+        """Como `enviar`, sem bloquear o event loop."""
+        if httpx is None:
+            return await asyncio.to_thread(self.enviar, chat_id, texto, **kwargs)
+        url, timeouts, payloads = self._preparar(chat_id, texto, **kwargs)
+        resposta = None
+        for payload in payloads:
+            resposta = await self._apost(url, payload, timeouts)
+            if not resposta.ok:
+                break
+        return resposta or Resposta(str(chat_id), 400, {"ok": False, "description": "texto vazio"})
+
+    async def _apost(self, url: str, payload: dict, timeouts) -> Resposta:
+        http = self._cliente_async()
+        timeout = httpx.Timeout(timeouts[1], connect=timeouts[0])
+        for tentativa in range(1, self.tentativas + 1):
+            await self.balde.aesperar()
+            t0 = time.perf_counter()
+            try:
+                r = await http.post(url, json=payload, timeout=timeout)
+            except httpx.HTTPError as e:
+                status, corpo = None, {"ok": False, "error": str(e)}
+            else:
+                status, corpo = r.status_code, _corpo(r)
+            observar_envio_telegram(status, time.perf_counter() - t0)
+            resposta, espera = self._avaliar(payload["chat_id"], tentativa, status, corpo)
+            if espera is None:
+                return resposta
+            await asyncio.sleep(espera)
+        return resposta
+
+    async def aenviar_lote(self, mensagens: Iterable[tuple[str | int, str]], **kwargs) -> list[Resposta]:
+        """Como `enviar_lote`: chats em paralelo, ordem mantida dentro de cada chat."""
+        kwargs.pop("paralelo", None)
+        por_chat: dict[str, list[str]] = {}
+        for chat_id, texto in mensagens:
+            por_chat.setdefault(str(chat_id), []).append(texto)
+
+        async def _chat(chat_id, textos):
+            return [await self.aenviar(chat_id, t, **kwargs) for t in textos]
+
+        lotes = await asyncio.gather(*(_chat(c, t) for c, t in por_chat.items()))
+        return [r for lote in lotes for r in lote]
+
+
+_cliente: TelegramClient | None = None
+_cliente_lock = threading.Lock()
+
+
+def cliente() -> TelegramClient:
+    """Instância compartilhada pelo processo (um pool de conexões só)."""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = TelegramClient(
+                    pool=int(os.getenv("TELEGRAM_POOL", "16")),
+                    por_segundo=float(os.getenv("TELEGRAM_POR_SEGUNDO", "25")),
+                )
+    return _cliente
+
 
 def tg_send(texto: str, chat_id: str | None = None) -> None:
     """
@@ -8,8 +349,7 @@ def tg_send(texto: str, chat_id: str | None = None) -> None:
     - Usa TELEGRAM_BOT_TOKEN e TELEGRAM_CHAT_IDS (se não for passado chat_id).
     - Silenciosa em caso de erro de rede (não derruba execução).
     """
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not token:
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
         raise RuntimeError("TELEGRAM_BOT_TOKEN não configurado")
 
     if not chat_id:
@@ -18,13 +358,4 @@ def tg_send(texto: str, chat_id: str | None = None) -> None:
             raise RuntimeError("TELEGRAM_CHAT_IDS não configurado")
         chat_id = chats.split(",")[0].strip()
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    try:
-        requests.post(
-            url,
-            json={"chat_id": chat_id, "text": texto, "parse_mode": "HTML"},
-            timeout=15,
-        )
-    except Exception:
-        # não quebra a execução se houver falha de rede/timeout
-        pass
\ No newline at end of file
+    cliente().enviar(chat_id, texto)
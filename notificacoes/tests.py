@@ -1,3 +1,257 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from monitoramento.metricas import observar_envio_telegram
+from monitoramento.models import ExecucaoTarefa
+from notificacoes import views
+from notificacoes.agendador import JOBS, Cron, jobs_ativos
+from notificacoes.fake_telegram import FakeTelegram
+from notificacoes.telegram import Resposta, TelegramClient, partir_texto
+from testes.apoio import criar_vendas
+from vendas.models import Parcela
+from vendas.sintetico import gerar_carteira_sintetica
+
+SEGUNDA = datetime(2026, 10, 19, 10, 7, 30)  # segunda-feira
+
+
+class CronTests(SimpleTestCase):
+    def test_campos(self):
+        cron = Cron("0 9-17/4 1,15 * 1-5")
+        self.assertEqual(cron.minutos, {0})
+        self.assertEqual(cron.horas, {9, 13, 17})
+        self.assertEqual(cron.dias, {1, 15})
+        self.assertEqual(cron.meses, set(range(1, 13)))
+        self.assertEqual(cron.semana, {1, 2, 3, 4, 5})
+
+    def test_domingo_como_7(self):
+        self.assertEqual(Cron("0 0 * * 7").semana, {0})
+        self.assertEqual(Cron("0 0 * * 5-7").semana, {5, 6, 0})
+
+    def test_expressoes_invalidas(self):
+        for expressao in ("* * * *", "60 * * * *", "* 24 * * *", "0 0 0 * *", "0 0 * 13 *",
+                          "0 0 * * 8", "5-1 * * * *", "*/0 * * * *", "x * * * *"):
+            with self.subTest(expressao), self.assertRaises(ValueError):
+                Cron(expressao)
+
+    def test_proxima_e_estritamente_depois(self):
+        cron = Cron("*/15 * * * *")
+        self.assertEqual(cron.proxima(SEGUNDA), datetime(2026, 10, 19, 10, 15))
+        self.assertEqual(cron.proxima(datetime(2026, 10, 19, 10, 15)), datetime(2026, 10, 19, 10, 30))
+
+    def test_proxima_vira_dia_mes_e_ano(self):
+        self.assertEqual(Cron("5 0 * * *").proxima(SEGUNDA), datetime(2026, 10, 20, 0, 5))
+        self.assertEqual(Cron("0 0 1 * *").proxima(SEGUNDA), datetime(2026, 11, 1))
+        self.assertEqual(Cron("0 0 1 1 *").proxima(SEGUNDA), datetime(2027, 1, 1))
+        self.assertEqual(Cron("0 12 29 2 *").proxima(SEGUNDA), datetime(2028, 2, 29, 12))
+
+    def test_proxima_dia_da_semana(self):
+        self.assertEqual(Cron("30 4 * * 0").proxima(SEGUNDA), datetime(2026, 10, 25, 4, 30))
+
+    def test_dia_e_semana_restritos_vale_qualquer_um(self):
+        # como no cron: dia 1 OU segunda-feira
+        cron = Cron("0 12 1 * 1")
+        self.assertEqual(cron.proxima(SEGUNDA), datetime(2026, 10, 19, 12))
+        self.assertEqual(cron.proxima(datetime(2026, 10, 27)), datetime(2026, 11, 1, 12))
+
+    def test_expressao_que_nunca_dispara(self):
+        with self.assertRaises(ValueError):
+            Cron("0 0 31 2 *").proxima(SEGUNDA)
+
+
+class JobsTests(SimpleTestCase):
+    def test_expressoes_das_rotinas_sao_validas(self):
+        self.assertEqual(len(jobs_ativos()), len(JOBS))
+
+    def test_agendador_cron_troca_ou_desliga(self):
+        nome = JOBS[0].nome
+        with override_settings(AGENDADOR_CRON={nome: ""}):
+            self.assertNotIn(nome, [job.nome for job, _ in jobs_ativos()])
+        with override_settings(AGENDADOR_CRON={nome: "0 6 * * *"}):
+            cron = dict((job.nome, c) for job, c in jobs_ativos())[nome]
+            self.assertEqual(cron.expressao, "0 6 * * *")
+
+
+@mock.patch.dict(os.environ, {"TELEGRAM_BOT_TOKEN": "t", "TELEGRAM_CHAT_IDS": "1,2"})
+class AvisosTelegramTests(TestCase):
+    def setUp(self):
+        gerar_carteira_sintetica(vendas=2, semente=3, mensagens=0)
+        Parcela.objects.update(status="PENDENTE", vencimento=timezone.localdate())
+
+    def test_envia_um_lote_para_todos_os_chats(self):
+        with mock.patch("notificacoes.management.commands.avisos_telegram.cliente_telegram") as cliente:
+            cliente.return_value.enviar_lote.return_value = [Resposta("1", 200), Resposta("2", 200)]
+            call_command("avisos_telegram", force=True, stdout=io.StringIO())
+        (lote,), kwargs = cliente.return_value.enviar_lote.call_args
+        self.assertEqual([cid for cid, _ in lote], ["1", "2"])
+        self.assertIn("Vencimentos de HOJE", lote[0][1])
+        self.assertEqual(kwargs["token"], "t")
+
+    def test_grava_os_envios_na_execucao(self):
+        def enviar_lote(lote, **kwargs):
+            for _ in lote:
+                observar_envio_telegram(200, 0.01)
+            observar_envio_telegram(429, 0.01)
+            return [Resposta(str(cid), 200) for cid, _ in lote]
+
+        with mock.patch("notificacoes.management.commands.avisos_telegram.cliente_telegram") as cliente:
+            cliente.return_value.enviar_lote.side_effect = enviar_lote
+            call_command("avisos_telegram", force=True, stdout=io.StringIO())
+        execucao = ExecucaoTarefa.objects.get(tarefa="avisos_telegram")
+        self.assertEqual(execucao.detalhes["telegram"], {"ok": 2, "429": 1})
+        self.assertEqual((execucao.detalhes["mensagens"], execucao.detalhes["falhas"]), (2, 0))
+
+    def test_dry_run_nao_registra(self):
+        with redirect_stdout(io.StringIO()):  # o dry-run imprime as mensagens com print()
+            call_command("avisos_telegram", force=True, dry_run=True, stdout=io.StringIO())
+        self.assertFalse(ExecucaoTarefa.objects.exists())
+
+
+class PartirTextoTests(SimpleTestCase):
+    def test_texto_curto_fica_inteiro(self):
+        self.assertEqual(partir_texto("oi\n"), ["oi\n"])
+
+    def test_quebra_nas_linhas(self):
+        texto = "aaaa\nbbbb\ncccc"
+        self.assertEqual(partir_texto(texto, limite=10), ["aaaa\nbbbb", "cccc"])
+
+    def test_linha_maior_que_o_limite(self):
+        self.assertEqual(partir_texto("x" * 25, limite=10), ["x" * 10, "x" * 10, "x" * 5])
+        self.assertEqual(partir_texto("ab\n" + "x" * 12, limite=10), ["ab", "x" * 10, "xx"])
+
+
+class FakeTelegramTestCase(SimpleTestCase):
+    """Servidor falso sem latência, TELEGRAM_API_BASE apontando para ele e `sleep` do cliente anotado."""
+
+    def setUp(self):
+        self.fake = FakeTelegram(latencia_ms=0, jitter_ms=0, retry_after=2).iniciar()
+        self.addCleanup(self.fake.parar)
+        env = mock.patch.dict(os.environ, {"TELEGRAM_API_BASE": self.fake.url, "TELEGRAM_BOT_TOKEN": "t"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.sleep = mock.Mock()
+        relogio = mock.patch("notificacoes.telegram.time", mock.Mock(wraps=time, sleep=self.sleep))
+        relogio.start()
+        self.addCleanup(relogio.stop)
+
+    def status_recebidos(self):
+        return [r.status for r in self.fake.registros]
+
+
+class TelegramClientTests(FakeTelegramTestCase):
+    def test_429_espera_o_retry_after(self):
+        self.fake.roteiro = [429]
+        resp = TelegramClient(por_segundo=0).enviar(1, "oi")
+        self.assertTrue(resp.ok)
+        self.assertEqual(resp.tentativas, 2)
+        self.assertEqual(self.status_recebidos(), [429, 200])
+        self.sleep.assert_called_once_with(2.0)
+
+    def test_429_acima_da_espera_maxima_desiste(self):
+        self.fake.roteiro = [429]
+        resp = TelegramClient(por_segundo=0, espera_max_429=1).enviar(1, "oi")
+        self.assertEqual((resp.status, resp.tentativas), (429, 1))
+        self.assertIn("retry after 2", resp.texto)
+        self.sleep.assert_not_called()
+
+    def test_5xx_tenta_de_novo_com_espera_crescente(self):
+        self.fake.roteiro = [502, 502]
+        resp = TelegramClient(por_segundo=0).enviar(1, "oi")
+        self.assertTrue(resp.ok)
+        self.assertEqual(self.status_recebidos(), [502, 502, 200])
+        self.assertEqual([c.args for c in self.sleep.call_args_list], [(0.5,), (1.0,)])
+
+    def test_5xx_esgota_as_tentativas(self):
+        self.fake.roteiro = [502, 502, 502, 200]
+        resp = TelegramClient(por_segundo=0, tentativas=3).enviar(1, "oi")
+        self.assertEqual((resp.status, resp.tentativas), (502, 3))
+        self.assertEqual(self.status_recebidos(), [502, 502, 502])
+
+    def test_texto_longo_sai_em_partes(self):
+        linhas = [f"linha {n:04d} " + "x" * 40 for n in range(200)]  # ~10 mil caracteres
+        resp = TelegramClient(por_segundo=0).enviar(1, "\n".join(linhas))
+        self.assertTrue(resp.ok)
+        partes = [r.texto for r in self.fake.entregues()]
+        self.assertEqual(len(partes), 3)
+        self.assertTrue(all(len(p) <= 4096 for p in partes))
+        self.assertEqual("\n".join(partes).splitlines(), linhas)
+
+    def test_parte_que_falha_interrompe_o_envio(self):
+        self.fake.roteiro = [200, 400]
+        resp = TelegramClient(por_segundo=0).enviar(1, "a" * 5000)
+        self.assertEqual(resp.status, 400)
+        self.assertEqual(len(self.fake.registros), 2)
+
+    def test_lote_mantem_a_ordem_dentro_de_cada_chat(self):
+        self.fake.latencia_ms, self.fake.jitter_ms = 3, 3  # chats terminam fora de ordem entre si
+        mensagens = [(chat, f"{chat}-{n}") for n in range(5) for chat in ("a", "b", "c")]
+        respostas = TelegramClient(por_segundo=0).enviar_lote(mensagens, paralelo=3)
+        self.assertTrue(all(r.ok for r in respostas))
+        for chat in ("a", "b", "c"):
+            with self.subTest(chat=chat):
+                recebidas = [r.texto for r in self.fake.registros if r.chat_id == chat]
+                self.assertEqual(recebidas, [f"{chat}-{n}" for n in range(5)])
+
+
+class WebhookMenuTests(TransactionTestCase):
+    """Menu 1/2/3 de ponta a ponta: update no webhook, resposta no servidor falso."""
+
+    def setUp(self):
+        self.fake = FakeTelegram(latencia_ms=0, jitter_ms=0).iniciar()
+        self.addCleanup(self.fake.parar)
+        env = mock.patch.dict(os.environ, {"TELEGRAM_API_BASE": self.fake.url, "TELEGRAM_BOT_TOKEN": "t"})
+        env.start()
+        self.addCleanup(env.stop)
+        hoje = timezone.localdate()
+        self.venda = criar_vendas(1, parcelas=4)[0]
+        parcelas = list(self.venda.parcelas.order_by("numero"))
+        Parcela.objects.filter(pk=parcelas[0].pk).update(status="VENCIDO", vencimento=hoje - timedelta(days=3))
+        Parcela.objects.filter(pk=parcelas[1].pk).update(status="PENDENTE", vencimento=hoje)
+
+    def url(self):
+        return f"/telegram/{views.WEBHOOK_SECRET}/"
+
+    @staticmethod
+    def update(chat_id: int, texto: str) -> str:
+        return json.dumps({"update_id": chat_id, "message": {"chat": {"id": chat_id}, "text": texto}})
+
+    def respostas(self) -> dict[str, str]:
+        return {r.chat_id: r.texto for r in self.fake.entregues()}
+
+    def assertMenu(self, respostas):
+        self.assertIn("Vencimentos de HOJE", respostas["101"])
+        self.assertIn(f"Venda #{self.venda.pk}", respostas["101"])
+        self.assertIn("Parc. 2/4", respostas["101"])
+        self.assertIn("Parcelas ATRASADAS", respostas["102"])
+        self.assertIn("Parc. 1/4", respostas["102"])
+        self.assertIn("Vencem HOJE: 1", respostas["103"])
+        self.assertIn("Atrasadas: 1", respostas["103"])
+
+    def test_menu_wsgi(self):
+        for chat_id, texto in ((101, "1"), (102, "2"), (103, "3")):
+            resp = self.client.post(self.url(), self.update(chat_id, texto), content_type="application/json")
+            self.assertEqual(resp.content, b"ok")
+        limite = time.monotonic() + 10
+        while len(self.respostas()) < 3 and time.monotonic() < limite:
+            time.sleep(0.02)
+        self.assertMenu(self.respostas())
+
+    async def test_menu_asgi(self):
+        for chat_id, texto in ((101, "1"), (102, "2"), (103, "3")):
+            resp = await self.async_client.post(self.url(), self.update(chat_id, texto), content_type="application/json")
+            self.assertEqual(resp.content, b"ok")
+        self.assertTrue(views._tarefas)  # sob ASGI vira tarefa no event loop, não thread
+        limite = time.monotonic() + 10
+        while len(self.respostas()) < 3 and time.monotonic() < limite:
+            await asyncio.sleep(0.02)
+        await asyncio.gather(*views._tarefas)
+        self.assertMenu(self.respostas())
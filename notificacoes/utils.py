@@ -1,10 +1,11 @@
-# notificacoes/telegram.py
+# notificacoes/utils.py
+# Atalhos de envio por cima do cliente único (notificacoes.telegram).
 from __future__ import annotations
 import os
-import json
 import time
 from typing import Iterable, Optional
-import requests
+
+from notificacoes.telegram import cliente
 
 # Opcional: carrega .env em dev; em produção (Render) use env vars
 try:
@@ -19,7 +20,6 @@ DEFAULT_CHAT_IDS = [
     cid.strip() for cid in os.getenv("TELEGRAM_CHAT_IDS", "").split(",") if cid.strip()
 ]
 
-API_BASE = f"https://api.telegram.org/bot{BOT_TOKEN}" if BOT_TOKEN else ""
 
 
 class TelegramNotConfigured(RuntimeError):
@@ -29,8 +29,6 @@ class TelegramNotConfigured(RuntimeError):
 def _ensure_config() -> None:
     if not BOT_TOKEN:
         raise TelegramNotConfigured("TELEGRAM_BOT_TOKEN não configurado")
-    if not API_BASE:
-        raise TelegramNotConfigured("Token inválido ou não informado")
 
 
 def tg_send(
@@ -57,28 +55,20 @@ def tg_send(
             "Nenhum chat_id informado e TELEGRAM_CHAT_IDS está vazio"
         )
 
-    url = f"{API_BASE}/sendMessage"
     results = []
-    for cid in ids:
-        payload = {
-            "chat_id": str(cid),
-            "text": text,
-            "disable_web_page_preview": disable_web_page_preview,
-            "disable_notification": disable_notification,
-        }
-        if parse_mode:
-            payload["parse_mode"] = parse_mode
-
-        try:
-            resp = requests.post(url, data=payload, timeout=timeout)
-            data = resp.json() if resp.headers.get("content-type","").startswith("application/json") else {"ok": False, "description": resp.text}
-            results.append({"chat_id": str(cid), "status": resp.status_code, "response": data})
-        except Exception as e:
-            # Não derruba a execução
-            results.append({"chat_id": str(cid), "status": None, "response": {"ok": False, "error": str(e)}})
-
-        if throttle_ms > 0:
+    for i, cid in enumerate(ids):
+        if i and throttle_ms > 0:
             time.sleep(throttle_ms / 1000.0)
+        resp = cliente().enviar(
+            cid,
+            text,
+            parse_mode=parse_mode,
+            disable_web_page_preview=disable_web_page_preview,
+            disable_notification=disable_notification,
+            token=BOT_TOKEN,
+            timeout=timeout,
+        )
+        results.append({"chat_id": str(cid), "status": resp.status, "response": resp.corpo})
 
     return {"ok": all(r["response"].get("ok") for r in results), "results": results}
 
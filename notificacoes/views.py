@@ -1,16 +1,26 @@
 # notificacoes/views.py
+import asyncio
+import contextvars
 import os
 import json
 import logging
+import weakref
+from contextlib import nullcontext
+from datetime import timedelta
 from threading import Thread
 
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.core.management import call_command
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
 
-import requests  # usado no envio direto
+from config.replica import usar_replica
+from monitoramento.metricas import WEBHOOK_FILA
+from .telegram import cliente
 
 logger = logging.getLogger(__name__)
 
@@ -85,15 +95,10 @@ def _flag_from_qs(request, name: str) -> bool:
     return v in ("1", "true", "True", "yes", "on")
 
 # ---------- Envio Telegram ----------
-def _tg_http_send(token: str, chat_id: str, text: str, timeout: int = 8) -> tuple[int, str]:
-    """Envia via HTTP direto e retorna (status_code, response_text)."""
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    r = requests.post(
-        url,
-        json={"chat_id": str(chat_id), "text": text, "parse_mode": "HTML"},
-        timeout=timeout,
-    )
-    return r.status_code, r.text
+def _tg_http_send(token: str, chat_id: str, text: str, timeout: int = 8) -> tuple[int | None, str]:
+    """Envia pelo cliente compartilhado e retorna (status_code, descrição)."""
+    resp = cliente().enviar(chat_id, text, token=token, timeout=timeout)
+    return resp.status, resp.texto or "ok"
 
 def tg_send_safe(chat_id: str, text: str, *, mode: str | None = None) -> None:
     """
@@ -108,18 +113,18 @@ def tg_send_safe(chat_id: str, text: str, *, mode: str | None = None) -> None:
             # preferir direto
             try:
                 status, body = _tg_http_send(token, chat_id, text, timeout=5)
-                if status >= 300:
+                if status is None or status >= 300:
                     logger.warning("Telegram HTTP falhou [%s]: %s", status, body)
             except Exception as e:
                 logger.exception("Falha no envio HTTP Telegram: %s", e)
                 # fallback para util se existir
                 if _tg_send_util:
-                    _tg_send_util(chat_id, text)
+                    _tg_send_util(text, [chat_id])
             return
 
         # Sem token (ou modo obrigado util): tentar util
         if _tg_send_util:
-            _tg_send_util(chat_id, text)
+            _tg_send_util(text, [chat_id])
         else:
             logger.warning("Sem TELEGRAM_BOT_TOKEN e sem util; não foi possível enviar p/ %s", chat_id)
     except Exception as e:
@@ -127,7 +132,7 @@ def tg_send_safe(chat_id: str, text: str, *, mode: str | None = None) -> None:
 
 # ---------- Trigger HTTP para rodar o comando avisos_telegram ----------
 @csrf_exempt
-def task_notify(request):
+async def task_notify(request):
     """
     GET /notificacoes/run/?token=...&dry_run=1&force=1&debug=1&date=YYYY-MM-DD
     GET /notificacoes/run/?token=...&stats=1      -> texto de diagnóstico
@@ -163,7 +168,7 @@ def task_notify(request):
         if mode == "util":
             if _tg_send_util:
                 try:
-                    _tg_send_util(chat_id, msg)
+                    await sync_to_async(_tg_send_util, thread_sensitive=False)(msg, [chat_id])
                     return HttpResponse("ok (send via util)", content_type="text/plain; charset=utf-8")
                 except Exception as e:
                     return HttpResponse(f"erro util: {e}", status=500)
@@ -174,14 +179,15 @@ def task_notify(request):
         if not token:
             return HttpResponse("TELEGRAM_BOT_TOKEN ausente", status=500)
         try:
-            status, body = _tg_http_send(token, chat_id, msg, timeout=10)
-            return HttpResponse(f"direct status={status} body={body}", content_type="text/plain; charset=utf-8", status=200 if status < 400 else 500)
+            resp = await cliente().aenviar(chat_id, msg, token=token, timeout=10)
+            status, body = resp.status, resp.texto or "ok"
+            return HttpResponse(f"direct status={status} body={body}", content_type="text/plain; charset=utf-8", status=200 if status and status < 400 else 500)
         except Exception as e:
             return HttpResponse(f"erro direct: {e}", status=500)
 
     # stats
     if request.GET.get("stats") == "1":
-        return HttpResponse(_stats_text(), content_type="text/plain; charset=utf-8")
+        return HttpResponse(await sync_to_async(_stats_text)(), content_type="text/plain; charset=utf-8")
 
     # flags -> kwargs do management command
     dry_run = _flag_from_qs(request, "dry_run")
@@ -195,7 +201,7 @@ def task_notify(request):
     if debug:   kwargs["debug"] = True
     if date_str: kwargs["date"] = date_str
 
-    call_command("avisos_telegram", **kwargs)
+    await sync_to_async(call_command)("avisos_telegram", **kwargs)
 
     parts = []
     if dry_run: parts.append("dry-run")
@@ -205,11 +211,133 @@ def task_notify(request):
     body = "ok" + (f" ({', '.join(parts)})" if parts else "")
     return HttpResponse(body, content_type="text/plain; charset=utf-8")
 
-# ---------- Processamento do webhook (em thread) ----------
-def _process_update(payload: dict) -> None:
+async def atg_send_safe(chat_id: str, text: str) -> None:
+    """tg_send_safe para o processamento async: nunca levanta, só registra falhas."""
+    try:
+        token = os.getenv("TELEGRAM_BOT_TOKEN", "")
+        if not token:
+            logger.warning("Sem TELEGRAM_BOT_TOKEN; não foi possível enviar p/ %s", chat_id)
+            return
+        resp = await cliente().aenviar(chat_id, text, token=token, timeout=5)
+        if not resp.ok:
+            logger.warning("Telegram HTTP falhou [%s]: %s", resp.status, resp.texto)
+    except Exception as e:
+        logger.exception("Falha ao enviar Telegram: %s", e)
+
+# ---------- Processamento do webhook (fora da request) ----------
+def _fmt_lista(parcelas, titulo: str) -> str:
+    linhas = []
+    total = 0.0
+    for p in parcelas:
+        venda_id = getattr(p, "venda_id", None)
+        cliente = getattr(getattr(p, "venda", None), "cliente", None)
+        nome = getattr(cliente, "nome", "Cliente")
+        numero = getattr(p, "numero", "?")
+        total_parc = getattr(getattr(p, "venda", None), "parcelas_total", "?")
+        v = float(getattr(p, "valor", 0) or 0)
+        total += v
+        ven = getattr(p, "vencimento", None)
+        ven = ven.strftime("%d/%m/%Y") if ven else "s/ data"
+        linhas.append(
+            f"• Venda #{venda_id} — {nome} — Parc. {numero}/{total_parc} — {_brl(v)} — {ven}"
+        )
+    cab = f"<b>{titulo}</b>\n\n" if linhas else f"<b>{titulo}</b>\n\n(sem itens)"
+    rod = f"\n\n<b>Total:</b> {_brl(total)}" if linhas else ""
+    return cab + "\n".join(linhas) + rod
+
+async def _aresposta(chat: dict, chat_id: str, text: str) -> str:
+    """Consulta o banco (ORM async) e monta o texto de resposta ao comando."""
+    Parcela = _get_parcela_model()
+    hoje = timezone.localdate()
+
+    # ----- Comandos -----
+    if text.startswith("/start"):
+        if DestinatarioTelegram:
+            dest, _ = await DestinatarioTelegram.objects.aget_or_create(
+                chat_id=chat_id,
+                defaults={"nome": chat.get("first_name") or "Usuário"},
+            )
+            dest.ativo = True
+            await dest.asave()
+        return "✅ Inscrição registrada!\n" + HELP
+
+    if text.startswith("/id"):
+        return f"Seu chat_id é: <code>{chat_id}</code>"
+
+    if text.startswith("/help") or text == "menu":
+        return HELP
+
+    if text.startswith("/stop"):
+        if not DestinatarioTelegram:
+            return "🛑 Ok. (Cadastro simples indisponível)"
+        try:
+            dest = await DestinatarioTelegram.objects.aget(chat_id=chat_id)
+        except DestinatarioTelegram.DoesNotExist:
+            return "Você não está inscrito. Use /start."
+        dest.ativo = False
+        await dest.asave()
+        return "🛑 Ok, avisos desativados. Use /start para reativar."
+
+    if text.startswith("/status"):
+        if not DestinatarioTelegram:
+            return "Cadastro simples indisponível."
+        try:
+            d = await DestinatarioTelegram.objects.aget(chat_id=chat_id)
+        except DestinatarioTelegram.DoesNotExist:
+            return "Você não está inscrito. Use /start."
+        return (
+            f"Status: {'ativo' if d.ativo else 'inativo'}\n"
+            f"Vence hoje: {'on' if getattr(d, 'recebe_vencimentos_hoje', True) else 'off'}\n"
+            f"Atrasados: {'on' if getattr(d, 'recebe_atrasados', True) else 'off'}"
+        )
+
+    # ----- Menu rápido (1/2/3): só leitura, vai para a réplica se houver -----
+    if text in ("1", "vencem hoje", "hoje"):
+        qs = (
+            Parcela.objects.filter(status__iexact="PENDENTE", vencimento=hoje)
+            .select_related("venda", "venda__cliente")
+            .order_by("vencimento", "venda_id", "numero")
+        )
+        with usar_replica():
+            return _fmt_lista([p async for p in qs[:10]], "🔔 Vencimentos de HOJE")
+
+    if text in ("2", "atrasadas", "atrasado", "atraso"):
+        qs = (
+            Parcela.objects.em_atraso()
+            .select_related("venda", "venda__cliente")
+            .order_by("vencimento", "venda_id", "numero")
+        )
+        with usar_replica():
+            return _fmt_lista([p async for p in qs[:10]], "⚠️ Parcelas ATRASADAS")
+
+    if text in ("3", "resumo"):
+        pend = Parcela.objects.filter(status__iexact="PENDENTE")
+        hoje_qs = pend.filter(vencimento=hoje)
+        atr_qs = Parcela.objects.em_atraso()
+        prox_qs = pend.filter(vencimento__range=[hoje, hoje + timedelta(days=7)])
+
+        def _resumo(qs):
+            return qs.aaggregate(n=Count("id"), s=Sum("valor"))
+
+        with usar_replica():
+            r_hoje, r_atr, r_prox = await _resumo(hoje_qs), await _resumo(atr_qs), await _resumo(prox_qs)
+        return (
+            "<b>📊 Resumo</b>\n\n"
+            f"Vencem HOJE: {r_hoje['n']} — {_brl(r_hoje['s'] or 0)}\n"
+            f"Atrasadas: {r_atr['n']} — {_brl(r_atr['s'] or 0)}\n"
+            f"Próx. 7 dias: {r_prox['n']} — {_brl(r_prox['s'] or 0)}\n\n"
+            "Envie 1, 2 ou 3 para detalhes; /help para ajuda."
+        )
+
+    # default: ajuda
+    return HELP
+
+async def _aprocess_update(payload: dict, vagas: asyncio.Semaphore | None = None, enviar=None) -> None:
     """
     Faz todo o trabalho pesado do webhook fora da request HTTP,
-    para responder rápido ao Telegram.
+    para responder rápido ao Telegram. `vagas` limita quantos updates
+    usam o banco ao mesmo tempo (cada um tem sua thread de ORM); `enviar`
+    troca o envio async (padrão: atg_send_safe).
     """
     try:
         msg = payload.get("message") or payload.get("edited_message")
@@ -219,134 +347,64 @@ def _process_update(payload: dict) -> None:
         chat = msg.get("chat", {})
         chat_id = str(chat.get("id"))
         text_raw = (msg.get("text") or "").strip()
-        text = text_raw.lower()
 
         logger.info("Webhook msg chat_id=%s text=%r", chat_id, text_raw)
 
-        Parcela = _get_parcela_model()
-        hoje = timezone.localdate()
-
-        # ----- Comandos -----
-        if text.startswith("/start"):
-            if DestinatarioTelegram:
-                dest, _ = DestinatarioTelegram.objects.get_or_create(
-                    chat_id=chat_id,
-                    defaults={"nome": chat.get("first_name") or "Usuário"},
-                )
-                dest.ativo = True
-                dest.save()
-            tg_send_safe(chat_id, "✅ Inscrição registrada!\n" + HELP)
-            return
-
-        if text.startswith("/id"):
-            tg_send_safe(chat_id, f"Seu chat_id é: <code>{chat_id}</code>")
-            return
-
-        if text.startswith("/help") or text == "menu":
-            tg_send_safe(chat_id, HELP)
-            return
-
-        if text.startswith("/stop"):
-            if DestinatarioTelegram:
+        async with (vagas or nullcontext()):
+            async with ThreadSensitiveContext():
                 try:
-                    dest = DestinatarioTelegram.objects.get(chat_id=chat_id)
-                    dest.ativo = False
-                    dest.save()
-                    tg_send_safe(chat_id, "🛑 Ok, avisos desativados. Use /start para reativar.")
-                except DestinatarioTelegram.DoesNotExist:
-                    tg_send_safe(chat_id, "Você não está inscrito. Use /start.")
-            else:
-                tg_send_safe(chat_id, "🛑 Ok. (Cadastro simples indisponível)")
-            return
+                    texto = await _aresposta(chat, chat_id, text_raw.lower())
+                finally:
+                    # a thread de ORM deste update morre aqui: não deixa conexão para trás
+                    await sync_to_async(connections.close_all)()
+        await (enviar or atg_send_safe)(chat_id, texto)
 
-        if text.startswith("/status"):
-            if DestinatarioTelegram:
-                try:
-                    d = DestinatarioTelegram.objects.get(chat_id=chat_id)
-                    tg_send_safe(
-                        chat_id,
-                        f"Status: {'ativo' if d.ativo else 'inativo'}\n"
-                        f"Vence hoje: {'on' if getattr(d, 'recebe_vencimentos_hoje', True) else 'off'}\n"
-                        f"Atrasados: {'on' if getattr(d, 'recebe_atrasados', True) else 'off'}"
-                    )
-                except DestinatarioTelegram.DoesNotExist:
-                    tg_send_safe(chat_id, "Você não está inscrito. Use /start.")
-            else:
-                tg_send_safe(chat_id, "Cadastro simples indisponível.")
-            return
+    except Exception as e:
+        logger.exception("Erro ao processar update do Telegram: %s", e)
 
-        # ----- Menu rápido (1/2/3) -----
-        def _fmt_lista(qs, titulo: str):
-            linhas = []
-            total = 0.0
-            for p in qs[:10]:
-                venda_id = getattr(p, "venda_id", None)
-                cliente = getattr(getattr(p, "venda", None), "cliente", None)
-                nome = getattr(cliente, "nome", "Cliente")
-                numero = getattr(p, "numero", "?")
-                total_parc = getattr(getattr(p, "venda", None), "parcelas_total", "?")
-                v = float(getattr(p, "valor", 0) or 0)
-                total += v
-                ven = getattr(p, "vencimento", None)
-                ven = ven.strftime("%d/%m/%Y") if ven else "s/ data"
-                linhas.append(
-                    f"• Venda #{venda_id} — {nome} — Parc. {numero}/{total_parc} — {_brl(v)} — {ven}"
-                )
-            cab = f"<b>{titulo}</b>\n\n" if linhas else f"<b>{titulo}</b>\n\n(sem itens)"
-            rod = f"\n\n<b>Total:</b> {_brl(total)}" if linhas else ""
-            return cab + "\n".join(linhas) + rod
-
-        if text in ("1", "vencem hoje", "hoje"):
-            qs = (
-                Parcela.objects.filter(status__iexact="PENDENTE", vencimento=hoje)
-                .select_related("venda", "venda__cliente")
-                .order_by("vencimento", "venda_id", "numero")
-            )
-            tg_send_safe(chat_id, _fmt_lista(qs, "🔔 Vencimentos de HOJE"))
-            return
+def _process_update(payload: dict) -> None:
+    # modo WSGI: já estamos numa thread própria; o envio usa o cliente
+    # síncrono (pool de conexões do processo) em vez de um event loop novo
+    async_to_sync(_aprocess_update)(
+        payload, enviar=sync_to_async(tg_send_safe, thread_sensitive=False)
+    )
 
-        if text in ("2", "atrasadas", "atrasado", "atraso"):
-            qs = (
-                Parcela.objects.filter(status__iexact="PENDENTE", vencimento__lt=hoje)
-                .select_related("venda", "venda__cliente")
-                .order_by("vencimento", "venda_id", "numero")
-            )
-            tg_send_safe(chat_id, _fmt_lista(qs, "⚠️ Parcelas ATRASADAS"))
-            return
+def _process_update_na_fila(payload: dict) -> None:
+    try:
+        _process_update(payload)
+    finally:
+        WEBHOOK_FILA.dec()
 
-        if text in ("3", "resumo"):
-            pend = Parcela.objects.filter(status__iexact="PENDENTE")
-            hoje_qs = pend.filter(vencimento=hoje)
-            atr_qs = pend.filter(vencimento__lt=hoje)
-            from datetime import timedelta as _td
-            prox_qs = pend.filter(vencimento__range=[hoje, hoje + _td(days=7)])
-
-            t_hoje = hoje_qs.aggregate(s=Sum("valor"))["s"] or 0
-            t_atr  = atr_qs.aggregate(s=Sum("valor"))["s"] or 0
-            t_prox = prox_qs.aggregate(s=Sum("valor"))["s"] or 0
-
-            txt = (
-                "<b>📊 Resumo</b>\n\n"
-                f"Vencem HOJE: {hoje_qs.count()} — {_brl(t_hoje)}\n"
-                f"Atrasadas: {atr_qs.count()} — {_brl(t_atr)}\n"
-                f"Próx. 7 dias: {prox_qs.count()} — {_brl(t_prox)}\n\n"
-                "Envie 1, 2 ou 3 para detalhes; /help para ajuda."
-            )
-            tg_send_safe(chat_id, txt)
-            return
+# ---------- modo ASGI: tarefas no event loop do worker ----------
+_tarefas: set = set()
+_vagas_por_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
-        # default: ajuda
-        tg_send_safe(chat_id, HELP)
+def _vagas_db() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _vagas_por_loop:
+        _vagas_por_loop[loop] = asyncio.Semaphore(int(os.getenv("WEBHOOK_DB_CONCORRENCIA", "8")))
+    return _vagas_por_loop[loop]
 
-    except Exception as e:
-        logger.exception("Erro ao processar update do Telegram: %s", e)
+async def _aprocess_update_na_fila(payload: dict) -> None:
+    try:
+        await _aprocess_update(payload, _vagas_db())
+    finally:
+        WEBHOOK_FILA.dec()
+
+def _agendar(payload: dict) -> None:
+    # contexto vazio: a tarefa não herda a conexão de banco nem a medição da request
+    loop = asyncio.get_running_loop()
+    tarefa = contextvars.Context().run(loop.create_task, _aprocess_update_na_fila(payload))
+    _tarefas.add(tarefa)  # referência forte até terminar
+    tarefa.add_done_callback(_tarefas.discard)
 
 # ---------- Webhook Telegram (ACK rápido) ----------
 @csrf_exempt
-def telegram_webhook(request, secret: str):
+async def telegram_webhook(request, secret: str):
     """
     POST do Telegram chega aqui. Respondemos imediatamente para evitar timeout
-    e processamos em background.
+    e processamos em background: sob ASGI como tarefa no event loop; sob WSGI
+    numa thread.
     """
     if secret != WEBHOOK_SECRET:
         return HttpResponse(status=403)
@@ -364,6 +422,9 @@ def telegram_webhook(request, secret: str):
         # Acknowledge mesmo com payload inválido para limpar fila do Telegram
         return HttpResponse("ignored", content_type="text/plain; charset=utf-8")
 
-    # Dispara processamento em thread e responde 200 imediatamente
-    Thread(target=_process_update, args=(payload,), daemon=True).start()
-    return HttpResponse("ok", content_type="text/plain; charset=utf-8")
\ No newline at end of file
+    WEBHOOK_FILA.inc()
+    if isinstance(request, ASGIRequest):
+        _agendar(payload)
+    else:
+        Thread(target=_process_update_na_fila, args=(payload,), daemon=True).start()
+    return HttpResponse("ok", content_type="text/plain; charset=utf-8")
@@ -8,6 +8,7 @@ from django.db.models.functions import TruncMonth, Coalesce
 from django.shortcuts import render
 from django.utils import timezone
 
+from config.replica import somente_leitura
 from financeiro.models import Despesa
 
 
@@ -27,6 +28,7 @@ def _is_admin(user):
 
 @login_required
 @user_passes_test(_is_admin)
+@somente_leitura
 def comissoes_pagas(request):
     hoje = timezone.localdate()
     inicio = _parse_date(request.GET.get("inicio")) or hoje.replace(day=1)
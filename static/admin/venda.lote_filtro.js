@@ -0,0 +1,23 @@
+// static/admin/venda.lote_filtro.js
+// Envia o empreendimento escolhido junto com a busca do autocomplete de lote
+// (ver LoteAdmin.get_search_results) e limpa o lote ao trocar de empreendimento.
+(function($) {
+  if (!$) return;
+
+  // autocomplete.js manda os parâmetros em `data` (já serializado quando o
+  // prefilter roda); o jQuery só os junta à URL depois, com "?" ou "&"
+  $.ajaxPrefilter(function(options) {
+    if (!options.url || options.url.indexOf("/autocomplete/") === -1) return;
+    if (typeof options.data !== "string" || !/(^|&)field_name=lote(&|$)/.test(options.data)) return;
+    var emp = document.getElementById("id_empreendimento");
+    if (emp && emp.value) {
+      options.data += "&empreendimento=" + encodeURIComponent(emp.value);
+    }
+  });
+
+  $(function() {
+    $("#id_empreendimento").on("change", function() {
+      $("#id_lote").val(null).trigger("change");
+    });
+  });
+})(window.django && window.django.jQuery);
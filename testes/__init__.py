@@ -0,0 +1 @@
+"""Apoio compartilhado pelos tests.py dos apps. Só para testes: não é um app."""
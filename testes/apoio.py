@@ -0,0 +1,110 @@
+# testes/apoio.py
+"""Fábricas de dados e orçamento de consultas usados pelos tests.py dos apps."""
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import count
+from typing import Callable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+# o admin não depende do manifesto do collectstatic nos testes
+SEM_MANIFESTO = override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+
+_seq = count(1)
+
+
+# ---------- fábricas ----------
+def _lote(n: int):
+    from cadastros.models import Empreendimento, Lote
+
+    emp = Empreendimento.objects.create(nome=f"Empreendimento {n}", cidade="Recife", estado="PE")
+    return Lote.objects.create(
+        empreendimento=emp, quadra="A", numero=str(n),
+        area_m2=Decimal("300"), preco_tabela=Decimal("60000"),
+    )
+
+
+def _cliente(n: int):
+    from cadastros.models import Cliente
+
+    return Cliente.objects.create(nome=f"Cliente {n}", cpf_cnpj=f"{n:011d}")
+
+
+def criar_lotes(qtd: int) -> None:
+    """Cria `qtd` lotes e clientes, cada lote num empreendimento próprio."""
+    for _ in range(qtd):
+        n = next(_seq)
+        _lote(n)
+        _cliente(n)
+
+
+def criar_vendas(qtd: int, *, parcelas: int = 6) -> list:
+    """Cria `qtd` vendas parceladas, cada uma com cliente, lote e empreendimento próprios."""
+    from vendas.models import Venda
+
+    vendas = []
+    for _ in range(qtd):
+        n = next(_seq)
+        vendas.append(Venda.objects.create(
+            cliente=_cliente(n), lote=_lote(n), valor_total=Decimal("60000"),
+            entrada_bruta=Decimal("6000"), parcelas_total=parcelas,
+        ))
+    return vendas
+
+
+def criar_lancamentos(qtd: int) -> None:
+    """Cria `qtd` despesas e `qtd` receitas extras em dias diferentes."""
+    from financeiro.models import Despesa, ReceitaExtra
+
+    for _ in range(qtd):
+        n = next(_seq)
+        dia = date(2025, 1, 1) + timedelta(days=n)
+        Despesa.objects.create(
+            data=dia, categoria="CUSTO", descricao=f"Despesa {n}",
+            valor=Decimal("100"), status="PAGA", origem=f"Origem {n % 3}",
+        )
+        ReceitaExtra.objects.create(data=dia, descricao=f"Receita {n}", valor=Decimal("50"))
+
+
+def ate(modelo, criar: Callable[[int], object]) -> Callable[[int], None]:
+    """Completa com `criar(qtd)` até haver `total` linhas de `modelo`."""
+    def completar(total: int) -> None:
+        criar(total - modelo.objects.count())
+    return completar
+
+
+# ---------- orçamento de consultas ----------
+@SEM_MANIFESTO
+class ConsultasConstantesTestCase(TestCase):
+    """
+    Logado como superusuário; `assertConsultasConstantes` confere que a página
+    custa o mesmo número de queries com poucos e com muitos registros.
+    """
+
+    TAMANHOS = (3, 12)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser("admin", "a@a.com", "x")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertConsultasConstantes(self, url, esperado: int, completar: Callable[[int], None]):
+        """`completar(total)` cria dados até `total` registros (ver `ate`)."""
+        url_fn = url if callable(url) else (lambda: url)
+        completar(1)
+        self.client.get(url_fn())  # aquece caches de processo (content types etc.)
+        for total in self.TAMANHOS:
+            completar(total)
+            url_atual = url_fn()
+            with self.subTest(registros=total), self.assertNumQueries(esperado):
+                resp = self.client.get(url_atual)
+            self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,113 @@
+# usuarios/management/commands/bootstrap.py
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+ETAPAS = ("static", "migrate", "superuser")
+CARIMBO_STATIC = ".bootstrap-static"  # hash das origens do último collectstatic, dentro do STATIC_ROOT
+
+
+def _hash_static() -> str:
+    """SHA-256 do conteúdo (e caminho) de todos os arquivos que o collectstatic copiaria."""
+    h = hashlib.sha256(settings.STORAGES["staticfiles"]["BACKEND"].encode())
+    arquivos = {}
+    for finder in get_finders():
+        for caminho, storage in finder.list(["CVS", ".*", "*~"]):
+            arquivos.setdefault(caminho, storage)  # o primeiro finder vence, como no collectstatic
+    for caminho in sorted(arquivos):
+        h.update(caminho.encode() + b"\0")
+        with arquivos[caminho].open(caminho) as fh:
+            h.update(hashlib.sha256(fh.read()).digest())
+    return h.hexdigest()
+
+
+def _ler(caminho: str) -> str | None:
+    try:
+        with open(caminho) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Preparo de boot num só processo: collectstatic, migrate e superusuário, "
+        "pulando o que já está em dia e informando o tempo de cada etapa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--etapas", default=",".join(ETAPAS),
+                            help=f"Etapas a rodar, separadas por vírgula (padrão: {','.join(ETAPAS)}).")
+        parser.add_argument("--forcar", action="store_true",
+                            help="Roda as etapas mesmo se parecerem em dia.")
+
+    def handle(self, *args, **o):
+        etapas = [e.strip() for e in o["etapas"].split(",") if e.strip()]
+        desconhecidas = set(etapas) - set(ETAPAS)
+        if desconhecidas:
+            raise CommandError(f"Etapa(s) desconhecida(s): {', '.join(sorted(desconhecidas))}")
+
+        self.forcar = o["forcar"]
+        total = time.perf_counter()
+        for etapa in etapas:
+            t0 = time.perf_counter()
+            resultado = getattr(self, f"_{etapa}")()
+            self.stdout.write(f"  {etapa:<10} {time.perf_counter() - t0:6.2f}s  {resultado}")
+        self.stdout.write(self.style.SUCCESS(f"bootstrap ok em {time.perf_counter() - total:.2f}s"))
+
+    # ---------- etapas ----------
+    def _static(self) -> str:
+        carimbo = os.path.join(settings.STATIC_ROOT, CARIMBO_STATIC)
+        try:
+            atual = _hash_static()
+            manifesto = getattr(staticfiles_storage, "manifest_name", None)
+            em_dia = (
+                not self.forcar
+                and (manifesto is None or staticfiles_storage.exists(manifesto))
+                and _ler(carimbo) == atual
+            )
+            if em_dia:
+                return "pulado (origens iguais ao último collectstatic)"
+            call_command("collectstatic", interactive=False, verbosity=0)
+            with open(carimbo, "w") as fh:
+                fh.write(atual)
+            return "collectstatic executado"
+        except Exception as e:
+            # como o antigo `collectstatic || true`: sem estáticos o site ainda sobe
+            return self.style.WARNING(f"falhou ({type(e).__name__}: {e}); seguindo")
+
+    def _migrate(self) -> str:
+        conexao = connections[DEFAULT_DB_ALIAS]
+        executor = MigrationExecutor(conexao)
+        plano = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plano and not self.forcar:
+            return "pulado (nenhuma migração pendente)"
+        call_command("migrate", interactive=False, verbosity=0)
+        return f"{len(plano)} migração(ões) aplicada(s)"
+
+    def _superuser(self) -> str:
+        User = get_user_model()
+        username = os.getenv("DJANGO_SUPERUSER_USERNAME", "admin")
+        email = os.getenv("DJANGO_SUPERUSER_EMAIL", "admin@example.com")
+        password = os.getenv("DJANGO_SUPERUSER_PASSWORD", "admin123")
+
+        u = User.objects.filter(username=username).first()
+        if u is None:
+            u = User(username=username, email=email, is_staff=True, is_superuser=True)
+            u.set_password(password)
+            u.save()
+            return f"superusuário criado: {username}"
+        if u.is_staff and u.is_superuser:
+            return f"pulado (superusuário já existe: {username})"
+        u.is_staff = u.is_superuser = True
+        u.save(update_fields=["is_staff", "is_superuser"])
+        return f"permissões restauradas: {username}"
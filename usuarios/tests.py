@@ -1,3 +1,84 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from testes.apoio import SEM_MANIFESTO
+from usuarios.management.commands.bootstrap import CARIMBO_STATIC
+
+BOOTSTRAP = "usuarios.management.commands.bootstrap"
+
+
+@SEM_MANIFESTO
+class BootstrapTests(TestCase):
+    def setUp(self):
+        chamar = mock.patch(f"{BOOTSTRAP}.call_command")
+        self.call_command = chamar.start()
+        self.addCleanup(chamar.stop)
+
+    def rodar(self, etapas: str, **kwargs) -> str:
+        out = io.StringIO()
+        call_command("bootstrap", etapas=etapas, stdout=out, **kwargs)
+        return out.getvalue()
+
+    # ---------- migrate ----------
+    def test_sem_migracao_pendente_pula(self):
+        self.assertIn("pulado", self.rodar("migrate"))
+        self.call_command.assert_not_called()
+
+    def test_com_migracao_pendente_roda(self):
+        with mock.patch(f"{BOOTSTRAP}.MigrationExecutor.migration_plan", return_value=[("m", False)]):
+            self.assertIn("1 migração(ões) aplicada(s)", self.rodar("migrate"))
+        self.call_command.assert_called_once_with("migrate", interactive=False, verbosity=0)
+
+    # ---------- static ----------
+    def _static_root(self) -> str:
+        pasta = tempfile.mkdtemp(prefix="lotesys-static-")
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        ajuste = override_settings(STATIC_ROOT=pasta)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        return pasta
+
+    def test_carimbo_igual_pula_o_collectstatic(self):
+        pasta = self._static_root()
+        with mock.patch(f"{BOOTSTRAP}._hash_static", return_value="abc"):
+            with open(os.path.join(pasta, CARIMBO_STATIC), "w") as fh:
+                fh.write("abc\n")
+            self.assertIn("pulado", self.rodar("static"))
+        self.call_command.assert_not_called()
+
+    def test_origens_mudaram_roda_e_grava_o_carimbo(self):
+        pasta = self._static_root()
+        with open(os.path.join(pasta, CARIMBO_STATIC), "w") as fh:
+            fh.write("antigo")
+        with mock.patch(f"{BOOTSTRAP}._hash_static", return_value="novo"):
+            self.assertIn("collectstatic executado", self.rodar("static"))
+        self.call_command.assert_called_once_with("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(pasta, CARIMBO_STATIC)) as fh:
+            self.assertEqual(fh.read(), "novo")
+
+    # ---------- superuser ----------
+    def test_cria_superusuario(self):
+        with mock.patch.dict(os.environ, {"DJANGO_SUPERUSER_USERNAME": "chefe"}):
+            self.assertIn("criado", self.rodar("superuser"))
+        u = get_user_model().objects.get(username="chefe")
+        self.assertTrue(u.is_staff and u.is_superuser)
+
+    def test_superusuario_existente_pula(self):
+        get_user_model().objects.create_superuser("chefe", "c@c.com", "x")
+        with mock.patch.dict(os.environ, {"DJANGO_SUPERUSER_USERNAME": "chefe"}), \
+                self.assertNumQueries(1):
+            self.assertIn("pulado", self.rodar("superuser"))
+
+    def test_restaura_permissoes(self):
+        get_user_model().objects.create_user("chefe", password="x", is_staff=False)
+        with mock.patch.dict(os.environ, {"DJANGO_SUPERUSER_USERNAME": "chefe"}):
+            self.assertIn("permissões restauradas", self.rodar("superuser"))
+        u = get_user_model().objects.get(username="chefe")
+        self.assertTrue(u.is_staff and u.is_superuser)
@@ -1,37 +1,43 @@
 # vendas/admin.py
-from django.contrib import admin
-from django.utils import timezone
-from django.utils.html import format_html
+import io
+
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from comprovantes.views import miniatura_html
 
 from .models import Venda, Parcela
-from .forms import VendaAdminForm
+from .forms import ImportarCarteiraForm, ParcelaPaginadaFormSet, VendaAdminForm
+from .importacao import importar_carteira
+from .resumo import resumos_adiados
+from .services import alterar_status_parcelas, baixar_parcelas
 from .utils import gerar_parcelas_automaticas
 
 
 # ===== Ações das parcelas =====
 @admin.action(description="Marcar como PAGO (data hoje)")
 def marcar_pago(modeladmin, request, queryset):
-    hoje = timezone.now().date()
-    for p in queryset:
-        p.status = "PAGO"
-        if not p.data_pagamento:
-            p.data_pagamento = hoje
-        p.save()
+    qtd = baixar_parcelas(queryset)
+    modeladmin.message_user(request, f"{qtd} parcela(s) marcada(s) como paga(s).")
 
 
 @admin.action(description="Marcar como PENDENTE")
 def marcar_pendente(modeladmin, request, queryset):
-    queryset.update(status="PENDENTE", data_pagamento=None)
+    alterar_status_parcelas(queryset, "PENDENTE")
 
 
 @admin.action(description="Marcar como VENCIDO")
 def marcar_vencido(modeladmin, request, queryset):
-    queryset.update(status="VENCIDO", data_pagamento=None)
+    alterar_status_parcelas(queryset, "VENCIDO")
 
 
 # ===== Inline de parcelas (agora com comprovante) =====
 class ParcelaInline(admin.TabularInline):
     model = Parcela
+    formset = ParcelaPaginadaFormSet
+    template = "admin/vendas/venda/parcela_inline.html"
     extra = 0
     fields = (
         "numero",
@@ -44,10 +50,16 @@ class ParcelaInline(admin.TabularInline):
     )
     readonly_fields = ("link_comprovante",)
 
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        # a página vai na URL, então GET e POST veem as mesmas linhas
+        formset.params = request.GET.copy()
+        return formset
+
     @admin.display(description="Comprovante (ver)")
     def link_comprovante(self, obj: Parcela):
         if obj and obj.comprovante:
-            return format_html('<a href="{}" target="_blank">ver/baixar</a>', obj.comprovante.url)
+            return miniatura_html(obj)
         return "—"
 
 
@@ -55,6 +67,7 @@ class ParcelaInline(admin.TabularInline):
 @admin.register(Venda)
 class VendaAdmin(admin.ModelAdmin):
     form = VendaAdminForm
+    change_list_template = "admin/vendas/venda/change_list.html"
 
     list_display = (
         "id",
@@ -70,11 +83,15 @@ class VendaAdmin(admin.ModelAdmin):
     )
     search_fields = ("cliente__nome", "lote__numero", "lote__quadra")
     list_filter = ("data_venda", "forma_pagamento")
+    # __str__ de cliente e lote (lote -> empreendimento) sem N+1
+    list_select_related = ("cliente", "lote__empreendimento")
+    autocomplete_fields = ("cliente", "lote")
+    show_full_result_count = False
     inlines = [ParcelaInline]
 
     fieldsets = (
         ("Dados principais", {
-            "fields": ("cliente", "lote", "data_venda")
+            "fields": ("cliente", "empreendimento", "lote", "data_venda")
         }),
         ("Valores", {
             "fields": ("valor_total", "entrada_bruta", "desconto", "comissao_percent")
@@ -95,13 +112,70 @@ class VendaAdmin(admin.ModelAdmin):
     @admin.display(description="Comprovante (ver)")
     def link_comprovante(self, obj: Venda):
         if obj.comprovante:
-            return format_html('<a href="{}" target="_blank">ver/baixar</a>', obj.comprovante.url)
+            return miniatura_html(obj)
         return "—"
 
     def save_model(self, request, obj, form, change):
+        regerar = obj.parcelamento_alterado()
         super().save_model(request, obj, form, change)
-        # mantém seu comportamento: recria as parcelas conforme regras
-        gerar_parcelas_automaticas(obj, recriar=True)
+        # recria as parcelas conforme regras, só se o plano mudou
+        # (editar outros campos não reescreve as parcelas já existentes)
+        if regerar:
+            gerar_parcelas_automaticas(obj, recriar=True)
+
+    def save_related(self, request, form, formsets, change):
+        # parcelas do inline: um único recálculo do resumo da venda
+        with resumos_adiados():
+            super().save_related(request, form, formsets, change)
+
+    # ----- importação em massa (CSV) -----
+    def get_urls(self):
+        urls = [
+            path(
+                "importar/",
+                self.admin_site.admin_view(self.importar_view),
+                name="vendas_venda_importar",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect("admin:vendas_venda_changelist")
+
+        form = ImportarCarteiraForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            arquivo = io.TextIOWrapper(
+                form.cleaned_data["arquivo"].file, encoding="utf-8-sig", newline=""
+            )
+            try:
+                res = importar_carteira(
+                    arquivo,
+                    delimitador=form.cleaned_data["delimitador"],
+                    dry_run=form.cleaned_data["dry_run"],
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f"Falha ao ler o CSV: {e}")
+            else:
+                prefixo = "Validação concluída" if form.cleaned_data["dry_run"] else "Importação concluída"
+                messages.success(
+                    request,
+                    f"{prefixo}: {res.vendas} venda(s), {res.parcelas} parcela(s), "
+                    f"{res.clientes} cliente(s) e {res.lotes} lote(s) novos; "
+                    f"{res.ignoradas} linha(s) ignorada(s).",
+                )
+                for numero, erro in res.erros[:20]:
+                    messages.warning(request, f"Linha {numero}: {erro}")
+                if not res.erros:
+                    return redirect("admin:vendas_venda_changelist")
+
+        ctx = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Importar carteira (CSV)",
+            "form": form,
+        }
+        return TemplateResponse(request, "admin/vendas/venda/importar.html", ctx)
 
 
 # ===== Parcela =====
@@ -119,6 +193,10 @@ class ParcelaAdmin(admin.ModelAdmin):
     )
     list_filter = ("status", "vencimento", "data_pagamento")
     search_fields = ("venda__cliente__nome", "venda__id")
+    # Parcela.__str__ usa venda.parcelas_total; Venda.__str__ usa cliente
+    list_select_related = ("venda__cliente",)
+    autocomplete_fields = ("venda",)
+    show_full_result_count = False
     actions = [marcar_pago, marcar_pendente, marcar_vencido]
     readonly_fields = ("link_comprovante",)
 
@@ -129,5 +207,5 @@ class ParcelaAdmin(admin.ModelAdmin):
     @admin.display(description="Comprovante (ver)")
     def link_comprovante(self, obj: Parcela):
         if obj.comprovante:
-            return format_html('<a href="{}" target="_blank">ver/baixar</a>', obj.comprovante.url)
+            return miniatura_html(obj)
         return "—"
\ No newline at end of file
@@ -1,12 +1,26 @@
 # vendas/forms.py
 from django import forms
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from cadastros.models import Empreendimento, Lote
 from .models import Venda
 
 class VendaAdminForm(forms.ModelForm):
     """
     Formulário simples: os campos da Venda.
     As parcelas são geradas automaticamente no admin.save_model.
+
+    Cliente e lote usam o autocomplete do admin; o lote só oferece lotes
+    disponíveis, filtrados pelo empreendimento escolhido (não é gravado).
     """
+    empreendimento = forms.ModelChoiceField(
+        queryset=Empreendimento.objects.order_by("nome"),
+        required=False,
+        label="Empreendimento",
+        help_text="Filtra os lotes oferecidos.",
+    )
+
     class Meta:
         model = Venda
         fields = (
@@ -21,4 +35,60 @@ class VendaAdminForm(forms.ModelForm):
             "juros_mensal",
             "data_inicio_parcelamento",
             "comissao_percent",
-        )
\ No newline at end of file
+        )
+
+    class Media:
+        js = ("admin/js/jquery.init.js", "admin/venda.lote_filtro.js")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # só aceita lote disponível (ou o que já é desta venda)
+        disponiveis = Lote.objects.filter(status=Lote.Status.DISPONIVEL, venda__isnull=True)
+        if self.instance.lote_id:
+            disponiveis = disponiveis | Lote.objects.filter(pk=self.instance.lote_id)
+        self.fields["lote"].queryset = disponiveis.select_related("empreendimento")
+
+class ParcelaPaginadaFormSet(BaseInlineFormSet):
+    """
+    Inline de parcelas paginado: contratos longos (180/240 parcelas) renderizam
+    e enviam só as linhas da página (?parcelas_pagina=N); no save, só as
+    linhas alteradas são gravadas.
+    """
+    por_pagina = 24
+    param_pagina = "parcelas_pagina"
+    params = None  # QueryDict do request (ver ParcelaInline.get_formset)
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            qs = super().get_queryset()
+            numero = (self.params or {}).get(self.param_pagina) or 1
+            self.paginator = Paginator(qs, self.por_pagina)
+            self.pagina = self.paginator.get_page(numero)
+            self._queryset = list(self.pagina.object_list)
+        return self._queryset
+
+    @property
+    def links_paginas(self):
+        """[(numero, querystring, atual)] para a navegação do template."""
+        self.get_queryset()
+        if self.paginator.num_pages <= 1:
+            return []
+        params = self.params.copy() if self.params is not None else QueryDict(mutable=True)
+        links = []
+        for n in self.paginator.page_range:
+            params[self.param_pagina] = n
+            links.append((n, "?" + params.urlencode(), n == self.pagina.number))
+        return links
+
+
+class ImportarCarteiraForm(forms.Form):
+    """Upload do CSV da carteira (ver vendas.importacao para o layout)."""
+    arquivo = forms.FileField(label="Arquivo CSV")
+    delimitador = forms.ChoiceField(
+        label="Separador",
+        choices=((",", "Vírgula (,)"), (";", "Ponto e vírgula (;)")),
+        initial=",",
+    )
+    dry_run = forms.BooleanField(
+        label="Apenas validar (não grava nada)", required=False
+    )
@@ -0,0 +1,394 @@
+# vendas/importacao.py
+"""
+Importação em massa da carteira (empreendimentos, lotes, clientes e vendas)
+a partir de CSV.
+
+O arquivo é lido em streaming e processado em blocos: cada bloco é validado,
+gravado com bulk_create numa transação própria e descartado da memória.
+Os signals de Venda (geração de parcelas e despesa de comissão) são
+contornados — parcelas e comissões são montadas aqui e inseridas em massa.
+
+Colunas esperadas (cabeçalho obrigatório):
+  empreendimento, quadra, lote, area_m2, preco_tabela,
+  cliente, cpf_cnpj, telefone, email, endereco,
+  data_venda, valor_total, entrada_bruta, desconto,
+  forma_pagamento, parcelas_total, juros_mensal,
+  data_inicio_parcelamento, comissao_percent
+As colunas de cidade/estado do empreendimento são opcionais.
+"""
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Iterator, TextIO
+
+from django.db import transaction
+from django.utils import timezone
+
+from cadastros.models import Cliente, Empreendimento, Lote
+from financeiro.models import Despesa
+
+from .models import Parcela, Venda
+from .resumo import aplicar_resumo, resumo_em_memoria
+from .services import despesa_comissao
+from .utils import montar_parcelas
+
+DEC_0 = Decimal("0.00")
+
+COLUNAS_OBRIGATORIAS = (
+    "empreendimento",
+    "quadra",
+    "lote",
+    "cliente",
+    "cpf_cnpj",
+    "data_venda",
+    "valor_total",
+)
+
+BLOCO_PADRAO = 1000
+
+
+class ErroLinha(ValueError):
+    """Erro de validação de uma linha do CSV."""
+
+
+@dataclass
+class ResultadoImportacao:
+    linhas: int = 0
+    empreendimentos: int = 0
+    clientes: int = 0
+    lotes: int = 0
+    vendas: int = 0
+    parcelas: int = 0
+    despesas: int = 0
+    erros: list[tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def ignoradas(self) -> int:
+        return len(self.erros)
+
+
+# ---------- conversões ----------
+
+def _decimal(valor: str | None, campo: str, *, padrao: Decimal | None = None) -> Decimal:
+    """Aceita '1234.56', '1.234,56' e '1234,56'."""
+    s = (valor or "").strip().replace("R$", "").replace(" ", "")
+    if not s:
+        if padrao is None:
+            raise ErroLinha(f"{campo} obrigatório")
+        return padrao
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(s).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ErroLinha(f"{campo} inválido: {valor!r}")
+
+
+def _data(valor: str | None, campo: str, *, obrigatoria: bool = True) -> date | None:
+    """Aceita 'YYYY-MM-DD' e 'DD/MM/YYYY'."""
+    s = (valor or "").strip()
+    if not s:
+        if obrigatoria:
+            raise ErroLinha(f"{campo} obrigatória")
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    raise ErroLinha(f"{campo} inválida: {valor!r}")
+
+
+def _inteiro(valor: str | None, campo: str) -> int:
+    s = (valor or "").strip()
+    if not s:
+        return 0
+    if not s.isdigit():
+        raise ErroLinha(f"{campo} inválido: {valor!r}")
+    return int(s)
+
+
+def _texto(row: dict, campo: str) -> str:
+    return (row.get(campo) or "").strip()
+
+
+# ---------- leitura / validação ----------
+
+@dataclass
+class _Linha:
+    numero: int
+    empreendimento: str
+    cidade: str
+    estado: str
+    quadra: str
+    lote: str
+    area_m2: Decimal
+    preco_tabela: Decimal
+    cliente: dict
+    venda: dict
+
+
+# (modelo, coluna do CSV, campo do modelo) com max_length a respeitar
+_LIMITES = (
+    (Empreendimento, "empreendimento", "nome"),
+    (Lote, "quadra", "quadra"),
+    (Lote, "lote", "numero"),
+    (Cliente, "cliente", "nome"),
+    (Cliente, "cpf_cnpj", "cpf_cnpj"),
+    (Cliente, "telefone", "telefone"),
+    (Cliente, "email", "email"),
+    (Cliente, "endereco", "endereco"),
+)
+
+
+def _validar(numero: int, row: dict) -> _Linha:
+    for campo in COLUNAS_OBRIGATORIAS:
+        if not _texto(row, campo):
+            raise ErroLinha(f"{campo} obrigatório")
+
+    forma = (_texto(row, "forma_pagamento") or "PARCELADO").upper().replace("À", "A")
+    if forma not in dict(Venda.FORMA):
+        raise ErroLinha(f"forma_pagamento inválida: {forma!r}")
+
+    valor_total = _decimal(row.get("valor_total"), "valor_total")
+    venda = dict(
+        data_venda=_data(row.get("data_venda"), "data_venda"),
+        valor_total=valor_total,
+        entrada_bruta=_decimal(row.get("entrada_bruta"), "entrada_bruta", padrao=DEC_0),
+        desconto=_decimal(row.get("desconto"), "desconto", padrao=DEC_0),
+        forma_pagamento=forma,
+        parcelas_total=_inteiro(row.get("parcelas_total"), "parcelas_total"),
+        juros_mensal=_decimal(row.get("juros_mensal"), "juros_mensal", padrao=DEC_0),
+        data_inicio_parcelamento=_data(
+            row.get("data_inicio_parcelamento"), "data_inicio_parcelamento", obrigatoria=False
+        ),
+        comissao_percent=_decimal(
+            row.get("comissao_percent"), "comissao_percent", padrao=Decimal("20.00")
+        ),
+    )
+    if forma == "PARCELADO" and venda["parcelas_total"] <= 0:
+        raise ErroLinha("parcelas_total deve ser maior que zero para vendas parceladas")
+
+    for modelo, coluna, nome_campo in _LIMITES:
+        valor = _texto(row, coluna)
+        if len(valor) > modelo._meta.get_field(nome_campo).max_length:
+            raise ErroLinha(f"{coluna} muito longo: {valor!r}")
+
+    return _Linha(
+        numero=numero,
+        empreendimento=_texto(row, "empreendimento"),
+        cidade=_texto(row, "cidade"),
+        estado=_texto(row, "estado")[:2].upper(),
+        quadra=_texto(row, "quadra"),
+        lote=_texto(row, "lote"),
+        area_m2=_decimal(row.get("area_m2"), "area_m2", padrao=DEC_0),
+        preco_tabela=_decimal(row.get("preco_tabela"), "preco_tabela", padrao=valor_total),
+        cliente=dict(
+            nome=_texto(row, "cliente"),
+            cpf_cnpj=_texto(row, "cpf_cnpj"),
+            telefone=_texto(row, "telefone"),
+            email=_texto(row, "email"),
+            endereco=_texto(row, "endereco"),
+        ),
+        venda=venda,
+    )
+
+
+def _blocos(reader: Iterable[dict], tamanho: int) -> Iterator[list[tuple[int, dict]]]:
+    """Agrupa as linhas do CSV em blocos de `tamanho` (numeração a partir da linha 2)."""
+    bloco: list[tuple[int, dict]] = []
+    for numero, row in enumerate(reader, start=2):
+        bloco.append((numero, row))
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+# ---------- gravação ----------
+
+class ImportadorCarteira:
+    """
+    Importa a carteira bloco a bloco.
+
+    - Clientes são atualizados/criados pelo cpf_cnpj.
+    - Linhas cujo lote já possui venda são recusadas (registradas em
+      `erros`) antes de qualquer gravação: nem o lote nem o cliente mudam.
+    - Os demais lotes são atualizados/criados por (empreendimento, quadra,
+      numero) e marcados como VENDIDO.
+    """
+
+    def __init__(self, *, tamanho_bloco: int = BLOCO_PADRAO, dry_run: bool = False):
+        self.tamanho_bloco = max(1, int(tamanho_bloco))
+        self.dry_run = dry_run
+        self.resultado = ResultadoImportacao()
+        self._empreendimentos: dict[str, int] = {}
+        self.hoje = timezone.localdate()
+
+    def importar(self, arquivo: TextIO, *, delimitador: str = ",") -> ResultadoImportacao:
+        reader = csv.DictReader(arquivo, delimiter=delimitador)
+        faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in (reader.fieldnames or [])]
+        if faltando:
+            raise ValueError(f"Colunas ausentes no CSV: {', '.join(faltando)}")
+
+        for bloco in _blocos(reader, self.tamanho_bloco):
+            self._processar_bloco(bloco)
+        return self.resultado
+
+    # ----- bloco -----
+    def _processar_bloco(self, bloco: list[tuple[int, dict]]) -> None:
+        res = self.resultado
+        linhas: list[_Linha] = []
+        chaves_lote: set[tuple[str, str, str]] = set()
+
+        for numero, row in bloco:
+            res.linhas += 1
+            try:
+                linha = _validar(numero, row)
+            except ErroLinha as e:
+                res.erros.append((numero, str(e)))
+                continue
+            chave = (linha.empreendimento, linha.quadra, linha.lote)
+            if chave in chaves_lote:
+                res.erros.append((numero, "lote repetido no arquivo"))
+                continue
+            chaves_lote.add(chave)
+            linhas.append(linha)
+
+        if not linhas:
+            return
+
+        try:
+            with transaction.atomic():
+                self._gravar(linhas)
+                if self.dry_run:
+                    transaction.set_rollback(True)
+        finally:
+            if self.dry_run:
+                # ids criados dentro do rollback não existem mais
+                self._empreendimentos.clear()
+
+    def _gravar(self, linhas: list[_Linha]) -> None:
+        res = self.resultado
+
+        # 1) empreendimentos (poucos; cache entre blocos)
+        novos = {l.empreendimento: l for l in linhas if l.empreendimento not in self._empreendimentos}
+        if novos:
+            existentes = dict(
+                Empreendimento.objects.filter(nome__in=novos).values_list("nome", "id")
+            )
+            criar = [
+                Empreendimento(nome=nome, cidade=l.cidade, estado=l.estado)
+                for nome, l in novos.items()
+                if nome not in existentes
+            ]
+            Empreendimento.objects.bulk_create(criar)
+            res.empreendimentos += len(criar)
+            existentes.update({e.nome: e.pk for e in criar})
+            self._empreendimentos.update(existentes)
+
+        # 2) lotes que já têm venda: a linha é recusada antes de tocar em
+        #    cliente ou lote (o lote existente fica como está)
+        chave = {l.numero: (self._empreendimentos[l.empreendimento], l.quadra, l.lote) for l in linhas}
+        vendidos = set(
+            Venda.objects.filter(
+                lote__empreendimento_id__in={e for e, _, _ in chave.values()},
+                lote__quadra__in={q for _, q, _ in chave.values()},
+                lote__numero__in={n for _, _, n in chave.values()},
+            ).values_list("lote__empreendimento_id", "lote__quadra", "lote__numero")
+        )
+        aceitas = []
+        for l in linhas:
+            if chave[l.numero] in vendidos:
+                res.erros.append((l.numero, "lote já possui venda"))
+            else:
+                aceitas.append(l)
+        if not aceitas:
+            return
+        linhas = aceitas
+
+        # 3) clientes (upsert por cpf_cnpj; a última linha do bloco prevalece)
+        clientes = {l.cliente["cpf_cnpj"]: l.cliente for l in linhas}
+        ja_existiam = set(
+            Cliente.objects.filter(cpf_cnpj__in=clientes).values_list("cpf_cnpj", flat=True)
+        )
+        Cliente.objects.bulk_create(
+            [Cliente(**dados) for dados in clientes.values()],
+            update_conflicts=True,
+            unique_fields=["cpf_cnpj"],
+            update_fields=["nome", "telefone", "email", "endereco"],
+        )
+        res.clientes += len(clientes) - len(ja_existiam)
+        cliente_ids = dict(
+            Cliente.objects.filter(cpf_cnpj__in=clientes).values_list("cpf_cnpj", "id")
+        )
+
+        # 4) lotes (upsert por empreendimento/quadra/numero), só os que serão vendidos
+        lotes = [
+            Lote(
+                empreendimento_id=self._empreendimentos[l.empreendimento],
+                quadra=l.quadra,
+                numero=l.lote,
+                area_m2=l.area_m2,
+                preco_tabela=l.preco_tabela,
+                status=Lote.Status.VENDIDO,
+            )
+            for l in linhas
+        ]
+        emp_ids = {lote.empreendimento_id for lote in lotes}
+        antes = Lote.objects.filter(empreendimento_id__in=emp_ids).count()
+        Lote.objects.bulk_create(
+            lotes,
+            update_conflicts=True,
+            unique_fields=["empreendimento", "quadra", "numero"],
+            update_fields=["area_m2", "preco_tabela", "status"],
+        )
+        res.lotes += Lote.objects.filter(empreendimento_id__in=emp_ids).count() - antes
+        lote_ids = {
+            (e, q, n): pk
+            for pk, e, q, n in Lote.objects.filter(
+                empreendimento_id__in=emp_ids,
+                quadra__in={l.quadra for l in linhas},
+                numero__in={l.lote for l in linhas},
+            ).values_list("id", "empreendimento_id", "quadra", "numero")
+        }
+
+        # 5) vendas; bulk_create não dispara post_save: parcelas, resumo e comissão são montados aqui
+        vendas = []
+        parcelas: list[Parcela] = []
+        for l in linhas:
+            venda = Venda(
+                cliente_id=cliente_ids[l.cliente["cpf_cnpj"]],
+                lote_id=lote_ids[chave[l.numero]],
+                **l.venda,
+            )
+            da_venda = montar_parcelas(venda, self.hoje)
+            aplicar_resumo(venda, resumo_em_memoria(da_venda))
+            vendas.append(venda)
+            parcelas.extend(da_venda)
+        Venda.objects.bulk_create(vendas)
+        res.vendas += len(vendas)
+
+        # 6) parcelas (venda_id é preenchido a partir da venda já gravada) e comissões
+        Parcela.objects.bulk_create(parcelas, batch_size=5000)
+        res.parcelas += len(parcelas)
+
+        despesas = [despesa_comissao(v) for v in vendas]
+        Despesa.objects.bulk_create(despesas)
+        res.despesas += len(despesas)
+
+
+def importar_carteira(
+    arquivo: TextIO,
+    *,
+    delimitador: str = ",",
+    tamanho_bloco: int = BLOCO_PADRAO,
+    dry_run: bool = False,
+) -> ResultadoImportacao:
+    """Atalho para ImportadorCarteira(...).importar(arquivo)."""
+    importador = ImportadorCarteira(tamanho_bloco=tamanho_bloco, dry_run=dry_run)
+    return importador.importar(arquivo, delimitador=delimitador)
@@ -0,0 +1,48 @@
+# vendas/management/commands/atualizar_vencidas.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from monitoramento.models import ExecucaoTarefa
+from vendas.models import Parcela
+from vendas.services import marcar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Marca como VENCIDO as parcelas PENDENTES com vencimento anterior a hoje (rodar 1x/dia)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=str,
+            help="Data de referência (YYYY-MM-DD); padrão: hoje.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta as parcelas que seriam alteradas.",
+        )
+
+    def handle(self, *args, **options):
+        if options.get("date"):
+            try:
+                hoje = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("Formato inválido para --date (use YYYY-MM-DD).")
+        else:
+            hoje = timezone.localdate()
+
+        if options["dry_run"]:
+            qtd = Parcela.objects.filter(status="PENDENTE", vencimento__lt=hoje).count()
+            self.stdout.write(f"[dry-run] {qtd} parcela(s) seriam marcadas como VENCIDO.")
+            return
+
+        with ExecucaoTarefa.registrar("atualizar_vencidas") as detalhes:
+            detalhes["hoje"] = hoje.isoformat()
+            parcelas, vendas = marcar_vencidas(hoje)
+            detalhes.update(parcelas=parcelas, vendas=vendas)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{parcelas} parcela(s) marcada(s) como VENCIDO em {vendas} venda(s)."
+        ))
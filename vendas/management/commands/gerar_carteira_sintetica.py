@@ -0,0 +1,41 @@
+# vendas/management/commands/gerar_carteira_sintetica.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vendas.sintetico import gerar_carteira_sintetica
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma carteira sintética (empreendimentos, lotes, clientes, vendas, "
+        "parcelas, despesas, receitas e mural) para benchmarks e testes de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vendas", type=int, default=1000,
+                            help="Quantidade de vendas (padrão: 1000; ~10 mil dão ~1 milhão de parcelas).")
+        parser.add_argument("--empreendimentos", type=int,
+                            help="Quantidade de empreendimentos (padrão: 1 a cada 400 vendas).")
+        parser.add_argument("--mensagens", type=int, default=50,
+                            help="Mensagens do mural (padrão: 50).")
+        parser.add_argument("--seed", type=int, default=42,
+                            help="Semente: a mesma semente gera a mesma carteira; use outra para somar "
+                                 "a uma carteira já gerada (padrão: 42).")
+        parser.add_argument("--bloco", type=int, default=2000,
+                            help="Vendas por transação (padrão: 2000).")
+
+    def handle(self, *args, **options):
+        if options["vendas"] <= 0:
+            raise CommandError("--vendas deve ser maior que zero.")
+        t0 = time.perf_counter()
+        res = gerar_carteira_sintetica(
+            vendas=options["vendas"],
+            empreendimentos=options["empreendimentos"],
+            mensagens=options["mensagens"],
+            semente=options["seed"],
+            bloco=options["bloco"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{res.resumo()} em {time.perf_counter() - t0:.1f}s."
+        ))
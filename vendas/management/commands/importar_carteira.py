@@ -0,0 +1,63 @@
+# vendas/management/commands/importar_carteira.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vendas.importacao import BLOCO_PADRAO, importar_carteira
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa empreendimentos, lotes, clientes e vendas de um CSV "
+        "(em blocos, com bulk_create e sem os signals por venda)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do CSV (cabeçalho obrigatório).")
+        parser.add_argument(
+            "--delimitador",
+            default=",",
+            help="Separador de colunas (padrão: ',').",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="utf-8-sig",
+            help="Codificação do arquivo (padrão: utf-8-sig).",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=BLOCO_PADRAO,
+            help=f"Linhas por transação (padrão: {BLOCO_PADRAO}).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Valida e simula a importação, desfazendo tudo ao final de cada bloco.",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options["arquivo"], newline="", encoding=options["encoding"]) as f:
+                res = importar_carteira(
+                    f,
+                    delimitador=options["delimitador"],
+                    tamanho_bloco=options["bloco"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for numero, erro in res.erros[:50]:
+            self.stderr.write(f"linha {numero}: {erro}")
+        if len(res.erros) > 50:
+            self.stderr.write(f"... e mais {len(res.erros) - 50} erro(s).")
+
+        prefixo = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{res.linhas} linha(s) em {time.monotonic() - inicio:.1f}s — "
+            f"vendas={res.vendas} parcelas={res.parcelas} despesas={res.despesas} "
+            f"clientes novos={res.clientes} lotes novos={res.lotes} "
+            f"empreendimentos novos={res.empreendimentos} ignoradas={res.ignoradas}"
+        ))
@@ -0,0 +1,74 @@
+# vendas/management/commands/recalcular_resumos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from vendas.models import Venda
+from vendas.resumo import CAMPOS_RESUMO, atualizar_resumos, calcular_resumos
+
+COMPARADOS = [c for c in CAMPOS_RESUMO if c != "ultima_atualizacao"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere o resumo desnormalizado das vendas (saldo devedor, pagas, "
+        "atrasadas, próximo vencimento) contra as parcelas e corrige divergências."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas lista as divergências (sai com erro se houver alguma).",
+        )
+        parser.add_argument(
+            "--todas",
+            action="store_true",
+            help="Regrava o resumo de todas as vendas, mesmo sem divergência.",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=2000,
+            help="Vendas por consulta (padrão: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        verificar = options["verificar"]
+        bloco = max(1, options["bloco"])
+
+        qs = Venda.objects.order_by("pk").values_list("pk", *COMPARADOS)
+        total = divergentes = corrigidas = 0
+        lote: list[tuple] = []
+
+        def processar(linhas):
+            nonlocal divergentes, corrigidas
+            esperado = calcular_resumos([r[0] for r in linhas])
+            alterar = []
+            for pk, *atuais in linhas:
+                diff = [
+                    f"{campo}: {atual} != {esperado[pk][campo]}"
+                    for campo, atual in zip(COMPARADOS, atuais)
+                    if atual != esperado[pk][campo]
+                ]
+                if diff:
+                    divergentes += 1
+                    if verificar or options["verbosity"] > 1:
+                        self.stdout.write(f"venda #{pk}: " + "; ".join(diff))
+                if (diff or options["todas"]) and not verificar:
+                    alterar.append(pk)
+            if alterar:
+                corrigidas += atualizar_resumos(alterar)
+
+        for linha in qs.iterator(chunk_size=bloco):
+            total += 1
+            lote.append(linha)
+            if len(lote) >= bloco:
+                processar(lote)
+                lote = []
+        if lote:
+            processar(lote)
+
+        if verificar and divergentes:
+            raise CommandError(f"{divergentes} de {total} venda(s) com resumo divergente.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} venda(s) conferida(s); {divergentes} divergente(s); {corrigidas} atualizada(s)."
+        ))
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:13
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+
+def preencher_resumos(apps, schema_editor):
+    """Calcula o resumo inicial de todas as vendas já cadastradas."""
+    Venda = apps.get_model("vendas", "Venda")
+    Parcela = apps.get_model("vendas", "Parcela")
+    hoje = timezone.localdate()
+    agora = timezone.now()
+    aberta = ~Q(status="PAGO")
+    linhas = (
+        Parcela.objects.values("venda_id")
+        .order_by()
+        .annotate(
+            saldo=Sum("valor", filter=aberta),
+            pagas=Count("id", filter=Q(status="PAGO")),
+            atrasadas=Count(
+                "id", filter=Q(status="VENCIDO") | Q(status="PENDENTE", vencimento__lt=hoje)
+            ),
+            proximo=Min("vencimento", filter=aberta),
+        )
+    )
+    for r in linhas.iterator():
+        Venda.objects.filter(pk=r["venda_id"]).update(
+            saldo_devedor=r["saldo"] or Decimal("0.00"),
+            pagas_qtd=r["pagas"],
+            atrasadas_qtd=r["atrasadas"],
+            proximo_vencimento=r["proximo"],
+            ultima_atualizacao=agora,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0002_parcela_comprovante_venda_comprovante'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='atrasadas_qtd',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='pagas_qtd',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='proximo_vencimento',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='saldo_devedor',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='ultima_atualizacao',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
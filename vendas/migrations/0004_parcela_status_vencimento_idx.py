@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0003_venda_resumo_parcelas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parcela',
+            index=models.Index(fields=['status', 'vencimento'], name='vendas_parc_status_de4603_idx'),
+        ),
+    ]
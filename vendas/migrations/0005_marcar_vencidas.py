@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def marcar_vencidas(apps, schema_editor):
+    """
+    em_atraso() passou a olhar só status=VENCIDO: converte as parcelas já
+    vencidas que ainda estão PENDENTE (o mesmo UPDATE de atualizar_vencidas),
+    senão elas somem do painel, do extrato e do bot até a primeira rodada
+    do cron. Refaz atrasadas_qtd das vendas afetadas.
+    """
+    Venda = apps.get_model("vendas", "Venda")
+    Parcela = apps.get_model("vendas", "Parcela")
+    qs = Parcela.objects.filter(status="PENDENTE", vencimento__lt=timezone.localdate())
+    venda_ids = set(qs.values_list("venda_id", flat=True).distinct())
+    if not qs.update(status="VENCIDO", data_pagamento=None):
+        return
+    linhas = (
+        Parcela.objects.values("venda_id")
+        .order_by()
+        .annotate(atrasadas=Count("id", filter=Q(status="VENCIDO")))
+    )
+    for r in linhas.iterator():
+        if r["venda_id"] in venda_ids:
+            Venda.objects.filter(pk=r["venda_id"]).update(atrasadas_qtd=r["atrasadas"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0004_parcela_status_vencimento_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(marcar_vencidas, migrations.RunPython.noop),
+    ]
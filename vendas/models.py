@@ -4,11 +4,11 @@ from __future__ import annotations
 from decimal import Decimal
 from django.db import models
 from django.utils import timezone
-from django.db.models.signals import pre_delete, pre_save
-from django.dispatch import receiver
+from django.dispatch import Signal
 import os
 
 from cadastros.models import Cliente, Lote
+from comprovantes.mixins import RastreiaOriginaisMixin
 
 DEC_0 = Decimal("0.00")
 
@@ -26,9 +26,33 @@ def comprovante_parcela_path(instance: "Parcela", filename: str) -> str:
     return f"comprovantes/parcelas/{venc:%Y/%m}/{filename}"
 
 
-class Venda(models.Model):
+# campos que definem o plano de parcelas (alterar algum deles regera as parcelas)
+CAMPOS_PARCELAMENTO = (
+    "data_venda",
+    "valor_total",
+    "entrada_bruta",
+    "desconto",
+    "forma_pagamento",
+    "parcelas_total",
+    "juros_mensal",
+    "data_inicio_parcelamento",
+)
+
+# resumo desnormalizado: gravado só por vendas.resumo, nunca por um save comum
+CAMPOS_RESUMO = (
+    "saldo_devedor",
+    "pagas_qtd",
+    "atrasadas_qtd",
+    "proximo_vencimento",
+    "ultima_atualizacao",
+)
+
+
+class Venda(RastreiaOriginaisMixin, models.Model):
     FORMA = (("AVISTA", "À vista"), ("PARCELADO", "Parcelado"))
 
+    campos_rastreados = ("comprovante",) + CAMPOS_PARCELAMENTO
+
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT)
     lote = models.OneToOneField(Lote, on_delete=models.PROTECT)
 
@@ -50,9 +74,35 @@ class Venda(models.Model):
     # 🔹 COMPROVANTE (anexo da venda)
     comprovante = models.FileField(upload_to=comprovante_venda_path, blank=True, null=True)
 
+    # 🔹 RESUMO DAS PARCELAS (desnormalizado; mantido por vendas.resumo)
+    saldo_devedor = models.DecimalField(max_digits=12, decimal_places=2, default=DEC_0, editable=False)
+    pagas_qtd = models.PositiveIntegerField(default=0, editable=False)
+    atrasadas_qtd = models.PositiveIntegerField(default=0, editable=False)
+    proximo_vencimento = models.DateField(null=True, blank=True, editable=False)
+    ultima_atualizacao = models.DateTimeField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return f"Venda #{self.pk} - {self.cliente}"
 
+    def save(self, *args, **kwargs):
+        """
+        Num update sem update_fields, grava tudo menos CAMPOS_RESUMO: a cópia
+        em memória do resumo pode estar velha (parcela paga noutro request)
+        e não pode sobrescrever o que vendas.resumo gravou.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in CAMPOS_RESUMO
+            ]
+        super().save(*args, **kwargs)
+
+    def parcelamento_alterado(self) -> bool:
+        """Nova, ou algum campo de CAMPOS_PARCELAMENTO mudou desde o carregamento."""
+        return self._state.adding or any(
+            self.campo_alterado(c) for c in CAMPOS_PARCELAMENTO
+        )
+
     # ---- Cálculos ----
     @property
     def comissao_valor(self) -> Decimal:
@@ -89,13 +139,35 @@ class Venda(models.Model):
         return os.path.basename(self.comprovante.name) if self.comprovante else ""
 
 
-class Parcela(models.Model):
+# Evento agregado de operações em massa sobre parcelas (queryset.update etc.),
+# enviado uma única vez por operação, dentro da transação.
+# kwargs: venda_ids (set[int]), acao (str), quantidade (int)
+parcelas_alteradas = Signal()
+
+
+class ParcelaQuerySet(models.QuerySet):
+    def em_aberto(self):
+        """Parcelas ainda não pagas (PENDENTE ou VENCIDO)."""
+        return self.filter(status__in=("PENDENTE", "VENCIDO"))
+
+    def em_atraso(self):
+        """
+        Parcelas em atraso: status VENCIDO, gravado na criação das parcelas
+        já vencidas e pelo `atualizar_vencidas` na virada do dia. Filtro só
+        por status para usar o índice (status, vencimento).
+        """
+        return self.filter(status="VENCIDO")
+
+
+class Parcela(RastreiaOriginaisMixin, models.Model):
     STATUS = (
         ("PENDENTE", "Pendente"),
         ("PAGO", "Pago"),
         ("VENCIDO", "Vencido"),
     )
 
+    campos_rastreados = ("comprovante",)
+
     venda = models.ForeignKey(Venda, on_delete=models.CASCADE, related_name="parcelas")
     numero = models.PositiveIntegerField()
     valor = models.DecimalField(max_digits=12, decimal_places=2)
@@ -106,9 +178,14 @@ class Parcela(models.Model):
     # 🔹 COMPROVANTE (anexo do pagamento da parcela)
     comprovante = models.FileField(upload_to=comprovante_parcela_path, blank=True, null=True)
 
+    objects = ParcelaQuerySet.as_manager()
+
     class Meta:
         unique_together = ("venda", "numero")
         ordering = ["vencimento"]
+        indexes = [
+            models.Index(fields=["status", "vencimento"]),
+        ]
 
     def __str__(self):
         return f"Parcela {self.numero}/{self.venda.parcelas_total} da venda {self.venda_id}"
@@ -135,50 +212,4 @@ class Parcela(models.Model):
         return os.path.basename(self.comprovante.name) if self.comprovante else ""
 
 
-# ===== Limpeza de arquivos ao trocar/excluir =====
-
-def _delete_file(fieldfile) -> None:
-    """Remove o arquivo do storage se existir (não quebra a transação se falhar)."""
-    try:
-        storage = fieldfile.storage
-        if fieldfile.name and storage.exists(fieldfile.name):
-            storage.delete(fieldfile.name)
-    except Exception:
-        pass
-
-
-@receiver(pre_delete, sender=Venda)
-def venda_delete_file(sender, instance: Venda, **kwargs):
-    if instance.comprovante:
-        _delete_file(instance.comprovante)
-
-
-@receiver(pre_delete, sender=Parcela)
-def parcela_delete_file(sender, instance: Parcela, **kwargs):
-    if instance.comprovante:
-        _delete_file(instance.comprovante)
-
-
-@receiver(pre_save, sender=Venda)
-def venda_replace_file(sender, instance: Venda, **kwargs):
-    # se for update e o arquivo foi trocado, apaga o antigo
-    if not instance.pk:
-        return
-    try:
-        old = Venda.objects.get(pk=instance.pk)
-    except Venda.DoesNotExist:
-        return
-    if old.comprovante and old.comprovante != instance.comprovante:
-        _delete_file(old.comprovante)
-
-
-@receiver(pre_save, sender=Parcela)
-def parcela_replace_file(sender, instance: Parcela, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = Parcela.objects.get(pk=instance.pk)
-    except Parcela.DoesNotExist:
-        return
-    if old.comprovante and old.comprovante != instance.comprovante:
-        _delete_file(old.comprovante)
\ No newline at end of file
+# Referências e limpeza dos comprovantes (trocar/excluir): ver comprovantes.signals.
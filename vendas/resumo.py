@@ -0,0 +1,129 @@
+# vendas/resumo.py
+"""
+Resumo desnormalizado de cada Venda (saldo devedor, parcelas pagas/atrasadas,
+próximo vencimento), mantido a partir das parcelas.
+
+- Cada save/delete de Parcela recalcula o resumo da sua venda na mesma
+  transação (ver vendas.signals).
+- Operações em massa (bulk_create, queryset.update/delete) devem chamar
+  atualizar_resumos() com os ids afetados, ou rodar dentro de
+  resumos_adiados() para recalcular uma única vez ao final.
+- O comando `recalcular_resumos` confere/corrige divergências.
+- Venda.save() comum não grava CAMPOS_RESUMO; só este módulo (update).
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+from .models import CAMPOS_RESUMO, Parcela, Venda
+
+DEC_0 = Decimal("0.00")
+
+_estado = threading.local()
+
+
+def calcular_resumos(venda_ids: Iterable[int]) -> dict[int, dict]:
+    """
+    Calcula (uma única consulta agregada) o resumo das vendas informadas.
+    Vendas sem parcelas recebem resumo zerado.
+    """
+    ids = list(venda_ids)
+    vazio = dict(saldo_devedor=DEC_0, pagas_qtd=0, atrasadas_qtd=0, proximo_vencimento=None)
+    out = {pk: dict(vazio) for pk in ids}
+    if not ids:
+        return out
+
+    aberta = ~Q(status="PAGO")
+    linhas = (
+        Parcela.objects.filter(venda_id__in=ids)
+        .values("venda_id")
+        .order_by()
+        .annotate(
+            saldo_devedor=Sum("valor", filter=aberta),
+            pagas_qtd=Count("id", filter=Q(status="PAGO")),
+            atrasadas_qtd=Count("id", filter=Q(status="VENCIDO")),  # como em_atraso()
+            proximo_vencimento=Min("vencimento", filter=aberta),
+        )
+    )
+    for r in linhas:
+        out[r["venda_id"]] = dict(
+            # SQLite soma decimais em ponto flutuante: volta para centavos
+            saldo_devedor=(r["saldo_devedor"] or DEC_0).quantize(DEC_0),
+            pagas_qtd=r["pagas_qtd"],
+            atrasadas_qtd=r["atrasadas_qtd"],
+            proximo_vencimento=r["proximo_vencimento"],
+        )
+    return out
+
+
+def resumo_em_memoria(parcelas: Iterable[Parcela]) -> dict:
+    """Mesmo cálculo de calcular_resumos, para parcelas ainda não gravadas."""
+    saldo, pagas, atrasadas, proximo = DEC_0, 0, 0, None
+    for p in parcelas:
+        if p.status == "PAGO":
+            pagas += 1
+            continue
+        saldo += p.valor
+        if p.status == "VENCIDO":
+            atrasadas += 1
+        if proximo is None or p.vencimento < proximo:
+            proximo = p.vencimento
+    return dict(
+        saldo_devedor=saldo,
+        pagas_qtd=pagas,
+        atrasadas_qtd=atrasadas,
+        proximo_vencimento=proximo,
+    )
+
+
+def aplicar_resumo(venda: Venda, resumo: dict) -> None:
+    """Copia o resumo para a instância (sem salvar)."""
+    for campo, valor in resumo.items():
+        setattr(venda, campo, valor)
+    venda.ultima_atualizacao = timezone.now()
+
+
+def atualizar_resumos(venda_ids: Iterable[int]) -> int:
+    """
+    Recalcula e grava o resumo das vendas informadas.
+    Dentro de resumos_adiados() apenas acumula os ids. Retorna quantas vendas
+    foram atualizadas agora.
+    """
+    ids = {pk for pk in venda_ids if pk}
+    pendentes = getattr(_estado, "pendentes", None)
+    if pendentes is not None:
+        pendentes.update(ids)
+        return 0
+    if not ids:
+        return 0
+
+    resumos = calcular_resumos(ids)
+    vendas = [Venda(pk=pk) for pk in resumos]
+    for v in vendas:
+        aplicar_resumo(v, resumos[v.pk])
+    Venda.objects.bulk_update(vendas, CAMPOS_RESUMO, batch_size=500)
+    return len(vendas)
+
+
+@contextmanager
+def resumos_adiados():
+    """
+    Acumula as vendas afetadas por saves/deletes de parcelas e recalcula
+    cada resumo uma única vez ao sair do bloco (reentrante).
+    """
+    if getattr(_estado, "pendentes", None) is not None:
+        yield
+        return
+    _estado.pendentes = set()
+    try:
+        yield
+        ids = _estado.pendentes
+    finally:
+        _estado.pendentes = None
+    atualizar_resumos(ids)
@@ -1,8 +1,24 @@
+from datetime import datetime
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
-from .models import Venda, Parcela
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from financeiro.models import Despesa
+
+from .models import Venda, Parcela, parcelas_alteradas
+from .resumo import atualizar_resumos, resumos_adiados
+
 
 def gerar_parcelas(venda: Venda):
+    # o resumo da venda é recalculado uma única vez ao final
+    with resumos_adiados():
+        _gerar_parcelas(venda)
+        atualizar_resumos([venda.pk])
+
+
+def _gerar_parcelas(venda: Venda):
     # remove antigas (recria se atualizar a venda)
     Parcela.objects.filter(venda=venda).delete()
 
@@ -10,11 +26,15 @@ def gerar_parcelas(venda: Venda):
         return
 
     base = venda.data_inicio_parcelamento or venda.data_venda
+    if isinstance(base, datetime):  # default=timezone.now, ainda não relido do banco
+        base = timezone.localdate(base)
     restante = venda.valor_total - venda.desconto - venda.entrada_bruta
     if restante < 0:
         restante = Decimal('0.00')
 
     valor_base = (restante / venda.parcelas_total).quantize(Decimal('0.01'))
+    # já vencidas nascem VENCIDO, como ficariam depois de atualizar_vencidas
+    hoje = timezone.localdate()
 
     for n in range(1, venda.parcelas_total + 1):
         venc = base + relativedelta(months=n-1)
@@ -23,4 +43,72 @@ def gerar_parcelas(venda: Venda):
             numero=n,
             valor=valor_base,
             vencimento=venc,
-        )
\ No newline at end of file
+            status='VENCIDO' if venc < hoje else 'PENDENTE',
+        )
+
+
+def despesa_comissao(venda: Venda) -> Despesa:
+    """Despesa (ainda não salva) da comissão paga na criação da venda."""
+    return Despesa(
+        data=venda.data_venda,
+        categoria='COMISSAO',
+        descricao=f'Comissão venda #{venda.pk}',
+        valor=venda.comissao_valor,
+        status='PAGA',
+        origem='Empresa',
+    )
+
+
+def marcar_vencidas(hoje=None) -> tuple[int, int]:
+    """
+    PENDENTE -> VENCIDO para parcelas com vencimento anterior a `hoje`,
+    num único UPDATE (idempotente). Atualiza o resumo das vendas afetadas.
+    Retorna (parcelas_alteradas, vendas_afetadas).
+    """
+    hoje = hoje or timezone.localdate()
+    with transaction.atomic():
+        qs = Parcela.objects.filter(status="PENDENTE", vencimento__lt=hoje)
+        venda_ids = set(qs.values_list("venda_id", flat=True).distinct())
+        qtd = qs.update(status="VENCIDO", data_pagamento=None)
+        parcelas_alteradas.send(
+            sender=Parcela, venda_ids=venda_ids, acao="vencimento", quantidade=qtd
+        )
+    return qtd, len(venda_ids)
+
+
+def baixar_parcelas(parcelas, data_pagamento=None) -> int:
+    """
+    Baixa (marca como PAGO) várias parcelas num único UPDATE:
+      status = 'PAGO', data_pagamento = COALESCE(data_pagamento, <data>)
+    `parcelas` pode ser um queryset de Parcela ou uma lista de ids.
+    Parcelas já pagas são ignoradas. Envia um único `parcelas_alteradas`.
+    Retorna a quantidade baixada.
+    """
+    data_pagamento = data_pagamento or timezone.localdate()
+    if not isinstance(parcelas, models.QuerySet):
+        parcelas = Parcela.objects.filter(pk__in=list(parcelas))
+
+    with transaction.atomic():
+        qs = parcelas.em_aberto().order_by()
+        venda_ids = set(qs.values_list("venda_id", flat=True).distinct())
+        if not venda_ids:
+            return 0
+        qtd = qs.update(
+            status="PAGO",
+            data_pagamento=Coalesce(F("data_pagamento"), Value(data_pagamento)),
+        )
+        parcelas_alteradas.send(
+            sender=Parcela, venda_ids=venda_ids, acao="baixa", quantidade=qtd
+        )
+    return qtd
+
+
+def alterar_status_parcelas(parcelas: models.QuerySet, status: str) -> int:
+    """Volta parcelas para PENDENTE/VENCIDO num único UPDATE (zera data_pagamento)."""
+    with transaction.atomic():
+        venda_ids = set(parcelas.order_by().values_list("venda_id", flat=True).distinct())
+        qtd = parcelas.update(status=status, data_pagamento=None)
+        parcelas_alteradas.send(
+            sender=Parcela, venda_ids=venda_ids, acao=status.lower(), quantidade=qtd
+        )
+    return qtd
@@ -1,22 +1,42 @@
 # vendas/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Venda
-from .services import gerar_parcelas
-from financeiro.models import Despesa
+from cadastros.models import Lote
+from .models import Parcela, Venda, parcelas_alteradas
+from .resumo import atualizar_resumos
+from .services import despesa_comissao, gerar_parcelas
 
 @receiver(post_save, sender=Venda)
 def apos_salvar_venda(sender, instance: Venda, created, **kwargs):
-    # (re)gera as parcelas sempre que a venda for salva
-    gerar_parcelas(instance)
+    # (re)gera as parcelas só na criação ou se o plano de parcelamento mudou
+    if created or instance.parcelamento_alterado():
+        gerar_parcelas(instance)
 
     # cria despesa de comissão na primeira criação da venda
     if created:
-        Despesa.objects.create(
-            data=instance.data_venda,
-            categoria='COMISSAO',
-            descricao=f'Comissão venda #{instance.pk}',
-            valor=instance.comissao_valor,
-            status='PAGA',
-            origem='Empresa',
-        )
\ No newline at end of file
+        despesa_comissao(instance).save()
+        # o lote sai do seletor de lotes disponíveis
+        Lote.objects.filter(pk=instance.lote_id).exclude(
+            status=Lote.Status.VENDIDO
+        ).update(status=Lote.Status.VENDIDO)
+
+
+@receiver(post_delete, sender=Venda)
+def apos_excluir_venda(sender, instance: Venda, **kwargs):
+    # venda desfeita: o lote volta ao seletor de lotes disponíveis
+    Lote.objects.filter(pk=instance.lote_id, status=Lote.Status.VENDIDO).update(
+        status=Lote.Status.DISPONIVEL
+    )
+
+
+@receiver(post_save, sender=Parcela)
+@receiver(post_delete, sender=Parcela)
+def apos_alterar_parcela(sender, instance: Parcela, **kwargs):
+    # mantém o resumo desnormalizado da venda (mesma transação do save/delete)
+    atualizar_resumos([instance.venda_id])
+
+
+@receiver(parcelas_alteradas)
+def apos_alterar_parcelas_em_massa(sender, venda_ids, **kwargs):
+    # um único recálculo por operação em massa
+    atualizar_resumos(venda_ids)
@@ -0,0 +1,271 @@
+# vendas/sintetico.py
+"""
+Carteira sintética para benchmarks e testes de carga (comando
+`gerar_carteira_sintetica`).
+
+Tudo é inserido em massa, em blocos, cada bloco numa transação, sem passar
+pelos signals: parcelas, resumo das vendas e comissões são montados em
+memória, como na importação (vendas.importacao). As parcelas (a maior
+tabela, ~100 por venda) vão como tuplas num executemany, sem instanciar
+models. A geração é determinística para a mesma semente.
+
+Perfis de pagamento (por venda): em dia (pagou tudo que já venceu),
+atrasado (parou de pagar há 1–6 parcelas) e inadimplente (pagou só o
+começo). Parcelas vencidas e não pagas já saem como VENCIDO, como ficariam
+depois de `atualizar_vencidas`.
+"""
+from __future__ import annotations
+
+import random
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cadastros.models import Cliente, Empreendimento, Lote
+from financeiro.models import Despesa, ReceitaExtra
+from mural.models import Mensagem
+
+from .models import Parcela, Venda
+from .resumo import aplicar_resumo, resumo_em_memoria
+from .services import despesa_comissao
+from .utils import plano_parcelas
+
+PRAZOS = (12, 24, 36, 48, 60, 120, 180, 240)
+PESOS_PRAZOS = (8, 12, 14, 10, 20, 20, 10, 6)
+PERFIS = (("em_dia", 80), ("atrasado", 15), ("inadimplente", 5))
+CIDADES = (("Teresina", "PI"), ("Parnaíba", "PI"), ("Timon", "MA"), ("Picos", "PI"))
+
+# parcela ainda não gravada (mesmos atributos que resumo_em_memoria lê)
+_Parcela = namedtuple("_Parcela", "numero valor vencimento status data_pagamento")
+
+
+@dataclass
+class ResultadoSintetico:
+    empreendimentos: int = 0
+    lotes: int = 0
+    clientes: int = 0
+    vendas: int = 0
+    parcelas: int = 0
+    despesas: int = 0
+    receitas: int = 0
+    mensagens: int = 0
+    por_modelo: dict = field(default_factory=dict)
+
+    def resumo(self) -> str:
+        return (
+            f"{self.empreendimentos} empreendimento(s), {self.lotes} lote(s), "
+            f"{self.clientes} cliente(s), {self.vendas} venda(s), {self.parcelas} parcela(s), "
+            f"{self.despesas} despesa(s), {self.receitas} receita(s), {self.mensagens} mensagem(ns)"
+        )
+
+
+class GeradorCarteira:
+    def __init__(self, *, semente: int = 42, bloco: int = 2000, anos: int = 6,
+                 hoje: date | None = None):
+        self.rng = random.Random(semente)
+        self.semente = semente
+        self.bloco = max(1, bloco)
+        self.anos = anos
+        self.hoje = hoje or timezone.localdate()
+        self.res = ResultadoSintetico()
+
+    # ----- API -----
+    def gerar(self, *, vendas: int, empreendimentos: int | None = None,
+              mensagens: int = 50) -> ResultadoSintetico:
+        qtd_emp = empreendimentos or max(1, vendas // 400)
+        emp_ids = self._empreendimentos(qtd_emp)
+        for inicio in range(0, vendas, self.bloco):
+            with transaction.atomic():
+                self._bloco_vendas(inicio, min(self.bloco, vendas - inicio), emp_ids)
+        with transaction.atomic():
+            self._financeiro()
+            self._mural(mensagens)
+        return self.res
+
+    # ----- partes -----
+    def _empreendimentos(self, qtd: int) -> list[int]:
+        objs = []
+        for i in range(qtd):
+            cidade, uf = self.rng.choice(CIDADES)
+            objs.append(Empreendimento(
+                nome=f"Residencial Sintético {self.semente}-{i + 1}", cidade=cidade, estado=uf,
+            ))
+        Empreendimento.objects.bulk_create(objs)
+        self.res.empreendimentos += len(objs)
+        return [e.pk for e in objs]
+
+    def _data_venda(self) -> date:
+        return self.hoje - timedelta(days=self.rng.randrange(30, 365 * self.anos))
+
+    def _bloco_vendas(self, inicio: int, qtd: int, emp_ids: list[int]) -> None:
+        rng = self.rng
+        # lotes: 1 por venda + ~20% ainda disponíveis
+        lotes = []
+        for i in range(inicio, inicio + qtd):
+            emp = emp_ids[i % len(emp_ids)]
+            quadra = f"Q{(i // 40) + 1}"
+            area = Decimal(rng.randrange(200, 600))
+            preco = (area * Decimal(rng.randrange(120, 400))).quantize(Decimal("1"))
+            lotes.append(Lote(
+                empreendimento_id=emp, quadra=quadra, numero=str(i % 40 + 1),
+                area_m2=area, preco_tabela=preco, status=Lote.Status.VENDIDO,
+            ))
+            if rng.random() < 0.2:
+                lotes.append(Lote(
+                    empreendimento_id=emp, quadra=quadra, numero=f"{i % 40 + 1}-B",
+                    area_m2=area, preco_tabela=preco,
+                ))
+        Lote.objects.bulk_create(lotes, batch_size=5000)
+        self.res.lotes += len(lotes)
+        vendidos = [l for l in lotes if l.status == Lote.Status.VENDIDO]
+
+        # clientes: ~10% compram mais de um lote
+        clientes = [
+            Cliente(
+                nome=f"Cliente Sintético {i + 1}", cpf_cnpj=f"S{self.semente:04d}{i:010d}",
+                telefone=f"(86) 9{rng.randrange(10**7, 10**8)}",
+            )
+            for i in range(inicio, inicio + qtd)
+            if i == inicio or rng.random() >= 0.1
+        ]
+        Cliente.objects.bulk_create(clientes, batch_size=5000)
+        self.res.clientes += len(clientes)
+
+        vendas, planos = [], []
+        for lote in vendidos:
+            venda = self._venda(lote, rng.choice(clientes))
+            plano = self._pagamentos(self._plano(venda))
+            aplicar_resumo(venda, resumo_em_memoria(plano))
+            vendas.append(venda)
+            planos.append(plano)
+        Venda.objects.bulk_create(vendas, batch_size=2000)
+        self._inserir_parcelas(vendas, planos)
+        Despesa.objects.bulk_create([despesa_comissao(v) for v in vendas], batch_size=5000)
+        self.res.vendas += len(vendas)
+        self.res.parcelas += sum(len(p) for p in planos)
+        self.res.despesas += len(vendas)
+
+    def _venda(self, lote: Lote, cliente: Cliente) -> Venda:
+        rng = self.rng
+        total = lote.preco_tabela
+        data_venda = self._data_venda()
+        if rng.random() < 0.1:
+            return Venda(
+                cliente=cliente, lote=lote, data_venda=data_venda, valor_total=total,
+                entrada_bruta=total, forma_pagamento="AVISTA", parcelas_total=0,
+                comissao_percent=Decimal("5.00"),
+            )
+        entrada = (total * Decimal(rng.choice((5, 10, 15, 20))) / 100).quantize(Decimal("0.01"))
+        return Venda(
+            cliente=cliente, lote=lote, data_venda=data_venda, valor_total=total,
+            entrada_bruta=entrada,
+            desconto=Decimal(rng.choice((0, 0, 0, 500, 1000))),
+            forma_pagamento="PARCELADO",
+            parcelas_total=rng.choices(PRAZOS, PESOS_PRAZOS)[0],
+            comissao_percent=Decimal(rng.choice(("5.00", "10.00", "20.00"))),
+        )
+
+    def _plano(self, venda: Venda) -> list[_Parcela]:
+        # regras de vendas.utils.plano_parcelas; o status sai de _pagamentos
+        return [
+            _Parcela(numero, valor, venc, "PENDENTE", None)
+            for numero, valor, venc in plano_parcelas(venda)
+        ]
+
+    def _pagamentos(self, plano: list[_Parcela]) -> list[_Parcela]:
+        rng = self.rng
+        vencidas = sum(1 for p in plano if p.vencimento < self.hoje)
+        if not vencidas:
+            return plano
+        perfil = rng.choices([p for p, _ in PERFIS], [w for _, w in PERFIS])[0]
+        if perfil == "em_dia":
+            pagas = vencidas
+        elif perfil == "atrasado":
+            pagas = max(0, vencidas - rng.randrange(1, 7))
+        else:
+            pagas = rng.randrange(0, max(1, vencidas // 3))
+        for i in range(vencidas):  # o plano está em ordem de vencimento
+            p = plano[i]
+            if i < pagas:
+                pago_em = p.vencimento + timedelta(days=rng.randrange(-5, 10))
+                plano[i] = p._replace(status="PAGO", data_pagamento=pago_em)
+            else:
+                plano[i] = p._replace(status="VENCIDO")
+        return plano
+
+    def _inserir_parcelas(self, vendas: list[Venda], planos: list[list[_Parcela]]) -> None:
+        tabela = connection.ops.quote_name(Parcela._meta.db_table)
+        sql = (
+            f"INSERT INTO {tabela} (venda_id, numero, valor, vencimento, status, data_pagamento) "
+            "VALUES (%s, %s, %s, %s, %s, %s)"
+        )
+        linhas = [
+            (v.pk, p.numero, str(p.valor), p.vencimento.isoformat(), p.status,
+             p.data_pagamento.isoformat() if p.data_pagamento else None)
+            for v, plano in zip(vendas, planos)
+            for p in plano
+        ]
+        with connection.cursor() as cursor:
+            for i in range(0, len(linhas), 10000):
+                cursor.executemany(sql, linhas[i:i + 10000])
+
+    def _financeiro(self) -> None:
+        rng = self.rng
+        despesas, receitas = [], []
+        mes = (self.hoje - relativedelta(years=self.anos)).replace(day=1)
+        while mes <= self.hoje:
+            for _ in range(rng.randrange(3, 9)):
+                dia = mes + timedelta(days=rng.randrange(0, 28))
+                despesas.append(Despesa(
+                    data=dia, categoria=rng.choice(("CUSTO", "PESSOAL", "FAZENDA", "EMPRESA", "OUTRA")),
+                    descricao="Despesa sintética", valor=Decimal(rng.randrange(50, 8000)),
+                    status="PAGA" if dia < self.hoje else "PREVISTA", origem="Sintético",
+                ))
+            for _ in range(rng.randrange(0, 3)):
+                receitas.append(ReceitaExtra(
+                    data=mes + timedelta(days=rng.randrange(0, 28)),
+                    descricao="Receita sintética", valor=Decimal(rng.randrange(100, 5000)),
+                ))
+            mes += relativedelta(months=1)
+        Despesa.objects.bulk_create(despesas, batch_size=5000)
+        ReceitaExtra.objects.bulk_create(receitas, batch_size=5000)
+        self.res.despesas += len(despesas)
+        self.res.receitas += len(receitas)
+
+    def _mural(self, qtd: int) -> None:
+        if qtd <= 0:
+            return
+        User = get_user_model()
+        autor = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if autor is None:
+            autor, _ = User.objects.get_or_create(
+                username="sintetico", defaults={"is_active": False}
+            )
+        tipos = [t for t, _ in Mensagem.TIPOS]
+        msgs = [
+            Mensagem(
+                titulo=f"Aviso sintético {i + 1}", conteudo="Mensagem gerada para testes de carga.",
+                tipo=self.rng.choice(tipos), fixada=i < 2, autor=autor,
+            )
+            for i in range(qtd)
+        ]
+        Mensagem.objects.bulk_create(msgs)
+        # criada_em é auto_now_add: espalha as datas depois de inserir
+        for m in msgs:
+            m.criada_em = timezone.make_aware(
+                datetime.combine(self.hoje - timedelta(days=self.rng.randrange(0, 60)), time(9))
+            )
+        Mensagem.objects.bulk_update(msgs, ["criada_em"], batch_size=1000)
+        self.res.mensagens += len(msgs)
+
+
+def gerar_carteira_sintetica(*, vendas: int, semente: int = 42, **kwargs) -> ResultadoSintetico:
+    """Atalho usado pelo comando e pelos benchmarks."""
+    opcoes = {k: kwargs.pop(k) for k in ("bloco", "anos", "hoje") if k in kwargs}
+    return GeradorCarteira(semente=semente, **opcoes).gerar(vendas=vendas, **kwargs)
@@ -1,3 +1,341 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from cadastros.models import Cliente, Lote
+from financeiro.models import Despesa
+from testes.apoio import SEM_MANIFESTO, ConsultasConstantesTestCase, ate, criar_vendas
+from vendas.importacao import importar_carteira
+from vendas.models import CAMPOS_RESUMO, Parcela, Venda
+from vendas.resumo import calcular_resumos
+from vendas.services import baixar_parcelas, marcar_vencidas
+from vendas.sintetico import gerar_carteira_sintetica
+from vendas.utils import plano_parcelas
+
+VENDAS = ate(Venda, criar_vendas)
+
+COMPARADOS_RESUMO = [c for c in CAMPOS_RESUMO if c != "ultima_atualizacao"]
+
+
+class AdminConsultasTests(ConsultasConstantesTestCase):
+    """Cada página do admin custa o mesmo número de queries, com 3 ou 12 linhas."""
+
+    def test_changelist_vendas(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:vendas_venda_changelist"), 7, VENDAS)
+
+    def test_changelist_parcelas(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:vendas_parcela_changelist"), 7, VENDAS)
+
+    def test_form_venda(self):
+        self.assertConsultasConstantes(
+            lambda: reverse("admin:vendas_venda_change", args=[Venda.objects.first().pk]), 12, VENDAS
+        )
+
+    def test_form_parcela(self):
+        self.assertConsultasConstantes(
+            lambda: reverse("admin:vendas_parcela_change", args=[Parcela.objects.first().pk]), 9, VENDAS
+        )
+
+    def test_form_nova_venda(self):
+        self.assertConsultasConstantes(lambda: reverse("admin:vendas_venda_add"), 6, VENDAS)
+
+
+class LoteDaVendaTests(TestCase):
+    def test_criar_venda_marca_lote_vendido(self):
+        venda = criar_vendas(1)[0]
+        self.assertEqual(Lote.objects.get(pk=venda.lote_id).status, Lote.Status.VENDIDO)
+
+    def test_excluir_venda_libera_lote(self):
+        venda = criar_vendas(1)[0]
+        venda.delete()
+        self.assertEqual(Lote.objects.get(pk=venda.lote_id).status, Lote.Status.DISPONIVEL)
+
+
+CSV_CARTEIRA = """empreendimento,quadra,lote,area_m2,preco_tabela,cliente,cpf_cnpj,data_venda,valor_total,entrada_bruta,forma_pagamento,parcelas_total,data_inicio_parcelamento
+Residencial Sol,A,1,300,60000,Ana,11111111111,2025-01-10,60000,6000,PARCELADO,12,2025-02-10
+Residencial Sol,A,2,250,50000,Bruno,22222222222,10/01/2025,"50.000,00",0,AVISTA,0,
+"""
+
+
+class ImportacaoCarteiraTests(TestCase):
+    def _importar(self, texto=CSV_CARTEIRA):
+        return importar_carteira(io.StringIO(texto))
+
+    def test_importa_carteira(self):
+        res = self._importar()
+        self.assertEqual(res.erros, [])
+        self.assertEqual((res.empreendimentos, res.clientes, res.lotes, res.vendas), (1, 2, 2, 2))
+        self.assertEqual(res.parcelas, Parcela.objects.count())
+        self.assertEqual(Parcela.objects.filter(venda__lote__numero="1").count(), 12)
+        self.assertFalse(Lote.objects.exclude(status=Lote.Status.VENDIDO).exists())
+        self.assertEqual(Despesa.objects.count(), 2)
+
+    def test_linha_invalida_e_ignorada(self):
+        texto = CSV_CARTEIRA + "Residencial Sol,A,3,300,60000,Caio,33333333333,2025-13-40,60000,0,PARCELADO,12,\n"
+        res = self._importar(texto)
+        self.assertEqual(res.vendas, 2)
+        self.assertEqual(res.erros, [(4, "data_venda inválida: '2025-13-40'")])
+        self.assertFalse(Cliente.objects.filter(cpf_cnpj="33333333333").exists())
+
+    def test_lote_com_venda_nao_e_alterado(self):
+        self._importar()
+        lote = Lote.objects.get(numero="1")
+        lote.status = Lote.Status.DISPONIVEL
+        lote.save(update_fields=["status"])
+        texto = CSV_CARTEIRA.replace("Ana,11111111111", "Outra Ana,11111111111").replace("300,60000", "999,1")
+
+        res = self._importar(texto)
+
+        self.assertEqual(res.vendas, 0)
+        self.assertEqual([msg for _, msg in res.erros], ["lote já possui venda"] * 2)
+        lote.refresh_from_db()
+        self.assertEqual((lote.area_m2, lote.preco_tabela, lote.status),
+                         (Decimal("300.00"), Decimal("60000.00"), Lote.Status.DISPONIVEL))
+        self.assertEqual(Cliente.objects.get(cpf_cnpj="11111111111").nome, "Ana")
+
+    def test_reimportar_o_mesmo_arquivo_nao_duplica(self):
+        self._importar()
+        contagens = (Venda.objects.count(), Parcela.objects.count(), Lote.objects.count(),
+                     Cliente.objects.count(), Despesa.objects.count())
+        res = self._importar()
+        self.assertEqual((res.vendas, res.lotes, res.clientes), (0, 0, 0))
+        self.assertEqual(len(res.erros), 2)
+        self.assertEqual(contagens, (Venda.objects.count(), Parcela.objects.count(), Lote.objects.count(),
+                                     Cliente.objects.count(), Despesa.objects.count()))
+
+
+class ResumoVendaTests(TestCase):
+    """O resumo gravado na venda sempre bate com as parcelas."""
+
+    def setUp(self):
+        self.venda = criar_vendas(1, parcelas=6)[0]
+
+    def assertResumoEmDia(self):
+        gravado = Venda.objects.values(*COMPARADOS_RESUMO).get(pk=self.venda.pk)
+        self.assertEqual(gravado, calcular_resumos([self.venda.pk])[self.venda.pk])
+
+    def test_pagamento_atualiza_resumo(self):
+        parcela = self.venda.parcelas.order_by("numero").first()
+        parcela.status = "PAGO"
+        parcela.save()
+        self.assertResumoEmDia()
+        self.assertEqual(Venda.objects.get(pk=self.venda.pk).pagas_qtd, 1)
+
+    def test_editar_venda_carregada_antes_do_pagamento_nao_reverte_resumo(self):
+        velha = Venda.objects.get(pk=self.venda.pk)  # resumo em memória: nada pago
+        parcela = self.venda.parcelas.order_by("numero").first()
+        parcela.status = "PAGO"
+        parcela.save()
+
+        velha.cliente = Cliente.objects.create(nome="Outro", cpf_cnpj="99999999999")
+        velha.save()
+
+        self.assertResumoEmDia()
+        self.assertEqual(Venda.objects.get(pk=self.venda.pk).pagas_qtd, 1)
+
+    def test_mudar_plano_recalcula_resumo(self):
+        venda = Venda.objects.get(pk=self.venda.pk)
+        venda.parcelas_total = 10
+        venda.save()
+        self.assertEqual(venda.parcelas.count(), 10)
+        self.assertResumoEmDia()
+
+    def test_excluir_parcela_atualiza_resumo(self):
+        self.venda.parcelas.order_by("numero").last().delete()
+        self.assertResumoEmDia()
+
+
+class MarcarVencidasTests(TestCase):
+    def setUp(self):
+        self.venda = criar_vendas(1, parcelas=6)[0]
+        self.hoje = timezone.localdate()
+        # simula a virada do dia: duas parcelas em aberto e uma paga ficaram para trás
+        primeiras = list(self.venda.parcelas.order_by("numero")[:3])
+        Parcela.objects.filter(pk__in=[p.pk for p in primeiras[:2]]).update(vencimento=self.hoje - timedelta(days=1))
+        Parcela.objects.filter(pk=primeiras[2].pk).update(
+            vencimento=self.hoje - timedelta(days=1), status="PAGO", data_pagamento=self.hoje,
+        )
+
+    def test_marca_apenas_pendentes_vencidas(self):
+        self.assertFalse(Parcela.objects.em_atraso().exists())
+
+        self.assertEqual(marcar_vencidas(self.hoje), (2, 1))
+
+        self.assertEqual(Parcela.objects.em_atraso().count(), 2)
+        self.assertEqual(Parcela.objects.filter(status="PAGO").count(), 1)
+        venda = Venda.objects.get(pk=self.venda.pk)
+        self.assertEqual(venda.atrasadas_qtd, 2)
+        self.assertEqual(Venda.objects.values(*COMPARADOS_RESUMO).get(pk=venda.pk),
+                         calcular_resumos([venda.pk])[venda.pk])
+
+    def test_idempotente(self):
+        marcar_vencidas(self.hoje)
+        self.assertEqual(marcar_vencidas(self.hoje), (0, 0))
+
+    def test_migracao_converte_as_ja_vencidas(self):
+        migracao = import_module("vendas.migrations.0005_marcar_vencidas")
+        migracao.marcar_vencidas(apps, None)
+        self.assertEqual(Parcela.objects.em_atraso().count(), 2)
+        self.assertEqual(Venda.objects.get(pk=self.venda.pk).atrasadas_qtd, 2)
+
+    def test_parcelas_ja_vencidas_nascem_vencido(self):
+        importar_carteira(io.StringIO(CSV_CARTEIRA))
+        atrasadas = Parcela.objects.filter(venda__lote__numero="1", vencimento__lt=self.hoje)
+        self.assertTrue(atrasadas.exists())
+        self.assertFalse(atrasadas.exclude(status="VENCIDO").exists())
+        self.assertEqual(marcar_vencidas(self.hoje), (2, 1))  # só as da setUp
+
+
+class BaixarParcelasTests(TestCase):
+    def setUp(self):
+        self.vendas = criar_vendas(2, parcelas=4)
+        self.data = timezone.localdate() - timedelta(days=2)
+
+    def resumo_em_dia(self, venda):
+        self.assertEqual(Venda.objects.values(*COMPARADOS_RESUMO).get(pk=venda.pk),
+                         calcular_resumos([venda.pk])[venda.pk])
+
+    def test_um_update_e_resumo_pelo_sinal(self):
+        ids = list(Parcela.objects.filter(numero__lte=2).values_list("pk", flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(baixar_parcelas(ids, self.data), 4)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "vendas_parcela"')]
+        self.assertEqual(len(updates), 1)
+        for venda in self.vendas:
+            self.assertEqual(Venda.objects.get(pk=venda.pk).pagas_qtd, 2)
+            self.resumo_em_dia(venda)
+
+    def test_mantem_data_de_pagamento_ja_informada(self):
+        anterior = self.data - timedelta(days=30)
+        p1, p2 = Parcela.objects.filter(venda=self.vendas[0]).order_by("numero")[:2]
+        Parcela.objects.filter(pk=p1.pk).update(data_pagamento=anterior)
+        baixar_parcelas([p1.pk, p2.pk], self.data)
+        self.assertEqual(Parcela.objects.get(pk=p1.pk).data_pagamento, anterior)
+        self.assertEqual(Parcela.objects.get(pk=p2.pk).data_pagamento, self.data)
+
+    def test_idempotente_nas_ja_pagas(self):
+        qs = Parcela.objects.filter(venda=self.vendas[0])
+        baixar_parcelas(qs, self.data)
+        with self.assertNumQueries(3):  # savepoint + SELECT das vendas em aberto + release
+            self.assertEqual(baixar_parcelas(qs, self.data + timedelta(days=1)), 0)
+        self.assertEqual(set(qs.values_list("data_pagamento", flat=True)), {self.data})
+
+
+@SEM_MANIFESTO
+class BaixaEmMassaViewTests(TestCase):
+    def setUp(self):
+        self.venda = criar_vendas(1, parcelas=3)[0]
+        self.url = reverse("vendas:parcelas_baixa")
+
+    def test_so_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(get_user_model().objects.create_user("comum", password="x"))
+        resp = self.client.post(self.url, {"parcelas": [Parcela.objects.first().pk]})
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(Parcela.objects.filter(status="PAGO").exists())
+
+    def test_staff_baixa_as_selecionadas(self):
+        self.client.force_login(get_user_model().objects.create_user("staff", password="x", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        p1, p2, _ = self.venda.parcelas.order_by("numero")
+        resp = self.client.post(self.url, {"parcelas": [p1.pk, p2.pk, "x"], "data_pagamento": "2026-01-15"})
+        self.assertRedirects(resp, self.url, fetch_redirect_response=False)
+        self.assertEqual(
+            list(self.venda.parcelas.filter(status="PAGO").values_list("data_pagamento", flat=True)),
+            [date(2026, 1, 15)] * 2,
+        )
+        self.assertEqual(Venda.objects.get(pk=self.venda.pk).pagas_qtd, 2)
+
+    def test_acao_do_admin(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@a.com", "x"))
+        ids = list(self.venda.parcelas.values_list("pk", flat=True))
+        resp = self.client.post(reverse("admin:vendas_parcela_changelist"), {
+            "action": "marcar_pago", "_selected_action": ids,
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(self.venda.parcelas.filter(status="PAGO").count(), 3)
+        self.assertEqual(Venda.objects.get(pk=self.venda.pk).pagas_qtd, 3)
+
+
+class CarteiraSinteticaTests(TestCase):
+    def test_parcelas_seguem_as_regras_de_plano_parcelas(self):
+        gerar_carteira_sintetica(vendas=5, semente=3, mensagens=0)
+        for venda in Venda.objects.filter(forma_pagamento="PARCELADO"):
+            gravadas = list(venda.parcelas.order_by("numero").values_list("numero", "valor", "vencimento"))
+            self.assertEqual(gravadas, plano_parcelas(venda))
+
+
+def _dados_do_formulario(resp) -> dict:
+    """POST equivalente a reenviar a página de edição do admin como ela veio."""
+    formularios = [resp.context["adminform"].form]
+    for inline in resp.context["inline_admin_formsets"]:
+        formularios += [inline.formset.management_form, *inline.formset.forms]
+    dados = {}
+    for form in formularios:
+        for campo in form:
+            valor = campo.value()
+            if valor is None or valor is False or isinstance(valor, FieldFile):  # arquivo: não reenvia
+                continue
+            dados[campo.html_name] = valor
+    return dados
+
+
+@SEM_MANIFESTO
+class ParcelaPaginadaFormSetTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@a.com", "x"))
+        self.venda = criar_vendas(1, parcelas=30)[0]  # 24 por página: 2 páginas
+        self.url = reverse("admin:vendas_venda_change", args=[self.venda.pk])
+
+    def formset(self, resp):
+        return resp.context["inline_admin_formsets"][0].formset
+
+    def test_mostra_so_a_pagina_pedida(self):
+        formset = self.formset(self.client.get(self.url))
+        self.assertEqual([f.instance.numero for f in formset.forms], list(range(1, 25)))
+        self.assertEqual(formset.management_form["INITIAL_FORMS"].value(), 24)
+
+        formset = self.formset(self.client.get(self.url, {"parcelas_pagina": 2}))
+        self.assertEqual([f.instance.numero for f in formset.forms], list(range(25, 31)))
+        self.assertEqual(
+            [(n, atual) for n, _, atual in formset.links_paginas], [(1, False), (2, True)]
+        )
+        self.assertIn("parcelas_pagina=1", formset.links_paginas[0][1])
+
+    def test_pagina_invalida_cai_na_ultima_ou_na_primeira(self):
+        formset = self.formset(self.client.get(self.url, {"parcelas_pagina": 99}))
+        self.assertEqual(formset.forms[0].instance.numero, 25)
+        formset = self.formset(self.client.get(self.url, {"parcelas_pagina": "x"}))
+        self.assertEqual(formset.forms[0].instance.numero, 1)
+
+    def test_salvar_a_pagina_2_nao_mexe_na_pagina_1(self):
+        url = f"{self.url}?parcelas_pagina=2"
+        dados = _dados_do_formulario(self.client.get(url))
+        parcelas = self.venda.parcelas.order_by("numero")
+        pagina_1 = list(parcelas.filter(numero__lte=24).values())
+        p25, p30 = parcelas.get(numero=25), parcelas.get(numero=30)
+        linha = {int(dados[f"parcelas-{i}-id"]): i for i in range(6)}
+        dados[f"parcelas-{linha[p25.pk]}-valor"] = "1234.56"
+        dados[f"parcelas-{linha[p30.pk]}-DELETE"] = "on"
+
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.post(url, dados)
+        self.assertEqual(resp.status_code, 302)
 
-# Create your tests here.
+        self.assertEqual(list(parcelas.filter(numero__lte=24).values()), pagina_1)
+        self.assertEqual(parcelas.get(pk=p25.pk).valor, Decimal("1234.56"))
+        self.assertFalse(parcelas.filter(pk=p30.pk).exists())
+        self.assertEqual(parcelas.count(), 29)
+        # só a linha alterada é gravada (nada de UPDATE nas outras 5 da página)
+        updates = [q["sql"] for q in consultas if q["sql"].startswith('UPDATE "vendas_parcela"')]
+        self.assertEqual(len(updates), 1)
@@ -9,6 +9,7 @@ urlpatterns = [
     path("<int:pk>/", views.venda_detail, name="venda_detail"),
 
     # ações de parcelas (POST, restritas a staff)
+    path("parcelas/baixa/", views.parcelas_baixa, name="parcelas_baixa"),
     path("parcelas/<int:pk>/pagar/", views.parcela_pagar, name="parcela_pagar"),
     path("parcelas/<int:pk>/desfazer/", views.parcela_desfazer, name="parcela_desfazer"),
 ]
\ No newline at end of file
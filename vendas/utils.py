@@ -1,15 +1,26 @@
 # vendas/utils.py
 from __future__ import annotations
+import calendar
+from datetime import date, datetime
 from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
 from dateutil.relativedelta import relativedelta
+from django.utils import timezone
 
 from .models import Parcela, Venda
+from .resumo import atualizar_resumos, resumos_adiados
 
 
 def _round2(v: Decimal) -> Decimal:
     return v.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
+def _somar_meses(d: date, meses: int) -> date:
+    """Igual a d + relativedelta(months=meses), bem mais barato em laços longos."""
+    m = d.month - 1 + meses
+    ano, mes = d.year + m // 12, m % 12 + 1
+    return d.replace(year=ano, month=mes, day=min(d.day, calendar.monthrange(ano, mes)[1]))
+
+
 def _datas(venda: Venda, qtd: int):
     """
     Primeira parcela em:
@@ -21,7 +32,9 @@ def _datas(venda: Venda, qtd: int):
         base = venda.data_inicio_parcelamento
     else:
         base = venda.data_venda + relativedelta(months=+1)
-    return [base + relativedelta(months=+i) for i in range(qtd)]
+    if isinstance(base, datetime):  # default=timezone.now, ainda não relido do banco
+        base = timezone.localdate(base)
+    return [_somar_meses(base, i) for i in range(qtd)]
 
 
 def _dividir_iguais(total: Decimal, n: int) -> list[Decimal]:
@@ -47,6 +60,13 @@ def gerar_parcelas_automaticas(venda: Venda, *, recriar: bool = True) -> int:
       - recriar=True apaga as parcelas existentes antes de gerar
     Retorna a quantidade gerada.
     """
+    with resumos_adiados():
+        qtd = _gerar_parcelas_automaticas(venda, recriar=recriar)
+        atualizar_resumos([venda.pk])
+    return qtd
+
+
+def _gerar_parcelas_automaticas(venda: Venda, *, recriar: bool) -> int:
     # Sempre limpamos se não for parcelado
     if venda.forma_pagamento != "PARCELADO":
         if recriar:
@@ -65,22 +85,47 @@ def gerar_parcelas_automaticas(venda: Venda, *, recriar: bool = True) -> int:
             venda.parcelas.all().delete()
         return 0
 
+    if recriar:
+        venda.parcelas.all().delete()
+
+    objs = montar_parcelas(venda)
+    Parcela.objects.bulk_create(objs)
+    return len(objs)
+
+
+def plano_parcelas(venda: Venda) -> list[tuple[int, Decimal, date]]:
+    """
+    (número, valor, vencimento) de cada parcela da venda, com as regras de
+    gerar_parcelas_automaticas. Sem instanciar Parcela: serve também para
+    quem insere em massa sem models (vendas.sintetico).
+    """
+    if venda.forma_pagamento != "PARCELADO":
+        return []
+
+    qtd = int(venda.parcelas_total or 0)
+    saldo = _round2(venda.valor_total - venda.entrada_bruta - venda.desconto)
+    if qtd <= 0 or saldo <= 0:
+        return []
+
     datas = _datas(venda, qtd)
     valores = _dividir_iguais(saldo, qtd)
+    return [(i + 1, _round2(valores[i]), datas[i]) for i in range(qtd)]
 
-    if recriar:
-        venda.parcelas.all().delete()
 
-    objs = []
-    for i in range(qtd):
-        objs.append(
-            Parcela(
-                venda=venda,
-                numero=i + 1,
-                valor=_round2(valores[i]),
-                vencimento=datas[i],
-                status="PENDENTE",
-            )
+def montar_parcelas(venda: Venda, hoje: date | None = None) -> list[Parcela]:
+    """
+    Monta (sem salvar) as parcelas da venda com as mesmas regras de
+    gerar_parcelas_automaticas. Útil para inserções em massa (bulk_create).
+    As que vencem antes de `hoje` já saem VENCIDO.
+    """
+    hoje = hoje or timezone.localdate()
+    return [
+        Parcela(
+            venda=venda,
+            numero=numero,
+            valor=valor,
+            vencimento=vencimento,
+            status="VENCIDO" if vencimento < hoje else "PENDENTE",
         )
-    Parcela.objects.bulk_create(objs)
-    return len(objs)
\ No newline at end of file
+        for numero, valor, vencimento in plano_parcelas(venda)
+    ]
\ No newline at end of file
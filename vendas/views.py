@@ -1,6 +1,9 @@
 # vendas/views.py
+from datetime import date
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.paginator import Paginator
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -8,6 +11,7 @@ from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_POST
 
 from .models import Venda, Parcela
+from .services import baixar_parcelas
 
 
 def _is_staff(user):
@@ -15,6 +19,17 @@ def _is_staff(user):
     return user.is_authenticated and user.is_staff
 
 
+def _parse_date(s: str | None):
+    """Transforma 'YYYY-MM-DD' em date ou None."""
+    if not s:
+        return None
+    try:
+        y, m, d = map(int, s.split("-"))
+        return date(y, m, d)
+    except Exception:
+        return None
+
+
 def _safe_next(request, default="/"):
     """
     Retorna uma URL de retorno segura (mesmo host) vinda de POST/GET `next`.
@@ -102,17 +117,63 @@ def parcela_pagar(request, pk: int):
 @require_POST
 def parcela_desfazer(request, pk: int):
     """
-    Volta a parcela para PENDENTE.
+    Volta a parcela para PENDENTE (ou VENCIDO, se o vencimento já passou).
     - Apenas staff
     - Apenas POST
     - Zera data_pagamento
     """
     parcela = get_object_or_404(Parcela, pk=pk)
-    parcela.status = "PENDENTE"
+    parcela.status = "VENCIDO" if parcela.vencimento < timezone.localdate() else "PENDENTE"
     parcela.data_pagamento = None
     parcela.save(update_fields=["status", "data_pagamento"])
 
     messages.info(
         request, f"Pagamento da parcela #{parcela.numero} da venda {parcela.venda_id} foi desfeito."
     )
-    return redirect(_safe_next(request))
\ No newline at end of file
+    return redirect(_safe_next(request))
+
+
+@user_passes_test(_is_staff)
+def parcelas_baixa(request):
+    """
+    Baixa em massa de parcelas (staff).
+    GET  -> lista parcelas em aberto com filtros:
+              ?q=texto (cliente / nº da venda)  ?ate=YYYY-MM-DD (vencimento até)
+    POST -> marca como PAGO as parcelas selecionadas num único UPDATE
+            (data_pagamento = data informada, ou hoje).
+    """
+    if request.method == "POST":
+        ids = [i for i in request.POST.getlist("parcelas") if i.isdigit()]
+        data_pagamento = _parse_date(request.POST.get("data_pagamento"))
+        if not ids:
+            messages.warning(request, "Nenhuma parcela selecionada.")
+        else:
+            qtd = baixar_parcelas(ids, data_pagamento)
+            messages.success(request, f"{qtd} parcela(s) marcada(s) como paga(s).")
+        return redirect(_safe_next(request, default=request.path))
+
+    hoje = timezone.localdate()
+    q = (request.GET.get("q") or "").strip()
+    ate = _parse_date(request.GET.get("ate"))
+
+    parcelas = (
+        Parcela.objects.em_aberto()
+        .select_related("venda", "venda__cliente")
+        .order_by("vencimento", "venda_id", "numero")
+    )
+    if ate:
+        parcelas = parcelas.filter(vencimento__lte=ate)
+    if q:
+        filtro = Q(venda__cliente__nome__icontains=q)
+        if q.isdigit():
+            filtro |= Q(venda_id=int(q))
+        parcelas = parcelas.filter(filtro)
+
+    page = Paginator(parcelas, 100).get_page(request.GET.get("page"))
+    context = {
+        "page": page,
+        "hoje": hoje,
+        "q": q,
+        "ate": ate,
+    }
+    return render(request, "vendas/baixa.html", context)